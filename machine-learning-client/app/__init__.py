@@ -7,6 +7,11 @@ from flask import Flask
 
 from app.api import routes
 from app.config import Config
+from app.models.artifacts import check_offline_cache
+from app.models.registry import get_voice_cloner
+from app.services.executor import configure_torch_threads
+from app.services.retention import start_gc_thread
+from app.services.storage import start_migration_thread
 
 
 def create_app(config_class=Config):
@@ -29,6 +34,22 @@ def create_app(config_class=Config):
     # Initialize directories
     config_class.init_directories()
 
+    # Refuse to start offline without every configured model cached
+    check_offline_cache()
+
+    # Share the CPU cores between concurrent inference slots
+    configure_torch_threads()
+
+    # Fork the synthesis workers before any background thread starts
+    if config_class.TTS_PROCESSES > 1:
+        get_voice_cloner().start_workers()
+
+    # Move audio nobody has played lately out of GridFS
+    start_migration_thread()
+
+    # Delete orphaned and expired audio
+    start_gc_thread()
+
     # Register blueprints
     app.register_blueprint(routes.api_bp, url_prefix="/api")
 
@@ -2,13 +2,55 @@
 API endpoints for ML client processing
 """
 
+import hmac
 import logging
 import os
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from datetime import datetime
+from functools import wraps
+from urllib.parse import unquote
 
-from flask import Blueprint, current_app, jsonify, request
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import Blueprint, Response, current_app, jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 
+from app.config import Config
+from app.models.registry import get_voice_cloner, registry_stats
+from app.services.admission import (
+    UNKNOWN_BYTES_PER_SECOND,
+    AdmissionRejectedError,
+    get_admission,
+)
+from app.services.audio import probe_duration
+from app.services.batch import (
+    TooManyFilesError,
+    extract_archive,
+    get_batch,
+    start_batch,
+)
+from app.services.cancellation import (
+    DeadlineExceededError,
+    JobCancelledError,
+    cancel_job,
+    track_job,
+    watch_disconnect,
+)
+from app.services.codec import CODECS, get_transcode, mimetype_of
+from app.services.executor import ExecutorBusyError, executor_stats, get_executor
 from app.services.processor import Processor
+from app.services.profiler import ProfilerBusyError, SamplingProfiler, profile_process
+from app.services.profiles import get_profiles
+from app.services.retention import collect_garbage
+from app.services.scheduler import SchedulerBusyError, classify, get_scheduler
+from app.services.storage import get_storage
+from app.services.tracing import span, start_trace
+from app.services.upload import SAMPLE_RATE, UploadTooLargeError, receive_stream
+from app.services.workspace import Workspace
 
 api_bp = Blueprint("api", __name__)
 logger = logging.getLogger(__name__)
@@ -35,7 +77,98 @@ def allowed_file(filename):
     )
 
 
+def _is_admin():
+    """
+    Check whether the request carries the admin token.
+
+    Returns
+    -------
+    admin : bool
+        True if ``ADMIN_TOKEN`` is set and the ``Authorization`` header is
+        ``Bearer <ADMIN_TOKEN>``.
+    """
+    if not Config.ADMIN_TOKEN:
+        return False
+    header = request.headers.get("Authorization", "")
+    return hmac.compare_digest(header, f"Bearer {Config.ADMIN_TOKEN}")
+
+
+def _admin_only(view):
+    """
+    Restrict a view to requests carrying the admin token.
+
+    Parameters
+    ----------
+    view : callable
+        Flask view function.
+
+    Returns
+    -------
+    wrapper : callable
+        View returning 404 while no ``ADMIN_TOKEN`` is configured and 401
+        without the token.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not Config.ADMIN_TOKEN:
+            return jsonify({"error": "Admin endpoints are disabled"}), 404
+        if not _is_admin():
+            return jsonify({"error": "Admin token required"}), 401
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def _handle_errors(view):
+    """
+    Map processing failures of a view to JSON error responses.
+
+    Parameters
+    ----------
+    view : callable
+        Flask view function.
+
+    Returns
+    -------
+    wrapper : callable
+        View returning 413 for oversized uploads, 429/503 when work is
+        rejected by the scheduler, admission control or an executor, 504/499 when the job
+        runs past its deadline or is cancelled, and 500 otherwise.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            return view(*args, **kwargs)
+
+        except (UploadTooLargeError, RequestEntityTooLarge) as e:
+            return jsonify({"error": str(e)}), 413
+
+        except SchedulerBusyError as e:
+            return _busy_response(e, 429)
+
+        except (AdmissionRejectedError, ExecutorBusyError) as e:
+            return _busy_response(e, 503)
+
+        except DeadlineExceededError as e:
+            logger.warning(f"Abandoned request: {e}")
+            return jsonify({"error": str(e)}), 504
+
+        except JobCancelledError as e:
+            # Nginx's "client closed request"; the client is usually gone
+            logger.warning(f"Abandoned request: {e}")
+            return jsonify({"error": str(e)}), 499
+
+        except Exception as e:
+            logger.error(f"Processing error: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    return wrapper
+
+
 @api_bp.route("/process", methods=["POST"])
+@_handle_errors
 def process():
     """
     Complete workflow: translate audio and clone voice.
@@ -44,38 +177,723 @@ def process():
     -------
     request.files['audio'] : file
         Audio file to process.
+    X-User-Id header : str, optional
+        Id of the user the job is scheduled for.
+    X-Job-Id header : str, optional
+        Id to cancel the job by; generated if missing.
+    X-Request-Timeout header : float, optional
+        Seconds the client will wait; work stops once they have passed.
+    traceparent header : str, optional
+        W3C trace context of the caller; the job's spans join its trace.
+    request.args['aligned'] : str, optional
+        'true' to align the output audio to the source timing.
+    request.args['cpu_profile'] : str, optional
+        'true' to return a sampling profile of the request as collapsed
+        stacks in ``cpu_profile``; needs the admin token.
+    request.args['transcriber'] : str, optional
+        Whisper model size to use, one of ``/models``.
+    request.args['tts'] : str, optional
+        TTS model name to use, one of ``/models``.
+    request.args['profile'] : str, optional
+        'true' to clone the user's enrolled voice profile instead of the
+        voice in the upload.
 
     Returns
     -------
     response : JSON
         Dictionary with translation text and clone-translated audio file ID.
     """
+    if "audio" not in request.files:
+        return jsonify({"error": "No audio file provided"}), 400
+
+    audio_file = request.files["audio"]
+
+    if audio_file.filename == "":
+        return jsonify({"error": "No file selected"}), 400
+
+    if not allowed_file(audio_file.filename):
+        return jsonify({"error": "File type not allowed"}), 400
+
+    return _process_stream(audio_file.filename, audio_file.stream)
+
+
+@api_bp.route("/process/stream", methods=["POST"])
+@_handle_errors
+def process_stream():
+    """
+    Complete workflow on a raw (non-multipart) request body.
+
+    The body is consumed incrementally as it arrives, so the upload is
+    hashed, size-checked and decoded without being spooled first.
+
+    Expects
+    -------
+    X-Filename header : str
+        URL-quoted original file name.
+    X-User-Id header : str, optional
+        Id of the user the job is scheduled for.
+    X-Job-Id header : str, optional
+        Id to cancel the job by; generated if missing.
+    X-Request-Timeout header : float, optional
+        Seconds the client will wait; work stops once they have passed.
+    traceparent header : str, optional
+        W3C trace context of the caller; the job's spans join its trace.
+    request.args['aligned'] : str, optional
+        'true' to align the output audio to the source timing.
+    request.args['cpu_profile'] : str, optional
+        'true' to return a sampling profile of the request as collapsed
+        stacks in ``cpu_profile``; needs the admin token.
+    request.args['transcriber'] : str, optional
+        Whisper model size to use, one of ``/models``.
+    request.args['tts'] : str, optional
+        TTS model name to use, one of ``/models``.
+    request.args['profile'] : str, optional
+        'true' to clone the user's enrolled voice profile instead of the
+        voice in the upload.
+    request body : bytes
+        Raw audio file contents.
+
+    Returns
+    -------
+    response : JSON
+        Dictionary with translation text and clone-translated audio file ID.
+    """
+    filename = unquote(request.headers.get("X-Filename", ""))
+
+    if filename == "":
+        return jsonify({"error": "No file selected"}), 400
+
+    if not allowed_file(filename):
+        return jsonify({"error": "File type not allowed"}), 400
+
+    return _process_stream(filename, request.stream)
+
+
+def _process_stream(filename, stream):
+    """
+    Receive an upload stream and run the complete workflow on it.
+
+    Parameters
+    ----------
+    filename : str
+        Original file name of the upload.
+    stream : file-like
+        Readable binary stream of the upload.
+
+    Returns
+    -------
+    response : tuple
+        JSON response and HTTP status code.
+    """
+    transcriber_size = request.args.get("transcriber") or None
+    if transcriber_size and transcriber_size not in Config.TRANSCRIBER_MODEL_SIZES:
+        return jsonify({"error": f"Unsupported transcriber: {transcriber_size}"}), 400
+
+    tts_model = request.args.get("tts") or None
+    if tts_model and tts_model not in Config.TTS_MODEL_NAMES:
+        return jsonify({"error": f"Unsupported TTS model: {tts_model}"}), 400
+
+    # Profiles expose the service's internals, so they are for admins only
+    cpu_profile = request.args.get("cpu_profile", "false").lower() == "true"
+    if cpu_profile and not _is_admin():
+        return jsonify({"error": "Profiling requires the admin token"}), 403
+
+    user_id = request.headers.get("X-User-Id") or "anonymous"
+    job_id = request.headers.get("X-Job-Id") or uuid.uuid4().hex
+
+    # Continue the caller's trace; its id correlates the request everywhere
+    with start_trace(
+        "ml.process",
+        request.headers.get("traceparent"),
+        job_id=job_id,
+        user_id=user_id,
+    ) as root, Workspace() as workspace:
+        # A stored profile spares encoding the voice of every upload
+        profile = None
+        if request.args.get("profile", "false").lower() == "true":
+            profile = get_profiles().get(user_id, tts_model or Config.TTS_MODEL_NAME)
+            if profile is None:
+                return jsonify({"error": "No voice profile enrolled"}), 404
+
+        # Receive the upload into a private workspace so concurrent requests
+        # never share files; the workspace is removed even if processing fails
+        with span("upload.receive") as receiving:
+            upload_path = workspace.file(secure_filename(filename) or "upload")
+            upload = receive_stream(
+                stream,
+                upload_path,
+                max_bytes=current_app.config["MAX_CONTENT_LENGTH"],
+            )
+            receiving.set_attribute("bytes", upload["size"])
+
+        # Cost is driven by audio duration, not upload size, so get it from
+        # the decode or the container header before accepting the work
+        if upload["audio"] is not None:
+            duration = len(upload["audio"]) / SAMPLE_RATE
+        else:
+            duration = probe_duration(upload_path)
+        root.set_attribute("audio_seconds", duration)
+        timeout = _request_timeout()
+        admission = get_admission()
+        cost_duration = duration or upload["size"] / UNKNOWN_BYTES_PER_SECOND
+        model = (
+            transcriber_size or Config.TRANSCRIBER_MODEL_SIZE,
+            tts_model or Config.TTS_MODEL_NAME,
+        )
+
+        with admission.admit(cost_duration, timeout, model), track_job(
+            job_id, user_id, timeout
+        ) as token:
+            # The body is read, so the connection now only becomes readable
+            # when the client gives up waiting
+            sock = request.environ.get("werkzeug.socket") or request.environ.get(
+                "gunicorn.socket"
+            )
+            if sock is not None:
+                watch_disconnect(token, sock, Config.DISCONNECT_POLL_INTERVAL)
+
+            # Wait for a fair share of the service before processing
+            with get_scheduler().job(user_id, classify(duration)):
+                started = time.monotonic()
+                processor = Processor(transcriber_size, tts_model)
+                # Sample only this request's thread, waits included
+                profiler = SamplingProfiler(
+                    thread_ids=[threading.get_ident()], idle=True
+                )
+                with profiler if cpu_profile else nullcontext():
+                    result = processor.process_audio_file(
+                        upload_path,
+                        audio=upload["audio"],
+                        output_dir=workspace.path,
+                        speaker_embedding=profile and profile["embedding"],
+                        aligned=request.args.get("aligned", "false").lower() == "true",
+                    )
+                admission.observe(cost_duration, time.monotonic() - started, model)
+
+    result["input_sha256"] = upload["sha256"]
+    result["job_id"] = job_id
+    result["voice_profile"] = profile is not None
+    result["trace_id"] = root.trace_id
+    if cpu_profile:
+        result["cpu_profile"] = profiler.collapsed()
+    return jsonify(result), 200
+
+
+def _request_timeout():
+    """
+    Get the seconds the client will wait for the current request.
+
+    Returns
+    -------
+    timeout : float
+        ``X-Request-Timeout`` header value, or ``DEFAULT_REQUEST_TIMEOUT``
+        if missing or malformed; 0 means no deadline.
+    """
+    try:
+        return float(request.headers["X-Request-Timeout"])
+    except (KeyError, ValueError):
+        return Config.DEFAULT_REQUEST_TIMEOUT
+
+
+@api_bp.route("/jobs/<job_id>/cancel", methods=["POST"])
+def cancel(job_id):
+    """
+    Cancel a running translation or batch.
+
+    The job stops at its next checkpoint: between pipeline stages, Whisper
+    windows or synthesized sentences. Files of a cancelled batch that have
+    not finished fail.
+
+    Parameters
+    ----------
+    job_id : str
+        ``X-Job-Id`` of a translation request, or a batch id.
+
+    Returns
+    -------
+    response : JSON
+        Confirmation with HTTP 202, or 404 if the user has no such job
+        running.
+    """
+    user_id = request.headers.get("X-User-Id") or "anonymous"
+
+    if not cancel_job(job_id, user_id):
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify({"job_id": job_id, "status": "cancelling"}), 202
+
+
+@api_bp.route("/profiles", methods=["POST"])
+@_handle_errors
+def enroll_profile():
+    """
+    Enroll reference clips of a user's voice as a speaker profile.
+
+    The clips' speaker embeddings are averaged and stored, so later
+    requests with ``profile=true`` clone the voice without encoding it.
+
+    Expects
+    -------
+    request.files['audio'] : list of file
+        Clean recordings of the user's voice.
+    X-User-Id header : str
+        Id of the user the profile belongs to.
+    request.args['tts'] : str, optional
+        TTS model name to enroll for, one of ``/models``.
+    request.form['append'] : str, optional
+        'true' to average the clips into the existing profile instead of
+        replacing it.
+
+    Returns
+    -------
+    response : JSON
+        Profile summary, with HTTP 201.
+    """
+    user_id = request.headers.get("X-User-Id")
+    if not user_id:
+        return jsonify({"error": "X-User-Id header required"}), 400
+
+    tts_model = request.args.get("tts") or None
+    if tts_model and tts_model not in Config.TTS_MODEL_NAMES:
+        return jsonify({"error": f"Unsupported TTS model: {tts_model}"}), 400
+
+    uploads = [f for f in request.files.getlist("audio") if f.filename]
+    if not uploads:
+        return jsonify({"error": "No audio file provided"}), 400
+    if len(uploads) > Config.MAX_PROFILE_CLIPS:
+        return (
+            jsonify(
+                {"error": f"Too many clips, the limit is {Config.MAX_PROFILE_CLIPS}"}
+            ),
+            400,
+        )
+    for upload in uploads:
+        if not allowed_file(upload.filename):
+            return jsonify({"error": f"File type not allowed: {upload.filename}"}), 400
+
+    voice_cloner = get_voice_cloner(tts_model)
+    if not voice_cloner.is_available():
+        return jsonify({"error": "Voice cloning is not available"}), 503
+
+    embeddings = []
+    with Workspace(prefix="profile-") as workspace:
+        for index, upload in enumerate(uploads):
+            path = workspace.file(f"{index:02d}_{secure_filename(upload.filename)}")
+            receive_stream(
+                upload.stream,
+                path,
+                max_bytes=current_app.config["MAX_CONTENT_LENGTH"],
+                decode=False,
+            )
+            embeddings.append(
+                get_executor("voice_cloner", voice_cloner.model_name).run(
+                    voice_cloner.get_speaker_embedding, path
+                )
+            )
+
+    profile = get_profiles().enroll(
+        user_id,
+        voice_cloner.model_name,
+        embeddings,
+        append=request.form.get("append", "").lower() == "true",
+    )
+    return jsonify(_profile_summary(profile)), 201
+
+
+@api_bp.route("/profiles", methods=["GET"])
+@_handle_errors
+def list_profiles():
+    """
+    List the speaker profiles of a user.
+
+    Returns
+    -------
+    response : JSON
+        Dictionary with a summary of the user's ``profiles``, one per TTS
+        model.
+    """
+    user_id = request.headers.get("X-User-Id") or "anonymous"
+    profiles = get_profiles().profiles.find({"user_id": user_id}, {"embedding": 0})
+    return jsonify({"profiles": [_profile_summary(p) for p in profiles]}), 200
+
+
+@api_bp.route("/profiles", methods=["DELETE"])
+@_handle_errors
+def delete_profiles():
+    """
+    Delete the speaker profiles of a user.
+
+    Returns
+    -------
+    response : JSON
+        Dictionary with the number of ``deleted`` profiles.
+    """
+    user_id = request.headers.get("X-User-Id") or "anonymous"
+    return jsonify({"deleted": get_profiles().delete(user_id)}), 200
+
+
+def _profile_summary(profile):
+    """
+    Describe a speaker profile without its embedding.
+
+    Parameters
+    ----------
+    profile : dict
+        Profile document.
+
+    Returns
+    -------
+    summary : dict
+        Model, number of clips and update time of the profile.
+    """
+    return {
+        "model": profile["model"],
+        "clips": profile["clips"],
+        "updated": profile["updated"].isoformat(),
+    }
+
+
+@api_bp.route("/process/batch", methods=["POST"])
+@_handle_errors
+def process_batch():
+    """
+    Start translating many files in one request.
+
+    Files are received up front and processed in the background as bulk
+    work, one scheduler slot per file; each finished file is saved to the
+    user's history. Poll ``/batch/<batch_id>`` for per-file results.
+
+    Expects
+    -------
+    request.files['audio'] : list of file
+        Audio files, and/or zip archives of audio files, to process.
+    request.form['same_speaker'] : str, optional
+        'true' if every file is a recording of the same speaker.
+    X-User-Id header : str, optional
+        Id of the user the batch is scheduled for.
+
+    Returns
+    -------
+    response : JSON
+        Batch id and initial per-file state, with HTTP 202, or 503 with
+        Retry-After when the batch would overload the service.
+    """
+    request.max_content_length = current_app.config["MAX_BATCH_CONTENT_LENGTH"]
+    uploads = [f for f in request.files.getlist("audio") if f.filename]
+
+    if not uploads:
+        return jsonify({"error": "No audio file provided"}), 400
+
+    workspace = Workspace(prefix="batch-").create()
+    try:
+        files, error = _receive_batch(uploads, workspace)
+    except Exception:
+        workspace.cleanup()
+        raise
+
+    if error:
+        workspace.cleanup()
+        return jsonify({"error": error}), 400
+
+    # Admit the batch by its audio duration, as single uploads are
+    duration = sum(
+        probe_duration(path) or os.path.getsize(path) / UNKNOWN_BYTES_PER_SECOND
+        for _, path in files
+    )
+    job = start_batch(
+        request.headers.get("X-User-Id") or "anonymous",
+        files,
+        workspace,
+        same_speaker=request.form.get("same_speaker", "").lower() == "true",
+        duration=duration,
+    )
+    return jsonify(job.to_dict()), 202
+
+
+def _receive_batch(uploads, workspace):
+    """
+    Receive the files of a batch request into a workspace.
+
+    Parameters
+    ----------
+    uploads : list of FileStorage
+        Uploaded audio files and zip archives.
+    workspace : Workspace
+        Workspace to store the files in.
+
+    Returns
+    -------
+    files : list of tuple
+        ``(original_name, path)`` pairs of the received audio files.
+    error : str or None
+        Reason to reject the batch, if any.
+    """
+    allowed_extensions = current_app.config["ALLOWED_EXTENSIONS"]
+    max_files = current_app.config["MAX_BATCH_FILES"]
+    files = []
+
+    too_many = f"Too many files, the limit is {max_files}"
+
+    # Check the limit before receiving each file, not after
+    for upload in uploads:
+        if upload.filename.lower().endswith(".zip"):
+            try:
+                files.extend(
+                    extract_archive(
+                        upload.stream,
+                        workspace,
+                        allowed_extensions,
+                        max_files=max_files - len(files),
+                    )
+                )
+            except TooManyFilesError:
+                return files, too_many
+        elif allowed_file(upload.filename):
+            if len(files) >= max_files:
+                return files, too_many
+            path = workspace.file(
+                f"{len(files):04d}_{secure_filename(upload.filename)}"
+            )
+            receive_stream(upload.stream, path, decode=False)
+            files.append((upload.filename, path))
+        else:
+            return files, f"File type not allowed: {upload.filename}"
+
+    if not files:
+        return files, "No audio files found"
+
+    return files, None
+
+
+@api_bp.route("/batch/<batch_id>", methods=["GET"])
+def batch_status(batch_id):
+    """
+    Report the progress of a batch.
+
+    Parameters
+    ----------
+    batch_id : str
+        Id returned by ``/process/batch``.
+
+    Returns
+    -------
+    response : JSON
+        Batch progress with the results of every finished file.
+    """
+    job = get_batch(batch_id)
+    user_id = request.headers.get("X-User-Id") or "anonymous"
+
+    if job is None or job.user_id != user_id:
+        return jsonify({"error": "Batch not found"}), 404
+
+    return jsonify(job.to_dict()), 200
+
+
+@api_bp.route("/audio/<file_id>/transcode", methods=["POST"])
+@_handle_errors
+def transcode(file_id):
+    """
+    Get a stored output audio file in another codec.
+
+    The transcode is produced once and cached in the hot storage tier,
+    whichever tier holds the original.
+
+    Parameters
+    ----------
+    file_id : str
+        GridFS id of the stored audio.
+
+    Returns
+    -------
+    response : JSON
+        Dictionary with the ``file_id`` and ``mimetype`` of the audio in
+        the requested ``format`` (opus, flac or wav).
+    """
+    codec = request.args.get("format", "")
+    if codec not in CODECS:
+        return jsonify({"error": f"Unsupported format: {codec}"}), 400
+
     try:
-        if "audio" not in request.files:
-            return jsonify({"error": "No audio file provided"}), 400
+        original_id = ObjectId(file_id)
+    except InvalidId:
+        return jsonify({"error": "Audio not found"}), 404
+
+    transcode_id = get_transcode(get_storage(), original_id, codec)
+    if transcode_id is None:
+        return jsonify({"error": "Audio not found"}), 404
+
+    return (
+        jsonify({"file_id": str(transcode_id), "mimetype": mimetype_of(codec)}),
+        200,
+    )
+
+
+def _busy_response(error, status):
+    """
+    Build the response for work rejected because a queue is full.
+
+    Parameters
+    ----------
+    error : AdmissionRejectedError, ExecutorBusyError or SchedulerBusyError
+        Rejection raised by admission control, an executor or the scheduler.
+    status : int
+        HTTP status code of the response.
+
+    Returns
+    -------
+    response : tuple
+        JSON response, HTTP status code and Retry-After header.
+    """
+    logger.warning(f"Rejected request: {error}")
+    return (
+        jsonify({"error": str(error)}),
+        status,
+        {"Retry-After": str(error.retry_after)},
+    )
 
-        audio_file = request.files["audio"]
 
-        if audio_file.filename == "":
-            return jsonify({"error": "No file selected"}), 400
+@api_bp.route("/storage/migrate", methods=["POST"])
+@_admin_only
+@_handle_errors
+def migrate_storage():
+    """
+    Run a storage migration pass now instead of waiting for the next one.
 
-        if not allowed_file(audio_file.filename):
-            return jsonify({"error": "File type not allowed"}), 400
+    Parameters
+    ----------
+    Authorization header : str
+        ``Bearer <ADMIN_TOKEN>``.
 
-        # Save uploaded file
-        filename = secure_filename(audio_file.filename)
-        upload_path = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
-        audio_file.save(upload_path)
+    Returns
+    -------
+    response : JSON
+        Migration report with the number of files moved to the cold tier.
+    """
+    report = get_storage().migrate(
+        Config.HOT_STORAGE_MAX_AGE,
+        max_hot_bytes=Config.HOT_STORAGE_MAX_BYTES,
+        limit=Config.STORAGE_MIGRATE_BATCH,
+        grace_period=Config.MIGRATE_GRACE_PERIOD,
+    )
+    return jsonify(report), 200
 
-        # Process complete workflow
-        processor = Processor()
-        result = processor.process_audio_file(upload_path)
 
-        # Clean up uploaded file
-        os.remove(upload_path)
+@api_bp.route("/storage/gc", methods=["POST"])
+@_admin_only
+@_handle_errors
+def garbage_collect():
+    """
+    Run a garbage collection pass now instead of waiting for the next one.
+
+    Parameters
+    ----------
+    Authorization header : str
+        ``Bearer <ADMIN_TOKEN>``.
+
+    Returns
+    -------
+    response : JSON
+        Report of deleted orphans, expired entries and reclaimed bytes.
+    """
+    return jsonify(collect_garbage()), 200
 
-        return jsonify(result), 200
 
-    except Exception as e:
-        logger.error(f"Processing error: {e}")
-        return jsonify({"error": str(e)}), 500
+@api_bp.route("/models", methods=["GET"])
+def models():
+    """
+    List the models requests may pick.
+
+    Returns
+    -------
+    response : JSON
+        Dictionary with the allowed ``transcriber`` sizes and ``tts``
+        model names, the defaults, and the models currently loaded.
+    """
+    return (
+        jsonify(
+            {
+                "transcriber": Config.TRANSCRIBER_MODEL_SIZES,
+                "tts": Config.TTS_MODEL_NAMES,
+                "default": {
+                    "transcriber": Config.TRANSCRIBER_MODEL_SIZE,
+                    "tts": Config.TTS_MODEL_NAME,
+                },
+                "loaded": list(registry_stats()["models"]),
+            }
+        ),
+        200,
+    )
+
+
+@api_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Report inference queue metrics.
+
+    Returns
+    -------
+    response : JSON
+        Dictionary with per-model executor, scheduler, admission and
+        model registry metrics.
+    """
+    return (
+        jsonify(
+            {
+                "executors": executor_stats(),
+                "scheduler": get_scheduler().stats(),
+                "admission": get_admission().stats(),
+                "models": registry_stats(),
+            }
+        ),
+        200,
+    )
+
+
+@api_bp.route("/admin/profile", methods=["POST"])
+@_admin_only
+def profile_service():
+    """
+    Profile the live service for a while with a sampling profiler.
+
+    Parameters
+    ----------
+    Authorization header : str
+        ``Bearer <ADMIN_TOKEN>``.
+    request.args['seconds'] : float, optional
+        How long to sample, 10 by default and at most
+        ``PROFILE_MAX_SECONDS``.
+    request.args['interval'] : float, optional
+        Seconds between samples.
+    request.args['idle'] : str, optional
+        'true' to keep threads waiting on locks and sockets.
+
+    Returns
+    -------
+    response : text/plain
+        Collapsed stacks of every thread, ready for flamegraph.pl, inferno
+        or speedscope; 409 if another profile is running.
+    """
+    try:
+        seconds = float(request.args.get("seconds", "10"))
+        interval = float(request.args.get("interval", "0")) or None
+    except ValueError:
+        return jsonify({"error": "seconds and interval must be numbers"}), 400
+    if seconds <= 0 or (interval is not None and interval <= 0):
+        return jsonify({"error": "seconds and interval must be positive"}), 400
+
+    try:
+        profiler = profile_process(
+            seconds, interval, idle=request.args.get("idle", "false").lower() == "true"
+        )
+    except ProfilerBusyError as e:
+        return jsonify({"error": str(e)}), 409
+
+    filename = f"profile-{datetime.utcnow():%Y%m%dT%H%M%S}.collapsed"
+    return Response(
+        profiler.collapsed(),
+        mimetype="text/plain",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Profile-Samples": str(profiler.sample_count),
+        },
+    )
@@ -0,0 +1,136 @@
+"""
+Benchmark of single-call and sentence-parallel speech synthesis
+
+Usage::
+
+    TTS_PROCESSES=4 python -m app.benchmark reference.wav --text "..."
+"""
+
+import argparse
+import logging
+import time
+from typing import Callable, Dict
+
+from app.config import Config
+from app.models.voice_cloner import VoiceCloner
+
+DEFAULT_TEXT = (
+    "The quick brown fox jumps over the lazy dog. "
+    "A journey of a thousand miles begins with a single step. "
+    "All that glitters is not gold. "
+    "Actions speak louder than words. "
+    "Practice makes perfect."
+)
+
+
+def time_best(run: Callable[[], object], repeat: int) -> float:
+    """
+    Time a function, keeping the fastest of several runs.
+
+    Parameters
+    ----------
+    run : callable
+        Function to time.
+    repeat : int
+        Number of runs.
+
+    Returns
+    -------
+    seconds : float
+        Wall-clock time of the fastest run.
+    """
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run_benchmark(
+    cloner: VoiceCloner, reference_audio: str, text: str, repeat: int = 3
+) -> Dict:
+    """
+    Compare synthesis paths on the same voice and text.
+
+    Parameters
+    ----------
+    cloner : VoiceCloner
+        Cloner with a loaded model.
+    reference_audio : str
+        Path to the voice to clone.
+    text : str
+        Text to synthesize.
+    repeat : int, default=3
+        Runs per path; the fastest is reported.
+
+    Returns
+    -------
+    report : dict
+        Dictionary with the results:
+        - single_call : float
+            Seconds for one ``tts`` call over the whole text
+        - sequential : float
+            Seconds synthesizing sentences one after another
+        - parallel : float
+            Seconds synthesizing sentences across the process pool
+        - processes : int
+            Worker processes in the pool
+        - speedup : float
+            ``single_call`` divided by ``parallel``
+    """
+    tts = cloner.tts_model
+    embedding = cloner.get_speaker_embedding(reference_audio)
+
+    # Fork the workers and warm up each path before timing
+    cloner.start_workers()
+    cloner._synthesize(embedding, text, "en")  # pylint: disable=protected-access
+
+    single_call = time_best(
+        lambda: tts.tts(text=text, speaker_wav=reference_audio, language="en"), repeat
+    )
+    sequential = time_best(
+        lambda: cloner._synthesize(  # pylint: disable=protected-access
+            embedding, text, "en", processes=1
+        ),
+        repeat,
+    )
+    parallel = time_best(
+        lambda: cloner._synthesize(  # pylint: disable=protected-access
+            embedding, text, "en"
+        ),
+        repeat,
+    )
+
+    return {
+        "single_call": single_call,
+        "sequential": sequential,
+        "parallel": parallel,
+        "processes": Config.TTS_PROCESSES,
+        "speedup": single_call / parallel if parallel else 0.0,
+    }
+
+
+def main(argv=None):
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("reference", help="reference audio of the voice to clone")
+    parser.add_argument("--text", default=DEFAULT_TEXT, help="text to synthesize")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per path")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    cloner = VoiceCloner()
+    if cloner.tts_model is None:
+        parser.error("TTS model is not available")
+
+    report = run_benchmark(cloner, args.reference, args.text, args.repeat)
+    print(f"single call:           {report['single_call']:.2f}s")
+    print(f"sequential sentences:  {report['sequential']:.2f}s")
+    print(f"parallel ({report['processes']} procs):   {report['parallel']:.2f}s")
+    print(f"speedup vs single call: {report['speedup']:.2f}x")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,33 @@ class Config:
 
     # Transcriber (Whisper) model settings
     TRANSCRIBER_MODEL_SIZE = os.getenv("TRANSCRIBER_MODEL_SIZE", "base")
+    TTS_MODEL_NAME = os.getenv(
+        "TTS_MODEL_NAME", "tts_models/multilingual/multi-dataset/your_tts"
+    )
+
+    # Models requests may pick with ?transcriber= and ?tts= (comma-separated)
+    TRANSCRIBER_MODEL_SIZES = (
+        (os.getenv("TRANSCRIBER_MODEL_SIZES") or TRANSCRIBER_MODEL_SIZE)
+        .replace(" ", "")
+        .split(",")
+    )
+    TTS_MODEL_NAMES = (
+        (os.getenv("TTS_MODEL_NAMES") or TTS_MODEL_NAME).replace(" ", "").split(",")
+    )
+    MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))  # 0 = off
+    # Downloaded model files ("" = library defaults); offline loads only from it
+    MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "")
+    OFFLINE_MODE = os.getenv("OFFLINE_MODE", "False").lower() == "true"
+    # Converted safetensors weights mapped by every worker ("" = load privately)
+    WEIGHTS_CACHE_DIR = os.getenv("WEIGHTS_CACHE_DIR", "")
+
+    # Cascade: re-decode low-confidence segments with a larger Whisper model
+    CASCADE_MODEL_SIZE = os.getenv("CASCADE_MODEL_SIZE", "")  # "" = off
+    CASCADE_LOGPROB_THRESHOLD = float(os.getenv("CASCADE_LOGPROB_THRESHOLD", "-0.8"))
+    CASCADE_NO_SPEECH_THRESHOLD = float(os.getenv("CASCADE_NO_SPEECH_THRESHOLD", "0.6"))
+    CASCADE_COMPRESSION_THRESHOLD = float(
+        os.getenv("CASCADE_COMPRESSION_THRESHOLD", "2.4")
+    )
 
     # Audio settings
     UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "uploads")
@@ -32,14 +59,109 @@ class Config:
     )  # 16MB default
     ALLOWED_EXTENSIONS = {"wav", "mp3", "m4a", "flac", "ogg"}
 
+    # Output storage settings
+    OUTPUT_CODEC = os.getenv("OUTPUT_CODEC", "opus").lower()  # opus, flac or wav
+    WAVEFORM_POINTS = int(os.getenv("WAVEFORM_POINTS", "200"))
+    COLD_STORAGE_DIR = os.getenv("COLD_STORAGE_DIR", "cold_storage")
+    HOT_STORAGE_MAX_AGE = int(
+        os.getenv("HOT_STORAGE_MAX_AGE", str(7 * 24 * 3600))
+    )  # seconds since last access
+    HOT_STORAGE_MAX_BYTES = int(os.getenv("HOT_STORAGE_MAX_BYTES", "0"))  # 0=no limit
+    STORAGE_MIGRATE_INTERVAL = int(
+        os.getenv("STORAGE_MIGRATE_INTERVAL", "3600")
+    )  # seconds, 0=off
+    STORAGE_MIGRATE_BATCH = int(os.getenv("STORAGE_MIGRATE_BATCH", "100"))
+    MIGRATE_GRACE_PERIOD = int(
+        os.getenv("MIGRATE_GRACE_PERIOD", "600")
+    )  # seconds a migrated file stays in GridFS for open streams
+
+    # Garbage collection and retention settings
+    GC_INTERVAL = int(os.getenv("GC_INTERVAL", "3600"))  # seconds, 0=off
+    GC_BATCH_SIZE = int(os.getenv("GC_BATCH_SIZE", "100"))
+    GC_GRACE_PERIOD = int(os.getenv("GC_GRACE_PERIOD", "86400"))  # seconds
+    HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "0"))  # 0=forever
+
+    # Streaming upload settings
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+    STREAM_DECODE = os.getenv("STREAM_DECODE", "True").lower() == "true"
+
+    # Per-request scratch workspaces (empty = tmpfs when available)
+    SCRATCH_DIR = os.getenv("SCRATCH_DIR", "")
+    SCRATCH_TMPFS_MIN_FREE = int(
+        os.getenv("SCRATCH_TMPFS_MIN_FREE", str(4 * MAX_CONTENT_LENGTH))
+    )
+
     # Processing settings
     DEVICE = os.getenv("DEVICE", "cpu")  # or 'cuda' for GPU
 
+    # Inference concurrency settings
+    TRANSCRIBER_SLOTS = int(os.getenv("TRANSCRIBER_SLOTS", "1"))
+    VOICE_CLONER_SLOTS = int(os.getenv("VOICE_CLONER_SLOTS", "1"))
+    INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "8"))
+    TORCH_THREADS_PER_SLOT = int(os.getenv("TORCH_THREADS_PER_SLOT", "0"))  # 0=auto
+
+    # Voice cloning settings
+    SPEAKER_EMBEDDING_CACHE_SIZE = int(os.getenv("SPEAKER_EMBEDDING_CACHE_SIZE", "32"))
+    MAX_PROFILE_CLIPS = int(os.getenv("MAX_PROFILE_CLIPS", "10"))
+    # Seconds of the cleanest speech the voice is encoded from (0 = whole file)
+    REFERENCE_SECONDS = float(os.getenv("REFERENCE_SECONDS", "10"))
+    REFERENCE_NO_SPEECH_THRESHOLD = float(
+        os.getenv("REFERENCE_NO_SPEECH_THRESHOLD", "0.5")
+    )
+
+    # Preprocessing: DC removal and normalization of the speech level
+    PREPROCESS_AUDIO = os.getenv("PREPROCESS_AUDIO", "True").lower() == "true"
+    NORMALIZE_DBFS = float(os.getenv("NORMALIZE_DBFS", "-20"))
+    MAX_NORMALIZE_GAIN_DB = float(os.getenv("MAX_NORMALIZE_GAIN_DB", "30"))
+
+    # Sentence-parallel synthesis settings (1 = synthesize in-process)
+    TTS_PROCESSES = int(os.getenv("TTS_PROCESSES", "1"))
+    CROSSFADE_MS = float(os.getenv("CROSSFADE_MS", "10"))
+
+    # Segment-aligned (dubbing) synthesis settings
+    MAX_TIME_STRETCH = float(os.getenv("MAX_TIME_STRETCH", "1.5"))
+
+    # Batch settings
+    MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "50"))
+    MAX_BATCH_CONTENT_LENGTH = int(
+        os.getenv("MAX_BATCH_CONTENT_LENGTH", str(256 * 1024 * 1024))
+    )  # 256MB default
+    BATCH_RETENTION = int(os.getenv("BATCH_RETENTION", "3600"))  # seconds
+
+    # Job scheduling settings
+    MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "2"))
+    PER_USER_MAX_JOBS = int(os.getenv("PER_USER_MAX_JOBS", "1"))
+    PER_USER_MAX_QUEUED = int(os.getenv("PER_USER_MAX_QUEUED", "4"))
+    INTERACTIVE_MAX_DURATION = float(
+        os.getenv("INTERACTIVE_MAX_DURATION", "30")
+    )  # seconds
+
+    # Admission control: longest projected wait before new jobs get 503
+    MAX_BACKLOG_SECONDS = float(os.getenv("MAX_BACKLOG_SECONDS", "600"))
+
+    # Deadline and cancellation settings
+    DEFAULT_REQUEST_TIMEOUT = float(
+        os.getenv("DEFAULT_REQUEST_TIMEOUT", "0")
+    )  # seconds, 0 = no deadline without an X-Request-Timeout header
+    DISCONNECT_POLL_INTERVAL = float(
+        os.getenv("DISCONNECT_POLL_INTERVAL", "1")
+    )  # seconds, 0 = don't watch for disconnects
+
+    # Tracing: JSON lines file and/or OTLP/HTTP collector URL ("" = off)
+    TRACE_FILE = os.getenv("TRACE_FILE", "")
+    TRACE_ENDPOINT = os.getenv("TRACE_ENDPOINT", "")
+
+    # Admin endpoints (disabled without a token) and the sampling profiler
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.01"))
+
     @staticmethod
     def init_directories():
         """Create necessary directories for file storage."""
         os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
         os.makedirs(Config.OUTPUT_FOLDER, exist_ok=True)
+        os.makedirs(Config.COLD_STORAGE_DIR, exist_ok=True)
 
     @staticmethod
     def validate():
@@ -0,0 +1,281 @@
+"""
+Local cache of downloaded model artifacts
+
+``python -m app.prefetch`` downloads every configured model into
+``MODEL_CACHE_DIR`` and records the checksum of each file in a manifest.
+With ``OFFLINE_MODE`` on, models load only from that cache and a missing
+artifact fails startup instead of triggering a download.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+import whisper
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ArtifactMissingError(RuntimeError):
+    """Raised when offline mode needs an artifact the cache lacks."""
+
+
+def whisper_key(model_size: str) -> str:
+    """Get the manifest key of a Whisper model."""
+    return f"whisper-{model_size}"
+
+
+def tts_key(model_name: str) -> str:
+    """Get the manifest key of a Coqui TTS model."""
+    return f"tts-{model_name}"
+
+
+def configured_models() -> Dict[str, List[str]]:
+    """
+    Get the models the service may load.
+
+    Returns
+    -------
+    models : dict
+        Dictionary with the model names:
+        - whisper : list of str
+            Whisper model sizes, including the cascade model
+        - tts : list of str
+            Coqui TTS model names
+    """
+    sizes = list(Config.TRANSCRIBER_MODEL_SIZES)
+    if Config.CASCADE_MODEL_SIZE:
+        sizes.append(Config.CASCADE_MODEL_SIZE)
+    return {
+        "whisper": list(dict.fromkeys(filter(None, sizes))),
+        "tts": list(dict.fromkeys(filter(None, Config.TTS_MODEL_NAMES))),
+    }
+
+
+def whisper_root() -> Optional[str]:
+    """Get the cache directory of Whisper checkpoints, None for the default."""
+    if not Config.MODEL_CACHE_DIR:
+        return None
+    return os.path.join(Config.MODEL_CACHE_DIR, "whisper")
+
+
+def whisper_checkpoint(model_size: str) -> str:
+    """
+    Get the cached checkpoint path of a Whisper model.
+
+    Parameters
+    ----------
+    model_size : str
+        Whisper model size.
+
+    Returns
+    -------
+    path : str
+        Where the checkpoint is, or will be, downloaded.
+    """
+    url = whisper._MODELS[model_size]  # pylint: disable=protected-access
+    root = whisper_root() or os.path.join(
+        os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "whisper"
+    )
+    return os.path.join(root, os.path.basename(url))
+
+
+def whisper_sha256(model_size: str) -> str:
+    """Get the published SHA256 checksum of a Whisper checkpoint."""
+    url = whisper._MODELS[model_size]  # pylint: disable=protected-access
+    return url.split("/")[-2]
+
+
+def tts_model_dir(model_name: str) -> str:
+    """
+    Get the directory Coqui TTS downloads a model to.
+
+    Parameters
+    ----------
+    model_name : str
+        Coqui TTS model name, e.g. 'tts_models/multilingual/multi-dataset/your_tts'.
+
+    Returns
+    -------
+    path : str
+        Model directory inside the cache.
+    """
+    return os.path.join(Config.MODEL_CACHE_DIR, "tts", model_name.replace("/", "--"))
+
+
+def use_tts_cache():
+    """Point Coqui TTS downloads and lookups at the cache directory."""
+    if Config.MODEL_CACHE_DIR:
+        os.environ["TTS_HOME"] = Config.MODEL_CACHE_DIR
+
+
+def file_sha256(path: str) -> str:
+    """Compute the SHA256 checksum of a file without reading it whole."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest() -> Dict:
+    """Read the cache manifest, empty if there is none."""
+    path = os.path.join(Config.MODEL_CACHE_DIR, MANIFEST_NAME)
+    if not Config.MODEL_CACHE_DIR or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def record_artifact(key: str, paths: List[str]) -> Dict:
+    """
+    Checksum an artifact's files and add them to the cache manifest.
+
+    Parameters
+    ----------
+    key : str
+        Manifest key of the artifact.
+    paths : list of str
+        Files of the artifact, inside ``MODEL_CACHE_DIR``.
+
+    Returns
+    -------
+    files : dict
+        Size and SHA256 checksum of each file, by path relative to the
+        cache directory.
+    """
+    files = {}
+    for path in sorted(paths):
+        name = os.path.relpath(path, Config.MODEL_CACHE_DIR)
+        files[name] = {"size": os.path.getsize(path), "sha256": file_sha256(path)}
+
+    manifest = read_manifest()
+    manifest[key] = files
+    path = os.path.join(Config.MODEL_CACHE_DIR, MANIFEST_NAME)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+    return files
+
+
+def verify_artifact(key: str, checksums: bool = True) -> List[str]:
+    """
+    Check an artifact's files against the cache manifest.
+
+    Parameters
+    ----------
+    key : str
+        Manifest key of the artifact.
+    checksums : bool, default=True
+        Whether to hash the files; otherwise only their sizes are
+        compared, which is cheap enough for every startup.
+
+    Returns
+    -------
+    problems : list of str
+        What is wrong with the artifact, empty if it is intact.
+    """
+    files = read_manifest().get(key)
+    if not files:
+        return [f"{key} is not in the model cache"]
+
+    problems = []
+    for name, expected in files.items():
+        path = os.path.join(Config.MODEL_CACHE_DIR, name)
+        if not os.path.isfile(path):
+            problems.append(f"{name} is missing")
+        elif os.path.getsize(path) != expected["size"]:
+            problems.append(f"{name} has the wrong size")
+        elif checksums and file_sha256(path) != expected["sha256"]:
+            problems.append(f"{name} has the wrong checksum")
+    return problems
+
+
+def require_artifact(key: str):
+    """
+    Make sure an artifact can load from the cache in offline mode.
+
+    Does nothing when ``OFFLINE_MODE`` is off.
+
+    Parameters
+    ----------
+    key : str
+        Manifest key of the artifact.
+
+    Raises
+    ------
+    ArtifactMissingError
+        If offline mode is on and the artifact is not cached intact.
+    """
+    if not Config.OFFLINE_MODE:
+        return
+    if not Config.MODEL_CACHE_DIR:
+        raise ArtifactMissingError("OFFLINE_MODE requires MODEL_CACHE_DIR")
+
+    problems = verify_artifact(key, checksums=False)
+    if problems:
+        raise ArtifactMissingError(
+            f"Cannot load {key} offline: {'; '.join(problems)}. "
+            "Run `python -m app.prefetch` to fill the model cache."
+        )
+
+
+def check_offline_cache():
+    """
+    Fail fast if offline mode is on and a configured model is not cached.
+
+    Raises
+    ------
+    ArtifactMissingError
+        If any configured model cannot load from the cache.
+    """
+    if not Config.OFFLINE_MODE:
+        return
+    models = configured_models()
+    for model_size in models["whisper"]:
+        require_artifact(whisper_key(model_size))
+    for model_name in models["tts"]:
+        require_artifact(tts_key(model_name))
+    logger.info(f"Offline mode: all models found in {Config.MODEL_CACHE_DIR}")
+
+
+def load_whisper_checkpoint(model_size: str, device: Optional[str] = None):
+    """
+    Load a Whisper model from its checkpoint, downloading it if allowed.
+
+    Parameters
+    ----------
+    model_size : str
+        Whisper model size.
+    device : str, optional
+        Device to load the model on; Whisper picks one if None.
+
+    Returns
+    -------
+    model : whisper.model.Whisper
+        Loaded model.
+
+    Raises
+    ------
+    ArtifactMissingError
+        If offline mode is on and the checkpoint is not cached.
+    """
+    if not Config.OFFLINE_MODE:
+        return whisper.load_model(
+            model_size, device=device, download_root=whisper_root()
+        )
+
+    # Loading by path never reaches for the network
+    require_artifact(whisper_key(model_size))
+    model = whisper.load_model(whisper_checkpoint(model_size), device=device)
+    model.set_alignment_heads(
+        whisper._ALIGNMENT_HEADS[model_size]  # pylint: disable=protected-access
+    )
+    return model
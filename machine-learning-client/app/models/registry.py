@@ -0,0 +1,225 @@
+"""
+Shared model instances
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+from app.config import Config
+from app.models.transcriber import Transcriber
+from app.models.voice_cloner import VoiceCloner
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """A loaded model and what the registry knows about it."""
+
+    def __init__(self, model, size: int, requires: Sequence[str]):
+        self.model = model
+        self.size = size
+        self.requires = tuple(requires)
+
+
+# Loaded models, least recently used first
+_models: "OrderedDict[str, _Entry]" = OrderedDict()
+# Models being loaded, set once the load finishes or fails
+_loading: Dict[str, threading.Event] = {}
+# Guards the registry's state; never held while a model loads
+_lock = threading.Lock()
+_counters = {"hits": 0, "loads": 0, "evictions": 0}
+
+
+def _get_or_load(name, loader, requires=()):
+    """
+    Return a cached model, loading it once if needed.
+
+    The model is loaded without holding the registry lock, so requests
+    for models already loaded never wait for a cold load; concurrent
+    requests for the same model wait for the one load in progress.
+    Newly loaded models may push the registry over
+    ``MODEL_MEMORY_BUDGET_MB``; least recently used models are then
+    evicted until it fits again.
+
+    Parameters
+    ----------
+    name : str
+        Cache key of the model.
+    loader : callable
+        Function that loads the model.
+    requires : sequence of str, optional
+        Keys of registry models the model holds on to; they are kept
+        loaded, and counted as used, as long as it is.
+
+    Returns
+    -------
+    model : object
+        Shared model instance.
+    """
+    while True:
+        with _lock:
+            entry = _models.get(name)
+            if entry is not None:
+                _counters["hits"] += 1
+                _touch(name)
+                return entry.model
+
+            loading = _loading.get(name)
+            if loading is None:
+                loading = _loading[name] = threading.Event()
+                break
+        # Another request is loading it; take its result or retry if it failed
+        loading.wait()
+
+    try:
+        logger.info(f"Loading shared model: {name}")
+        start_time = time.monotonic()
+        model = loader()
+        entry = _Entry(model, _memory_bytes(model), requires)
+
+        with _lock:
+            _models[name] = entry
+            _counters["loads"] += 1
+            _evict(keep=name)
+        logger.info(
+            f"Loaded shared model {name} ({entry.size / 2**20:.0f} MB) in "
+            f"{time.monotonic() - start_time:.1f}s"
+        )
+        return model
+    finally:
+        with _lock:
+            del _loading[name]
+        loading.set()
+
+
+def _memory_bytes(model) -> int:
+    """Get the bytes a model's weights take, 0 if it cannot tell."""
+    memory_bytes = getattr(model, "memory_bytes", None)
+    return int(memory_bytes()) if callable(memory_bytes) else 0
+
+
+def _touch(name: str):
+    """Mark a model and the models it requires as recently used."""
+    entry = _models[name]
+    for required in entry.requires:
+        if required in _models:
+            _models.move_to_end(required)
+    _models.move_to_end(name)
+
+
+def _evict(keep: str):
+    """Evict least recently used models until the budget is met."""
+    budget = Config.MODEL_MEMORY_BUDGET_MB * 2**20
+    if budget <= 0:
+        return
+
+    protected = {keep, *_models[keep].requires}
+    while sum(entry.size for entry in _models.values()) > budget:
+        required = {name for entry in _models.values() for name in entry.requires}
+        victim = next(
+            (
+                name
+                for name in _models
+                if name not in protected and name not in required
+            ),
+            None,
+        )
+        if victim is None:
+            logger.warning(
+                f"Models exceed the {Config.MODEL_MEMORY_BUDGET_MB} MB budget, "
+                "nothing left to evict"
+            )
+            return
+
+        entry = _models.pop(victim)
+        _counters["evictions"] += 1
+        logger.info(f"Evicted shared model {victim} ({entry.size / 2**20:.0f} MB)")
+
+        # Requests still using the model keep it alive until they finish
+        close = getattr(entry.model, "close", None)
+        if callable(close):
+            close()
+
+
+def registry_stats() -> Dict:
+    """
+    Get model registry metrics.
+
+    Returns
+    -------
+    stats : dict
+        Dictionary with registry metrics:
+        - models : dict
+            Weight bytes of each loaded model, least recently used first
+        - used_bytes : int
+            Weight bytes of all loaded models
+        - budget_bytes : int
+            Memory budget, 0 if unlimited
+        - hits : int
+            Requests served by an already loaded model
+        - loads : int
+            Models loaded
+        - evictions : int
+            Models evicted to stay within the budget
+    """
+    with _lock:
+        models = {name: entry.size for name, entry in _models.items()}
+        return {
+            "models": models,
+            "used_bytes": sum(models.values()),
+            "budget_bytes": max(0, Config.MODEL_MEMORY_BUDGET_MB) * 2**20,
+            **_counters,
+        }
+
+
+def get_transcriber(model_size: Optional[str] = None) -> Transcriber:
+    """
+    Get the process-wide Whisper transcriber of a model size.
+
+    With ``CASCADE_MODEL_SIZE`` set, transcribers of other sizes escalate
+    low-confidence segments to the shared cascade model.
+
+    Parameters
+    ----------
+    model_size : str, optional
+        Whisper model size. If None, defaults to
+        ``Config.TRANSCRIBER_MODEL_SIZE``.
+
+    Returns
+    -------
+    transcriber : Transcriber
+        Transcriber shared by all requests for that size.
+    """
+    model_size = model_size or Config.TRANSCRIBER_MODEL_SIZE
+    cascade = Config.CASCADE_MODEL_SIZE
+    requires = ()
+    if cascade and cascade != model_size:
+        requires = (f"transcriber:{cascade}",)
+
+    def load():
+        escalation = get_transcriber(cascade) if requires else None
+        return Transcriber(model_size, escalation=escalation)
+
+    return _get_or_load(f"transcriber:{model_size}", load, requires)
+
+
+def get_voice_cloner(model_name: Optional[str] = None) -> VoiceCloner:
+    """
+    Get the process-wide voice cloner of a TTS model.
+
+    Parameters
+    ----------
+    model_name : str, optional
+        Coqui TTS model name. If None, defaults to
+        ``Config.TTS_MODEL_NAME``.
+
+    Returns
+    -------
+    voice_cloner : VoiceCloner
+        Voice cloner shared by all requests for that model.
+    """
+    model_name = model_name or Config.TTS_MODEL_NAME
+    return _get_or_load(f"voice_cloner:{model_name}", lambda: VoiceCloner(model_name))
@@ -5,15 +5,78 @@ Audio transcription model
 import logging
 import os
 import time
+from functools import wraps
 from typing import Dict, Optional
 
+import numpy as np
+import torch
 import whisper
 
 from app.config import Config
+from app.models.weights import load_whisper
+from app.services.cancellation import check_cancelled
+from app.services.tracing import span
 
 logger = logging.getLogger(__name__)
 
 
+def _cancellable(decode):
+    """
+    Wrap a Whisper model's decode to check the current job first.
+
+    Whisper decodes audio one 30-second window at a time, so a cancelled
+    or timed-out job stops at the next window instead of at the end.
+
+    Parameters
+    ----------
+    decode : callable
+        The model's bound ``decode`` method.
+
+    Returns
+    -------
+    wrapper : callable
+        Decode function with a cancellation checkpoint.
+    """
+
+    @wraps(decode)
+    def wrapper(*args, **kwargs):
+        check_cancelled("the next audio window")
+        return decode(*args, **kwargs)
+
+    return wrapper
+
+
+def is_low_confidence(segment: Dict) -> bool:
+    """
+    Check whether Whisper was unsure about a decoded segment.
+
+    A segment is low confidence when its average token log probability
+    is below ``CASCADE_LOGPROB_THRESHOLD`` or its text repeats itself
+    (gzip compression ratio above ``CASCADE_COMPRESSION_THRESHOLD``).
+    Low log probability with a high no-speech probability is silence,
+    which a larger model would not improve.
+
+    Parameters
+    ----------
+    segment : dict
+        Segment as returned by Whisper.
+
+    Returns
+    -------
+    low_confidence : bool
+        True if the segment should be decoded again by a larger model.
+    """
+    if segment.get("compression_ratio", 0) > Config.CASCADE_COMPRESSION_THRESHOLD:
+        return True
+
+    avg_logprob = segment.get("avg_logprob", 0)
+    no_speech_prob = segment.get("no_speech_prob", 0)
+    return (
+        avg_logprob < Config.CASCADE_LOGPROB_THRESHOLD
+        and no_speech_prob <= Config.CASCADE_NO_SPEECH_THRESHOLD
+    )
+
+
 class Transcriber:
     """
     Audio transcription using OpenAI Whisper model.
@@ -27,9 +90,16 @@ class Transcriber:
         Loaded Whisper model instance.
     model_size : str
         Size of the loaded model (tiny, base, small, medium, large).
+    escalation : Transcriber or None
+        Larger transcriber that re-decodes low-confidence segments, when
+        running as a cascade.
     """
 
-    def __init__(self, model_size: Optional[str] = None):
+    def __init__(
+        self,
+        model_size: Optional[str] = None,
+        escalation: Optional["Transcriber"] = None,
+    ):
         """
         Initialize Whisper transcriber.
 
@@ -38,13 +108,17 @@ class Transcriber:
         model_size : str, optional
             Whisper model size ('tiny', 'base', 'small', 'medium', 'large').
             If None, defaults to value from config.
+        escalation : Transcriber, optional
+            Larger transcriber to re-decode low-confidence segments with.
         """
         if model_size is None:
             model_size = Config.TRANSCRIBER_MODEL_SIZE
 
         logger.info(f"Loading Whisper model: {model_size}")
-        self.model = whisper.load_model(model_size)
+        self.model = load_whisper(model_size)
+        self.model.decode = _cancellable(self.model.decode)
         self.model_size = model_size
+        self.escalation = escalation
         logger.info(f"Whisper model {model_size} loaded successfully")
 
     def transcribe(self, audio_path: str, language: Optional[str] = None) -> Dict:
@@ -95,6 +169,7 @@ class Transcriber:
 
         # Perform transcription
         result = self.model.transcribe(audio_path, **options)
+        result = self._escalate(result, audio_path, None, options)
 
         processing_time = time.time() - start_time
         logger.info(f"Transcription completed in {processing_time:.2f} seconds")
@@ -106,7 +181,9 @@ class Transcriber:
             "processing_time": processing_time,
         }
 
-    def translate_to_english(self, audio_path: str) -> Dict:
+    def translate_to_english(
+        self, audio_path: str, audio: Optional[np.ndarray] = None
+    ) -> Dict:
         """
         Transcribe and translate any language audio to English text.
 
@@ -117,6 +194,9 @@ class Transcriber:
         ----------
         audio_path : str
             Path to the audio file.
+        audio : np.ndarray, optional
+            Already decoded 16 kHz mono waveform of the file. When given,
+            Whisper skips decoding ``audio_path`` again.
 
         Returns
         -------
@@ -150,7 +230,13 @@ class Transcriber:
         }
 
         # Perform translation
-        result = self.model.transcribe(audio_path, **options)
+        with span("whisper.translate", model=self.model_size):
+            result = self.model.transcribe(
+                audio if audio is not None else audio_path, **options
+            )
+        if self.escalation is not None:
+            with span("whisper.escalate", model=self.escalation.model_size):
+                result = self._escalate(result, audio_path, audio, options)
 
         processing_time = time.time() - start_time
         logger.info(f"Translation completed in {processing_time:.2f} seconds")
@@ -162,6 +248,84 @@ class Transcriber:
             "processing_time": processing_time,
         }
 
+    def _escalate(
+        self, result: Dict, audio_path: str, audio: Optional[np.ndarray], options
+    ) -> Dict:
+        """
+        Re-decode the low-confidence segments of a result with a larger model.
+
+        Consecutive low-confidence segments are cut out of the audio as one
+        span, decoded by the escalation model in the already detected
+        language, and replaced by its segments. Confident segments are
+        kept as they are, so clean audio never touches the larger model.
+
+        Parameters
+        ----------
+        result : dict
+            Whisper result of this transcriber's model.
+        audio_path : str
+            Path to the audio file.
+        audio : np.ndarray or None
+            Already decoded 16 kHz mono waveform of the file, if any.
+        options : dict
+            Whisper options the result was decoded with.
+
+        Returns
+        -------
+        result : dict
+            Whisper result with the low-confidence spans re-decoded.
+        """
+        segments = result.get("segments", [])
+        if self.escalation is None or not segments:
+            return result
+
+        # Group consecutive low-confidence segments into spans
+        spans = []
+        for index, segment in enumerate(segments):
+            if not is_low_confidence(segment):
+                continue
+            if spans and spans[-1][1] == index:
+                spans[-1][1] = index + 1
+            else:
+                spans.append([index, index + 1])
+        if not spans:
+            return result
+
+        logger.info(
+            f"Escalating {sum(end - start for start, end in spans)} of "
+            f"{len(segments)} segments to Whisper {self.escalation.model_size}"
+        )
+        if audio is None:
+            audio = whisper.load_audio(audio_path)
+        options = {**options, "language": result["language"]}
+        rate = whisper.audio.SAMPLE_RATE
+
+        escalated = []
+        cursor = 0
+        for first, last in spans:
+            escalated.extend(segments[cursor:first])
+            start = segments[first]["start"]
+            end = segments[last - 1]["end"]
+            clip = audio[int(start * rate) : int(end * rate)]
+            redecoded = self.escalation.model.transcribe(clip, **options)
+            for segment in redecoded.get("segments", []):
+                escalated.append(
+                    {
+                        **segment,
+                        "start": start + segment["start"],
+                        "end": min(end, start + segment["end"]),
+                        "escalated": True,
+                    }
+                )
+            cursor = last
+        escalated.extend(segments[cursor:])
+
+        return {
+            **result,
+            "text": "".join(segment["text"] for segment in escalated),
+            "segments": escalated,
+        }
+
     def detect_language(self, audio_path: str) -> str:
         """
         Detect the language of an audio file without full transcription.
@@ -220,9 +384,30 @@ class Transcriber:
                 Device being used (cpu or cuda)
             - is_multilingual : bool
                 Whether model supports multiple languages
+            - escalation_model_size : str or None
+                Size of the model low-confidence segments escalate to
         """
         return {
             "model_size": self.model_size,
             "device": str(self.model.device),
             "is_multilingual": self.model.is_multilingual,
+            "escalation_model_size": (
+                self.escalation.model_size if self.escalation else None
+            ),
         }
+
+    def memory_bytes(self) -> int:
+        """
+        Get the memory taken by the Whisper model's weights.
+
+        The escalation model is not included; it is shared separately.
+
+        Returns
+        -------
+        size : int
+            Bytes of parameters and buffers.
+        """
+        if not isinstance(self.model, torch.nn.Module):
+            return 0
+        tensors = [*self.model.parameters(), *self.model.buffers()]
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
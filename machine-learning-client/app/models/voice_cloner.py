@@ -2,17 +2,52 @@
 TTS-based voice cloning model
 """
 
+import hashlib
 import logging
+import multiprocessing
 import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 
+import numpy as np
+import soundfile
 import torch
 from TTS.api import TTS
+from TTS.tts.utils.synthesis import synthesis
 
 from app.config import Config
+from app.models.artifacts import require_artifact, tts_key, use_tts_cache
+from app.models.weights import share_weights
+from app.services.alignment import align_segments, crossfade_concat
+from app.services.cancellation import JobCancelledError, check_cancelled
+from app.services.preprocess import resample
+from app.services.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+# Sample rate of placeholder audio when no TTS model is loaded
+MOCK_SAMPLE_RATE = 22050
+
+# Cloner whose loaded model forked synthesis workers share copy-on-write
+_fork_cloner = None
+
+
+def _init_synthesis_worker():
+    """Keep each forked worker on one core; the pool provides parallelism."""
+    torch.set_num_threads(1)
+
+
+def _synthesize_in_worker(args):
+    """Synthesize one sentence in a forked worker."""
+    speaker_embedding, sentence, language_id = args
+    return _fork_cloner._synthesize_sentence(  # pylint: disable=protected-access
+        speaker_embedding, sentence, language_id
+    )
+
 
 class VoiceCloner:
     """
@@ -26,25 +61,43 @@ class VoiceCloner:
     ----------
     output_dir : str
         Directory for saving generated audio files.
+    model_name : str
+        Coqui TTS model name.
     tts_model : TTS or None
         Loaded TTS model instance, or None if unavailable.
     device : str or None
         Device being used ('cpu' or 'cuda'), or None if unavailable.
     """
 
-    def __init__(self):
+    def __init__(self, model_name=None):
         """
         Initialize voice cloner.
 
         Creates output directory and loads TTS model if available.
         Falls back to mock mode if TTS library is not installed.
+
+        Parameters
+        ----------
+        model_name : str, optional
+            Coqui TTS model name. If None, defaults to
+            ``Config.TTS_MODEL_NAME``.
         """
         self.output_dir = Config.OUTPUT_FOLDER
         os.makedirs(self.output_dir, exist_ok=True)
 
+        self.model_name = model_name or Config.TTS_MODEL_NAME
+
         self.tts_model = None
         self.device = None
 
+        # Speaker embeddings keyed by reference audio content hash
+        self._embeddings = OrderedDict()
+        self._embeddings_lock = threading.Lock()
+
+        # Forked sentence synthesis workers, started by start_workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
         if TTS is not None:
             self._init_model()
         else:
@@ -62,31 +115,184 @@ class VoiceCloner:
         # Device configuration
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         logger.info(f"Using device: {self.device}")
+        if Config.TTS_PROCESSES > 1 and self.device != "cpu":
+            logger.warning(
+                f"Ignoring TTS_PROCESSES={Config.TTS_PROCESSES}: forked workers "
+                f"cannot use {self.device}, synthesizing in-process"
+            )
 
         try:
+            # Load from the model cache, and only from it when offline
+            use_tts_cache()
+            require_artifact(tts_key(self.model_name))
+
             # Initialize TTS with a multilingual model
             self.tts_model = TTS(
-                model_name="tts_models/multilingual/multi-dataset/your_tts",
+                model_name=self.model_name,
                 progress_bar=False,
             ).to(self.device)
 
+            # Back the weights by the shared cache file when one is configured
+            if self.device == "cpu":
+                share_weights(
+                    self.tts_model.synthesizer.tts_model, f"tts-{self.model_name}"
+                )
+
             logger.info("TTS model initialization complete")
         except Exception as e:
             logger.error(f"Failed to initialize TTS model: {e}")
             self.tts_model = None
 
-    def clone_and_speak(self, reference_audio, text, target_language="en"):
+    def get_speaker_embedding(self, reference_audio):
         """
-        Clone voice from reference audio and synthesize text in that voice.
+        Compute the speaker embedding of a reference clip.
+
+        Embeddings are cached by the clip's content, so repeated clips
+        (e.g. every file of a batch from one speaker) are encoded once.
 
         Parameters
         ----------
         reference_audio : str
-            Path to reference audio file for voice cloning.
+            Path to reference audio file.
+
+        Returns
+        -------
+        embedding : list of float or None
+            Speaker embedding, or None if no TTS model is loaded.
+        """
+        if self.tts_model is None:
+            return None
+
+        digest = hashlib.sha256()
+        with open(reference_audio, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+
+        def compute():
+            logger.info(f"Computing speaker embedding for: {reference_audio}")
+            speaker_manager = self.tts_model.synthesizer.tts_model.speaker_manager
+            return speaker_manager.compute_embedding_from_clip(reference_audio)
+
+        return self._cached_embedding(digest.hexdigest(), compute)
+
+    def get_waveform_embedding(self, waveform, sample_rate):
+        """
+        Compute the speaker embedding of in-memory speech.
+
+        Processes the waveform the way the speaker encoder processes a
+        clip read from disk, without writing it to a file first.
+
+        Parameters
+        ----------
+        waveform : np.ndarray
+            Mono waveform of the reference speech.
+        sample_rate : int
+            Sample rate of ``waveform``.
+
+        Returns
+        -------
+        embedding : list of float or None
+            Speaker embedding, or None if no TTS model is loaded.
+        """
+        if self.tts_model is None:
+            return None
+
+        waveform = np.asarray(waveform, dtype=np.float32)
+        digest = hashlib.sha256(waveform.tobytes())
+        digest.update(str(sample_rate).encode())
+
+        def compute():
+            logger.info(
+                f"Computing speaker embedding for {len(waveform) / sample_rate:.1f}s "
+                "of reference speech"
+            )
+            speaker_manager = self.tts_model.synthesizer.tts_model.speaker_manager
+            ap = speaker_manager.encoder_ap
+            wav = waveform
+            if sample_rate != ap.sample_rate:
+                wav = resample(wav, sample_rate, ap.sample_rate)
+            if ap.do_sound_norm:
+                wav = ap.sound_norm(wav)
+            if ap.do_rms_norm:
+                wav = ap.rms_volume_norm(wav, ap.db_level)
+
+            if speaker_manager.encoder_config.model_params.get("use_torch_spec", False):
+                m_input = torch.from_numpy(wav)
+            else:
+                m_input = torch.from_numpy(ap.melspectrogram(wav))
+            if speaker_manager.use_cuda:
+                m_input = m_input.cuda()
+
+            with torch.no_grad():
+                embedding = speaker_manager.encoder.compute_embedding(
+                    m_input.unsqueeze(0)
+                )
+            return embedding[0].tolist()
+
+        return self._cached_embedding(digest.hexdigest(), compute)
+
+    def _cached_embedding(self, key, compute):
+        """
+        Get a speaker embedding from the cache, computing it on a miss.
+
+        Parameters
+        ----------
+        key : str
+            Content hash of the reference speech.
+        compute : callable
+            Function computing the embedding.
+
+        Returns
+        -------
+        embedding : list of float
+            Speaker embedding.
+        """
+        with self._embeddings_lock:
+            if key in self._embeddings:
+                self._embeddings.move_to_end(key)
+                return self._embeddings[key]
+
+        embedding = compute()
+
+        with self._embeddings_lock:
+            self._embeddings[key] = embedding
+            while len(self._embeddings) > Config.SPEAKER_EMBEDDING_CACHE_SIZE:
+                self._embeddings.popitem(last=False)
+
+        return embedding
+
+    def clone_and_speak(
+        self,
+        reference_audio,
+        text,
+        target_language="en",
+        output_dir=None,
+        speaker_embedding=None,
+        segments=None,
+    ):
+        """
+        Clone voice from reference audio and synthesize text in that voice.
+
+        Parameters
+        ----------
+        reference_audio : str or None
+            Path to reference audio file for voice cloning. May be None
+            when ``speaker_embedding`` is given.
         text : str
             Text to synthesize.
         target_language : str, default='en'
             Target language code for synthesis ('en', 'es', 'fr', etc.).
+        output_dir : str, optional
+            Directory to write the output to, e.g. a request workspace.
+            If None, defaults to ``self.output_dir``.
+        speaker_embedding : list of float, optional
+            Precomputed speaker embedding (see ``get_speaker_embedding``).
+            When given, the reference audio is not encoded again.
+        segments : dict, optional
+            Source segments as columnar ``start``, ``end`` and ``text``
+            arrays. When given, each segment is synthesized separately and
+            placed at its source time, so the output lines up with the
+            source for dubbing; ``text`` is then only used for logging.
 
         Returns
         -------
@@ -103,17 +309,38 @@ class VoiceCloner:
         if not text or not text.strip():
             raise ValueError("Text cannot be empty")
 
-        if not os.path.exists(reference_audio):
+        if speaker_embedding is None and not os.path.exists(reference_audio):
             raise FileNotFoundError(f"Reference audio not found: {reference_audio}")
 
         logger.info(f"Cloning voice from: {reference_audio}")
         logger.info(f"Text to synthesize: {text[:50]}...")
 
-        # Generate output filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_path = os.path.join(self.output_dir, f"cloned_voice_{timestamp}.wav")
+        # Pooled synthesis works from an embedding, so encode the voice once
+        if (
+            self.tts_model is not None
+            and speaker_embedding is None
+            and self._pool is not None
+        ):
+            speaker_embedding = self.get_speaker_embedding(reference_audio)
 
-        if self.tts_model is not None:
+        # Generate a unique output filename so concurrent calls never collide
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = os.path.join(
+            output_dir or self.output_dir,
+            f"cloned_voice_{timestamp}_{uuid.uuid4().hex[:8]}.wav",
+        )
+
+        if self.tts_model is not None and segments and segments["text"]:
+            if speaker_embedding is None:
+                speaker_embedding = self.get_speaker_embedding(reference_audio)
+            output_path = self._clone_aligned(
+                speaker_embedding, segments, target_language, output_path
+            )
+        elif self.tts_model is not None and speaker_embedding is not None:
+            output_path = self._clone_with_embedding(
+                speaker_embedding, text, target_language, output_path
+            )
+        elif self.tts_model is not None:
             output_path = self._clone_with_tts(
                 reference_audio, text, target_language, output_path
             )
@@ -157,14 +384,310 @@ class VoiceCloner:
             logger.info("Voice cloning completed successfully")
             return output_path
 
+        except JobCancelledError:
+            raise
+
         except Exception as e:
             logger.error(f"Voice cloning failed: {e}")
             logger.warning("Falling back to mock mode")
             return self._mock_clone(output_path)
 
+    def _clone_with_embedding(
+        self, speaker_embedding, text, target_language, output_path
+    ):
+        """
+        Perform voice cloning with TTS from a precomputed speaker embedding.
+
+        Parameters
+        ----------
+        speaker_embedding : list of float
+            Speaker embedding of the voice to clone.
+        text : str
+            Text to synthesize.
+        target_language : str
+            Target language.
+        output_path : str
+            Path for output file.
+
+        Returns
+        -------
+        output_path : str
+            Path to output audio file.
+        """
+        try:
+            logger.info("Generating cloned voice from speaker embedding...")
+
+            wav = self._synthesize(speaker_embedding, text, target_language)
+            self.tts_model.synthesizer.save_wav(wav, output_path)
+
+            logger.info("Voice cloning completed successfully")
+            return output_path
+
+        except JobCancelledError:
+            raise
+
+        except Exception as e:
+            logger.error(f"Voice cloning failed: {e}")
+            logger.warning("Falling back to mock mode")
+            return self._mock_clone(output_path)
+
+    def _clone_aligned(self, speaker_embedding, segments, target_language, output_path):
+        """
+        Perform voice cloning segment by segment, aligned to source timing.
+
+        The sentences of every segment are synthesized together, through
+        the synthesis workers when they are running, then each segment is
+        fitted to its source window and placed at its source start time.
+
+        Parameters
+        ----------
+        speaker_embedding : list of float
+            Speaker embedding of the voice to clone.
+        segments : dict
+            Columnar ``start``, ``end`` and ``text`` arrays.
+        target_language : str
+            Target language.
+        output_path : str
+            Path for output file.
+
+        Returns
+        -------
+        output_path : str
+            Path to output audio file.
+        """
+        try:
+            logger.info(f"Generating {len(segments['text'])} aligned segments...")
+
+            wavs = self._synthesize_texts(
+                speaker_embedding, segments["text"], target_language
+            )
+
+            synthesizer = self.tts_model.synthesizer
+            audio = align_segments(
+                wavs,
+                segments["start"],
+                segments["end"],
+                synthesizer.output_sample_rate,
+                max_stretch=Config.MAX_TIME_STRETCH,
+            )
+            synthesizer.save_wav(audio, output_path)
+
+            logger.info("Aligned voice cloning completed successfully")
+            return output_path
+
+        except JobCancelledError:
+            raise
+
+        except Exception as e:
+            logger.error(f"Voice cloning failed: {e}")
+            logger.warning("Falling back to mock mode")
+            return self._mock_clone(output_path)
+
+    def _synthesize(self, speaker_embedding, text, target_language, processes=None):
+        """
+        Synthesize text sentence by sentence from a speaker embedding.
+
+        Parameters
+        ----------
+        speaker_embedding : list of float
+            Speaker embedding of the voice to clone.
+        text : str
+            Text to synthesize.
+        target_language : str
+            Target language.
+        processes : int, optional
+            Worker processes to use; see ``_synthesize_texts``.
+
+        Returns
+        -------
+        wav : np.ndarray
+            Synthesized waveform at the model's output sample rate.
+        """
+        return self._synthesize_texts(
+            speaker_embedding, [text], target_language, processes
+        )[0]
+
+    @traced("tts.synthesize")
+    def _synthesize_texts(
+        self, speaker_embedding, texts, target_language, processes=None
+    ):
+        """
+        Synthesize several texts sentence by sentence from a speaker embedding.
+
+        With more than one process and the workers started, the sentences
+        of all texts are synthesized concurrently in forked workers that
+        share the loaded model copy-on-write; if a worker dies, the
+        remaining sentences are synthesized in this process. Otherwise
+        they are synthesized one at a time, keeping to the executor slot's
+        thread budget. Each text's sentences are joined with
+        ``CROSSFADE_MS`` crossfades. Synthesis stops between sentences if
+        the current job is cancelled.
+
+        Parameters
+        ----------
+        speaker_embedding : list of float
+            Speaker embedding of the voice to clone.
+        texts : list of str
+            Texts to synthesize; blank ones give empty waveforms.
+        target_language : str
+            Target language.
+        processes : int, optional
+            Worker processes to use; 1 synthesizes in this process. If
+            None, defaults to ``Config.TTS_PROCESSES`` on CPU and 1 on GPU.
+
+        Returns
+        -------
+        wavs : list of np.ndarray
+            Synthesized waveform of each text at the model's output
+            sample rate.
+        """
+        synthesizer = self.tts_model.synthesizer
+        language_id = self._language_id(target_language)
+
+        sentences = [
+            synthesizer.split_into_sentences(text) if text.strip() else []
+            for text in texts
+        ]
+        processes = self._process_count() if processes is None else processes
+        jobs = [
+            (speaker_embedding, sentence, language_id)
+            for text_sentences in sentences
+            for sentence in text_sentences
+        ]
+
+        wavs = []
+        pool = self._pool
+        if processes > 1 and len(jobs) > 1 and pool is not None:
+            wavs = self._synthesize_in_pool(pool, jobs)
+        # Sentences the pool did not synthesize, if any
+        for job in jobs[len(wavs) :]:
+            check_cancelled("the next sentence")
+            wavs.append(self._synthesize_sentence(*job))
+
+        overlap = round(synthesizer.output_sample_rate * Config.CROSSFADE_MS / 1000)
+        remaining = iter(wavs)
+        return [
+            (
+                crossfade_concat([next(remaining) for _ in text_sentences], overlap)
+                if text_sentences
+                else np.zeros(0, dtype=np.float32)
+            )
+            for text_sentences in sentences
+        ]
+
+    def _language_id(self, language):
+        """Get the model's id of a language, None for monolingual models."""
+        synthesizer = self.tts_model.synthesizer
+        language_manager = getattr(synthesizer.tts_model, "language_manager", None)
+        if language_manager is None:
+            return None
+        return language_manager.name_to_id.get(language)
+
+    def _synthesize_sentence(self, speaker_embedding, sentence, language_id):
+        """
+        Synthesize a single sentence.
+
+        Parameters
+        ----------
+        speaker_embedding : list of float
+            Speaker embedding of the voice to clone.
+        sentence : str
+            Sentence to synthesize.
+        language_id : int or None
+            Model language id.
+
+        Returns
+        -------
+        wav : np.ndarray
+            Synthesized waveform.
+        """
+        synthesizer = self.tts_model.synthesizer
+        outputs = synthesis(
+            model=synthesizer.tts_model,
+            text=sentence,
+            CONFIG=synthesizer.tts_config,
+            use_cuda=synthesizer.use_cuda,
+            d_vector=speaker_embedding,
+            language_id=language_id,
+        )
+        return np.asarray(outputs["wav"]).squeeze()
+
+    def _synthesize_in_pool(self, pool, jobs):
+        """
+        Synthesize sentences in the forked workers, in order.
+
+        Parameters
+        ----------
+        pool : ProcessPoolExecutor
+            Running synthesis workers.
+        jobs : list of tuple
+            ``(speaker_embedding, sentence, language_id)`` of each sentence.
+
+        Returns
+        -------
+        wavs : list of np.ndarray
+            Waveforms of the leading sentences; fewer than ``jobs`` if a
+            worker died, after which the pool is no longer used.
+        """
+        wavs = []
+        futures = []
+        try:
+            futures = [pool.submit(_synthesize_in_worker, job) for job in jobs]
+            for future in futures:
+                check_cancelled("the next sentence")
+                wavs.append(future.result())
+        except BrokenProcessPool as e:
+            logger.error(f"Synthesis worker died, synthesizing in-process: {e}")
+            with self._pool_lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False)
+        finally:
+            for future in futures:
+                future.cancel()
+        return wavs
+
+    def _process_count(self):
+        """Get the synthesis processes to use; forked workers cannot use a GPU."""
+        return Config.TTS_PROCESSES if self.device == "cpu" else 1
+
+    def start_workers(self):
+        """
+        Fork the sentence synthesis workers, if configured.
+
+        Call once at startup, after the model is loaded and before any
+        background thread starts: a child forked while other threads hold
+        locks can hang on them. Workers share the loaded weights with this
+        process instead of loading their own copy. On a GPU, or with
+        ``TTS_PROCESSES=1``, nothing is started.
+        """
+        global _fork_cloner  # pylint: disable=global-statement
+
+        processes = self._process_count()
+        with self._pool_lock:
+            if self._pool is not None or self.tts_model is None or processes <= 1:
+                return
+
+            logger.info(f"Forking {processes} synthesis workers")
+            _fork_cloner = self
+            self._pool = ProcessPoolExecutor(
+                processes,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_synthesis_worker,
+            )
+            # Workers are forked on the first submission, so fork them now
+            self._pool.submit(int).result()
+
+    def close(self):
+        """Let the synthesis workers, if any, exit once their work is done."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
     def _mock_clone(self, output_path):
         """
-        Create a placeholder audio file for testing.
+        Create a silent placeholder audio file for testing.
 
         Parameters
         ----------
@@ -178,12 +701,30 @@ class VoiceCloner:
         """
         logger.info("Creating mock audio file")
 
-        # Just create an empty file as placeholder
-        with open(output_path, "wb") as f:
-            f.write(b"")
+        # Write a second of silence so the output still decodes downstream
+        sample_rate = MOCK_SAMPLE_RATE
+        if self.tts_model is not None:
+            sample_rate = self.tts_model.synthesizer.output_sample_rate
+        soundfile.write(
+            output_path, np.zeros(sample_rate, dtype=np.float32), sample_rate
+        )
 
         return output_path
 
+    def embedding_sample_rate(self):
+        """
+        Get the sample rate the speaker encoder consumes.
+
+        Returns
+        -------
+        sample_rate : int or None
+            Encoder sample rate, or None if no TTS model is loaded.
+        """
+        if self.tts_model is None:
+            return None
+        speaker_manager = self.tts_model.synthesizer.tts_model.speaker_manager
+        return speaker_manager.encoder_ap.sample_rate
+
     def is_available(self):
         """
         Check if voice cloning is available.
@@ -213,3 +754,17 @@ class VoiceCloner:
         if self.tts_model is not None:
             return {"available": True, "device": self.device, "model_loaded": True}
         return {"available": False, "device": None, "model_loaded": False}
+
+    def memory_bytes(self):
+        """
+        Get the memory taken by the TTS model's weights.
+
+        Returns
+        -------
+        size : int
+            Bytes of parameters and buffers, 0 in mock mode.
+        """
+        if not isinstance(self.tts_model, torch.nn.Module):
+            return 0
+        tensors = [*self.tts_model.parameters(), *self.tts_model.buffers()]
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
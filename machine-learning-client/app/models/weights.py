@@ -0,0 +1,206 @@
+"""
+Memory-mapped model weights shared between worker processes
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+from typing import Dict, Optional, Tuple
+
+import torch
+import whisper
+from safetensors.torch import save_file
+
+from app.config import Config
+from app.models.artifacts import load_whisper_checkpoint
+
+logger = logging.getLogger(__name__)
+
+# safetensors dtype names
+DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+
+def cache_path(name: str) -> Optional[str]:
+    """
+    Get the path of a model's converted weights in the cache directory.
+
+    Parameters
+    ----------
+    name : str
+        Model name, e.g. 'whisper-base'.
+
+    Returns
+    -------
+    path : str or None
+        Path of the safetensors file, or None when ``WEIGHTS_CACHE_DIR``
+        is not set.
+    """
+    if not Config.WEIGHTS_CACHE_DIR:
+        return None
+    safe_name = name.replace("/", "--")
+    return os.path.join(Config.WEIGHTS_CACHE_DIR, f"{safe_name}.safetensors")
+
+
+def save_weights(module: torch.nn.Module, path: str, metadata: Dict[str, str]):
+    """
+    Write a module's weights to a safetensors file.
+
+    The file is written next to its destination and renamed into place,
+    so workers starting at the same time never map a partial file.
+    Tensors sharing memory are stored once.
+
+    Parameters
+    ----------
+    module : torch.nn.Module
+        Module whose state dict is saved.
+    path : str
+        Destination file.
+    metadata : dict
+        String metadata stored in the file header.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tensors = {}
+    seen = set()
+    for name, tensor in module.state_dict().items():
+        key = (tensor.data_ptr(), tensor.dtype, tuple(tensor.shape))
+        if tensor.numel() and key in seen:
+            continue
+        seen.add(key)
+        tensors[name] = tensor.detach().cpu().contiguous()
+
+    partial = f"{path}.{os.getpid()}.tmp"
+    save_file(tensors, partial, metadata=metadata)
+    os.replace(partial, path)
+    logger.info(f"Converted weights to {path}")
+
+
+def map_weights(path: str) -> Tuple[Dict[str, torch.Tensor], Dict[str, str]]:
+    """
+    Map a safetensors file into memory without reading it.
+
+    The file is mapped copy-on-write: every process mapping it shares
+    the same page cache pages, and a page is only copied if a process
+    writes to it.
+
+    Parameters
+    ----------
+    path : str
+        Safetensors file.
+
+    Returns
+    -------
+    tensors : dict
+        Tensors backed by the mapping, by name.
+    metadata : dict
+        String metadata from the file header.
+    """
+    with open(path, "rb") as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    (header_size,) = struct.unpack("<Q", buffer[:8])
+    header = json.loads(buffer[8 : 8 + header_size])
+    metadata = header.pop("__metadata__", {}) or {}
+    data_start = 8 + header_size
+
+    tensors = {}
+    for name, info in header.items():
+        dtype = DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        count = (end - begin) // dtype.itemsize
+        if count:
+            flat = torch.frombuffer(
+                buffer, dtype=dtype, count=count, offset=data_start + begin
+            )
+        else:
+            flat = torch.empty(0, dtype=dtype)
+        tensors[name] = flat.reshape(info["shape"])
+
+    return tensors, metadata
+
+
+def share_weights(module: torch.nn.Module, name: str) -> torch.nn.Module:
+    """
+    Swap a loaded module's weights for memory-mapped shared copies.
+
+    The weights are converted to the cache on first use. The module's
+    private tensors are replaced by tensors backed by the mapped file and
+    freed. Tied tensors stored once keep their private copy.
+
+    Parameters
+    ----------
+    module : torch.nn.Module
+        Module with its weights loaded, on the CPU.
+    name : str
+        Model name the cache file is named after.
+
+    Returns
+    -------
+    module : torch.nn.Module
+        The same module, backed by the cache file when
+        ``WEIGHTS_CACHE_DIR`` is set.
+    """
+    path = cache_path(name)
+    if path is None:
+        return module
+
+    if not os.path.exists(path):
+        save_weights(module, path, {"name": name})
+
+    tensors, _ = map_weights(path)
+    result = module.load_state_dict(tensors, strict=False, assign=True)
+    if result.missing_keys:
+        logger.info(f"{len(result.missing_keys)} tied tensors of {name} kept private")
+    return module
+
+
+def load_whisper(model_size: str) -> whisper.model.Whisper:
+    """
+    Load a Whisper model, from memory-mapped weights when caching.
+
+    Once converted, the model is built from the mapped file without
+    reading the original checkpoint again. Mapped weights live in host
+    memory, so with a GPU available the checkpoint is loaded as usual and
+    Whisper places the model on it.
+
+    Parameters
+    ----------
+    model_size : str
+        Whisper model size.
+
+    Returns
+    -------
+    model : whisper.model.Whisper
+        Loaded model.
+    """
+    path = cache_path(f"whisper-{model_size}")
+    if path is None or torch.cuda.is_available():
+        return load_whisper_checkpoint(model_size)
+
+    if not os.path.exists(path):
+        model = load_whisper_checkpoint(model_size, device="cpu")
+        save_weights(model, path, {"dims": json.dumps(vars(model.dims))})
+
+    tensors, metadata = map_weights(path)
+    dims = whisper.model.ModelDimensions(**json.loads(metadata["dims"]))
+    # The freshly initialized tensors are freed as the mapped ones replace them
+    model = whisper.model.Whisper(dims)
+    model.load_state_dict(tensors, assign=True)
+    model.set_alignment_heads(
+        whisper._ALIGNMENT_HEADS[model_size]  # pylint: disable=protected-access
+    )
+    logger.info(f"Mapped Whisper {model_size} weights from {path}")
+    return model
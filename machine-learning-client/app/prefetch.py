@@ -0,0 +1,183 @@
+"""
+Download, verify and pre-convert every configured model
+
+Usage::
+
+    MODEL_CACHE_DIR=/opt/models python -m app.prefetch [--convert]
+    MODEL_CACHE_DIR=/opt/models python -m app.prefetch --verify
+"""
+
+import argparse
+import logging
+import os
+import sys
+from typing import Dict, List
+
+import whisper
+from TTS.api import TTS
+from TTS.utils.manage import ModelManager
+
+from app.config import Config
+from app.models.artifacts import (
+    configured_models,
+    read_manifest,
+    record_artifact,
+    tts_key,
+    tts_model_dir,
+    use_tts_cache,
+    verify_artifact,
+    whisper_key,
+    whisper_root,
+    whisper_sha256,
+)
+from app.models.voice_cloner import VoiceCloner
+from app.models.weights import load_whisper
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_whisper(model_size: str) -> Dict:
+    """
+    Download a Whisper checkpoint into the cache and record it.
+
+    Whisper checks the download against its published SHA256 checksum.
+
+    Parameters
+    ----------
+    model_size : str
+        Whisper model size.
+
+    Returns
+    -------
+    files : dict
+        Manifest entry of the checkpoint.
+    """
+    path = whisper._download(  # pylint: disable=protected-access
+        whisper._MODELS[model_size],  # pylint: disable=protected-access
+        whisper_root(),
+        False,
+    )
+    return record_artifact(whisper_key(model_size), [path])
+
+
+def fetch_tts(model_name: str) -> Dict:
+    """
+    Download a Coqui TTS model into the cache and record it.
+
+    Parameters
+    ----------
+    model_name : str
+        Coqui TTS model name.
+
+    Returns
+    -------
+    files : dict
+        Manifest entry of the model's files.
+    """
+    use_tts_cache()
+    manager = ModelManager(models_file=TTS.get_models_file_path(), progress_bar=False)
+    manager.download_model(model_name)
+
+    model_dir = tts_model_dir(model_name)
+    paths = [
+        os.path.join(root, name)
+        for root, _, names in os.walk(model_dir)
+        for name in names
+    ]
+    return record_artifact(tts_key(model_name), paths)
+
+
+def verify_models(models: Dict[str, List[str]]) -> List[str]:
+    """
+    Check every cached model file against its recorded checksum.
+
+    Whisper checkpoints are also checked against their published
+    checksums.
+
+    Parameters
+    ----------
+    models : dict
+        Model names by kind, as returned by ``configured_models``.
+
+    Returns
+    -------
+    problems : list of str
+        What is wrong with the cache, empty if it is intact.
+    """
+    manifest = read_manifest()
+    problems = []
+    for model_size in models["whisper"]:
+        key = whisper_key(model_size)
+        found = verify_artifact(key)
+        checksums = [entry["sha256"] for entry in manifest.get(key, {}).values()]
+        if not found and checksums != [whisper_sha256(model_size)]:
+            found = [f"{key} does not match the published checksum"]
+        problems.extend(found)
+    for model_name in models["tts"]:
+        problems.extend(verify_artifact(tts_key(model_name)))
+    return problems
+
+
+def convert_models(models: Dict[str, List[str]]):
+    """
+    Pre-convert cached models into ``WEIGHTS_CACHE_DIR``.
+
+    Loading a model once writes its memory-mappable safetensors file, so
+    workers skip the conversion at startup.
+
+    Parameters
+    ----------
+    models : dict
+        Model names by kind, as returned by ``configured_models``.
+    """
+    for model_size in models["whisper"]:
+        load_whisper(model_size)
+    for model_name in models["tts"]:
+        VoiceCloner(model_name).close()
+
+
+def main(argv=None) -> int:
+    """Run the prefetch from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="only check the cached files against their checksums",
+    )
+    parser.add_argument(
+        "--convert",
+        action="store_true",
+        help="also write memory-mappable weights to WEIGHTS_CACHE_DIR",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if not Config.MODEL_CACHE_DIR:
+        parser.error("MODEL_CACHE_DIR is not set")
+    if args.convert and not Config.WEIGHTS_CACHE_DIR:
+        parser.error("--convert requires WEIGHTS_CACHE_DIR")
+
+    models = configured_models()
+    if not args.verify:
+        os.makedirs(Config.MODEL_CACHE_DIR, exist_ok=True)
+        for model_size in models["whisper"]:
+            logger.info(f"Fetching Whisper {model_size}")
+            fetch_whisper(model_size)
+        for model_name in models["tts"]:
+            logger.info(f"Fetching {model_name}")
+            fetch_tts(model_name)
+
+    problems = verify_models(models)
+    for problem in problems:
+        logger.error(problem)
+    if problems:
+        return 1
+
+    if args.convert:
+        convert_models(models)
+    logger.info(f"Model cache {Config.MODEL_CACHE_DIR} is complete")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
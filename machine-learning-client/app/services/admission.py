@@ -0,0 +1,264 @@
+"""
+Admission control by estimated processing cost
+"""
+
+import logging
+import math
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Starting real-time factors (processing seconds per second of audio) of the
+# whole pipeline on CPU, by Whisper model size, until jobs have been measured
+DEFAULT_RTF = {
+    "tiny": 0.6,
+    "base": 0.8,
+    "small": 1.5,
+    "medium": 3.0,
+    "large": 6.0,
+}
+# Assumed bitrate of uploads whose duration cannot be probed (128 kbit/s)
+UNKNOWN_BYTES_PER_SECOND = 16_000
+# Weight of the newest measurement in the moving real-time factor
+RTF_SMOOTHING = 0.2
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when accepting a job would exceed the backlog bound."""
+
+    def __init__(self, backlog: float, retry_after: int):
+        super().__init__(
+            f"Service is backlogged with {backlog:.0f}s of work, retry later"
+        )
+        self.backlog = backlog
+        self.retry_after = retry_after
+
+
+# Models a job runs with: Whisper model size and TTS model name
+Model = Tuple[str, str]
+
+
+class AdmissionController:
+    """
+    Admits jobs while the projected backlog stays within a bound.
+
+    The cost of a job is its audio duration times the measured real-time
+    factor of the models it runs with, so a job on a fast model is not
+    priced like one on an accurate model. Admitted jobs add their cost to
+    the backlog until they finish. A new job is projected to finish once
+    the backlog, spread over the scheduler's run slots, is worked off and
+    the job itself has run; it is rejected when that is more than
+    ``max_backlog`` seconds away. An idle service admits any job.
+
+    Attributes
+    ----------
+    max_backlog : float
+        Longest projected wait, in seconds, before new jobs are rejected.
+    workers : int
+        Jobs processed at the same time.
+    rtf : float
+        Starting real-time factor of models without a seed.
+    """
+
+    def __init__(
+        self,
+        max_backlog: float,
+        workers: int,
+        rtf: float,
+        seeds: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Initialize the controller.
+
+        Parameters
+        ----------
+        max_backlog : float
+            Longest projected wait, in seconds, before new jobs are
+            rejected; 0 admits everything.
+        workers : int
+            Jobs processed at the same time.
+        rtf : float
+            Starting real-time factor estimate of models without a seed.
+        seeds : dict, optional
+            Starting real-time factor estimates by Whisper model size.
+        """
+        self.max_backlog = max_backlog
+        self.workers = max(1, workers)
+        self.rtf = rtf
+
+        self._lock = threading.Lock()
+        self._backlog = 0.0
+        # Seeds by Whisper model size, then measurements by model pair
+        self._rtfs: Dict[object, float] = dict(seeds or {})
+        self._counters = {"admitted": 0, "rejected": 0}
+
+    def real_time_factor(self, model: Optional[Model] = None) -> float:
+        """
+        Get the current real-time factor estimate of a model.
+
+        Parameters
+        ----------
+        model : tuple of str, optional
+            Whisper model size and TTS model name.
+
+        Returns
+        -------
+        rtf : float
+            Processing seconds per second of audio.
+        """
+        if model in self._rtfs:
+            return self._rtfs[model]
+        return self._rtfs.get(model[0], self.rtf) if model else self.rtf
+
+    def estimate(self, duration: float, model: Optional[Model] = None) -> float:
+        """
+        Estimate the processing seconds a clip will take.
+
+        Parameters
+        ----------
+        duration : float
+            Audio duration in seconds.
+        model : tuple of str, optional
+            Whisper model size and TTS model name the clip runs with.
+
+        Returns
+        -------
+        cost : float
+            Estimated processing seconds.
+        """
+        return max(0.0, duration) * self.real_time_factor(model)
+
+    @contextmanager
+    def admit(
+        self,
+        duration: float,
+        timeout: Optional[float] = None,
+        model: Optional[Model] = None,
+    ):
+        """
+        Admit a job and count its cost as backlog until the block ends.
+
+        Parameters
+        ----------
+        duration : float
+            Audio duration of the job in seconds.
+        timeout : float, optional
+            Seconds the client will wait; a job that is projected to
+            finish later is rejected too.
+        model : tuple of str, optional
+            Whisper model size and TTS model name the job runs with.
+
+        Yields
+        ------
+        cost : float
+            Estimated processing seconds of the job.
+
+        Raises
+        ------
+        AdmissionRejectedError
+            If the job is projected to finish more than ``max_backlog``
+            (or ``timeout``) seconds from now.
+        """
+        with self._lock:
+            cost = self.estimate(duration, model)
+            projected = self._backlog / self.workers + cost
+            bounds = [self.max_backlog] if self.max_backlog > 0 else []
+            if timeout and timeout > 0:
+                bounds.append(timeout)
+            bound = min(bounds, default=0)
+
+            if self._backlog > 0 and bound and projected > bound:
+                self._counters["rejected"] += 1
+                logger.warning(
+                    f"Rejected {duration:.0f}s clip, projected to finish in "
+                    f"{projected:.0f}s"
+                )
+                raise AdmissionRejectedError(
+                    self._backlog, max(1, math.ceil(projected - bound))
+                )
+            self._backlog += cost
+            self._counters["admitted"] += 1
+
+        try:
+            yield cost
+        finally:
+            with self._lock:
+                self._backlog = max(0.0, self._backlog - cost)
+
+    def observe(self, duration: float, seconds: float, model: Optional[Model] = None):
+        """
+        Update the real-time factor of a model from a finished job.
+
+        Parameters
+        ----------
+        duration : float
+            Audio duration of the job in seconds.
+        seconds : float
+            Seconds the job took to process, excluding queueing.
+        model : tuple of str, optional
+            Whisper model size and TTS model name the job ran with.
+        """
+        if duration <= 0:
+            return
+        with self._lock:
+            rtf = self.real_time_factor(model)
+            self._rtfs[model] = rtf + RTF_SMOOTHING * (seconds / duration - rtf)
+
+    def stats(self) -> Dict:
+        """
+        Get admission metrics.
+
+        Returns
+        -------
+        stats : dict
+            Dictionary with admission metrics:
+            - backlog_seconds : float
+                Estimated processing seconds of admitted, unfinished jobs
+            - rtf : dict
+                Real-time factor estimate of each measured model, keyed
+                by ``transcriber/tts``
+            - admitted : int
+                Jobs admitted
+            - rejected : int
+                Jobs rejected because of the backlog
+        """
+        with self._lock:
+            return {
+                "backlog_seconds": self._backlog,
+                "rtf": {
+                    "/".join(model) if model else "default": rtf
+                    for model, rtf in self._rtfs.items()
+                    if not isinstance(model, str)
+                },
+                **self._counters,
+            }
+
+
+_admission: Optional[AdmissionController] = None
+_admission_lock = threading.Lock()
+
+
+def get_admission() -> AdmissionController:
+    """
+    Get the process-wide admission controller.
+
+    Returns
+    -------
+    admission : AdmissionController
+        Controller configured from ``Config``.
+    """
+    global _admission  # pylint: disable=global-statement
+
+    with _admission_lock:
+        if _admission is None:
+            _admission = AdmissionController(
+                max_backlog=Config.MAX_BACKLOG_SECONDS,
+                workers=Config.MAX_CONCURRENT_JOBS,
+                rtf=1.0,
+                seeds=DEFAULT_RTF,
+            )
+        return _admission
@@ -0,0 +1,161 @@
+"""
+Joining and timing alignment of synthesized audio
+"""
+
+import logging
+from typing import List, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def crossfade_concat(wavs: Sequence[np.ndarray], overlap: int) -> np.ndarray:
+    """
+    Join waveforms with short linear crossfades.
+
+    Each join overlaps the end of one waveform with the start of the next
+    so sentence boundaries do not click.
+
+    Parameters
+    ----------
+    wavs : sequence of np.ndarray
+        Mono waveforms in playback order.
+    overlap : int
+        Samples to crossfade at each join; shortened for very short
+        waveforms.
+
+    Returns
+    -------
+    audio : np.ndarray
+        Joined float32 waveform.
+    """
+    wavs = [np.asarray(wav, dtype=np.float32) for wav in wavs if len(wav)]
+    if not wavs:
+        return np.zeros(0, dtype=np.float32)
+
+    audio = wavs[0]
+    for wav in wavs[1:]:
+        n = min(overlap, len(audio), len(wav))
+        if n <= 0:
+            audio = np.concatenate([audio, wav])
+            continue
+
+        fade_in = np.linspace(0.0, 1.0, n, dtype=np.float32)
+        joint = audio[-n:] * (1.0 - fade_in) + wav[:n] * fade_in
+        audio = np.concatenate([audio[:-n], joint, wav[n:]])
+
+    return audio
+
+
+def stretch_to_length(wav: np.ndarray, length: int) -> np.ndarray:
+    """
+    Resample a waveform to an exact number of samples.
+
+    Uses vectorized linear interpolation, which shortens or lengthens the
+    audio (and shifts its pitch proportionally).
+
+    Parameters
+    ----------
+    wav : np.ndarray
+        Mono waveform.
+    length : int
+        Number of samples wanted.
+
+    Returns
+    -------
+    wav : np.ndarray
+        Resampled float32 waveform of ``length`` samples.
+    """
+    wav = np.asarray(wav, dtype=np.float32)
+    if length <= 0 or len(wav) == 0:
+        return np.zeros(max(length, 0), dtype=np.float32)
+    if len(wav) == length:
+        return wav
+
+    positions = np.linspace(0, len(wav) - 1, length)
+    return np.interp(positions, np.arange(len(wav)), wav).astype(np.float32)
+
+
+def fit_to_window(wav: np.ndarray, window: int, max_stretch: float) -> np.ndarray:
+    """
+    Compress a waveform to fit a time window.
+
+    Audio already shorter than the window is returned unchanged (it is
+    padded with silence when placed). Longer audio is sped up, but never
+    by more than ``max_stretch``, so speech stays intelligible; it then
+    overruns the window instead.
+
+    Parameters
+    ----------
+    wav : np.ndarray
+        Mono waveform.
+    window : int
+        Samples available for the segment.
+    max_stretch : float
+        Largest speed-up factor allowed.
+
+    Returns
+    -------
+    wav : np.ndarray
+        Waveform of at most ``max(window, len(wav) / max_stretch)`` samples.
+    """
+    if len(wav) <= window:
+        return np.asarray(wav, dtype=np.float32)
+
+    target = max(window, int(np.ceil(len(wav) / max(max_stretch, 1.0))))
+    return stretch_to_length(wav, target)
+
+
+def align_segments(
+    wavs: Sequence[np.ndarray],
+    starts: Sequence[float],
+    ends: Sequence[float],
+    sample_rate: int,
+    max_stretch: float = 1.5,
+) -> np.ndarray:
+    """
+    Place synthesized segments at their source start times.
+
+    Each segment is fitted to its source window and written at its
+    source start time over silence. A segment that still overruns its
+    window delays the following ones rather than overlapping them.
+
+    Parameters
+    ----------
+    wavs : sequence of np.ndarray
+        Synthesized mono waveform of each segment.
+    starts : sequence of float
+        Source start time of each segment in seconds.
+    ends : sequence of float
+        Source end time of each segment in seconds.
+    sample_rate : int
+        Sample rate of the synthesized audio.
+    max_stretch : float, default=1.5
+        Largest speed-up factor applied to a segment.
+
+    Returns
+    -------
+    audio : np.ndarray
+        Float32 waveform at least as long as the source.
+    """
+    placed: List[tuple] = []
+    cursor = 0
+
+    for wav, start, end in zip(wavs, starts, ends):
+        window = max(0, round((end - start) * sample_rate))
+        offset = max(round(start * sample_rate), cursor)
+        fitted = fit_to_window(wav, window, max_stretch)
+        placed.append((offset, fitted))
+        cursor = offset + len(fitted)
+
+    total = max(cursor, round(ends[-1] * sample_rate) if len(ends) else 0)
+    audio = np.zeros(total, dtype=np.float32)
+    for offset, fitted in placed:
+        audio[offset : offset + len(fitted)] = fitted
+
+    overrun = (cursor - round(ends[-1] * sample_rate)) / sample_rate if len(ends) else 0
+    if overrun > 0:
+        logger.info(f"Aligned audio runs {overrun:.2f}s past the source")
+
+    return audio
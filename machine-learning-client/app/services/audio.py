@@ -0,0 +1,88 @@
+"""
+Audio inspection helpers
+"""
+
+import logging
+import subprocess
+from typing import List, Optional
+
+import numpy as np
+import soundfile
+
+logger = logging.getLogger(__name__)
+
+
+def probe_duration(audio_path: str) -> Optional[float]:
+    """
+    Get the duration of an audio file without decoding it.
+
+    Reads the container header with ffprobe, falling back to libsndfile
+    for formats it can read (wav, flac, ogg).
+
+    Parameters
+    ----------
+    audio_path : str
+        Path to the audio file.
+
+    Returns
+    -------
+    duration : float or None
+        Duration in seconds, or None if it could not be determined.
+    """
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=duration",
+        "-of",
+        "default=noprint_wrappers=1:nokey=1",
+        audio_path,
+    ]
+    try:
+        output = subprocess.run(
+            cmd, capture_output=True, check=True, text=True, timeout=10
+        ).stdout
+        return float(output.strip())
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        logger.debug(f"ffprobe failed for {audio_path}: {e}")
+
+    try:
+        return float(soundfile.info(audio_path).duration)
+    except RuntimeError as e:
+        logger.warning(f"Could not determine duration of {audio_path}: {e}")
+        return None
+
+
+def compute_peaks(audio: np.ndarray, points: int) -> List[float]:
+    """
+    Downsample a waveform to peak amplitudes for display.
+
+    The samples are split into ``points`` equal buckets and the largest
+    absolute amplitude of each bucket is kept.
+
+    Parameters
+    ----------
+    audio : np.ndarray
+        Samples, shaped (samples,) or (samples, channels).
+    points : int
+        Number of peaks to return.
+
+    Returns
+    -------
+    peaks : list of float
+        Peak amplitude of each bucket, rounded to 3 decimals. Shorter
+        than ``points`` only when the audio has fewer samples.
+    """
+    amplitude = np.abs(np.asarray(audio, dtype=np.float32))
+    if amplitude.ndim > 1:
+        amplitude = amplitude.max(axis=1)
+
+    points = min(points, len(amplitude))
+    if points <= 0:
+        return []
+
+    # Bucket edges spread any remainder over the buckets
+    edges = np.linspace(0, len(amplitude), points + 1).astype(int)
+    peaks = np.maximum.reduceat(amplitude, edges[:-1])
+    return np.round(peaks.astype(np.float64), 3).tolist()
@@ -0,0 +1,349 @@
+"""
+Background batch translation jobs
+"""
+
+import logging
+import threading
+import time
+import uuid
+import zipfile
+from contextlib import ExitStack, contextmanager
+from typing import BinaryIO, Dict, List, Optional
+
+from pymongo.errors import PyMongoError
+
+from app.config import Config
+from app.db import db
+from app.services.admission import AdmissionRejectedError, get_admission
+from app.services.cancellation import track_job
+from app.services.history import record_result
+from app.services.processor import Processor
+from app.services.scheduler import BULK, get_scheduler
+from app.services.upload import receive_stream
+from app.services.workspace import Workspace
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+
+class TooManyFilesError(Exception):
+    """Raised when an archive holds more audio files than a batch allows."""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Archive has more than {limit} audio files")
+        self.limit = limit
+
+
+class BatchJob:
+    """
+    Progress and per-file results of one batch.
+
+    Attributes
+    ----------
+    id : str
+        Unique batch id.
+    user_id : str
+        Id of the user who submitted the batch.
+    files : list of dict
+        Per-file state with ``file_name``, ``status``, ``result``,
+        ``history_id`` and ``error`` entries, in submission order.
+    """
+
+    def __init__(self, user_id: str, file_names: List[str]):
+        """
+        Initialize a batch with every file queued.
+
+        Parameters
+        ----------
+        user_id : str
+            Id of the user who submitted the batch.
+        file_names : list of str
+            Original names of the files in the batch.
+        """
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.created = time.time()
+        self.finished = None
+        self.files = [
+            {
+                "index": index,
+                "file_name": name,
+                "status": QUEUED,
+                "result": None,
+                "history_id": None,
+                "error": None,
+            }
+            for index, name in enumerate(file_names)
+        ]
+        self._lock = threading.Lock()
+
+    def update(self, index: int, **fields):
+        """
+        Update the state of one file.
+
+        Parameters
+        ----------
+        index : int
+            Position of the file in the batch.
+        **fields
+            Entries of the file state to replace.
+        """
+        with self._lock:
+            self.files[index].update(fields)
+
+    def finish(self):
+        """Mark the batch as finished."""
+        with self._lock:
+            self.finished = time.time()
+
+    def to_dict(self) -> Dict:
+        """
+        Get a snapshot of the batch.
+
+        Returns
+        -------
+        batch : dict
+            Dictionary with batch progress:
+            - batch_id : str
+                Unique batch id
+            - status : str
+                'processing' until every file has finished, then 'done'
+            - total : int
+                Number of files
+            - completed : int
+                Number of finished (done or failed) files
+            - files : list of dict
+                Per-file state
+        """
+        with self._lock:
+            files = [dict(entry) for entry in self.files]
+            finished = self.finished
+
+        completed = sum(entry["status"] in (DONE, FAILED) for entry in files)
+        return {
+            "batch_id": self.id,
+            "status": DONE if finished else PROCESSING,
+            "total": len(files),
+            "completed": completed,
+            "files": files,
+        }
+
+
+_batches: Dict[str, BatchJob] = {}
+_batches_lock = threading.Lock()
+
+
+def get_batch(batch_id: str) -> Optional[BatchJob]:
+    """
+    Look up a batch by id.
+
+    Parameters
+    ----------
+    batch_id : str
+        Unique batch id.
+
+    Returns
+    -------
+    batch : BatchJob or None
+        The batch, or None if unknown or expired.
+    """
+    with _batches_lock:
+        return _batches.get(batch_id)
+
+
+def _prune_batches():
+    """Forget batches that finished more than ``BATCH_RETENTION`` ago."""
+    cutoff = time.time() - Config.BATCH_RETENTION
+    with _batches_lock:
+        expired = [
+            batch_id
+            for batch_id, job in _batches.items()
+            if job.finished and job.finished < cutoff
+        ]
+        for batch_id in expired:
+            del _batches[batch_id]
+
+
+def extract_archive(
+    stream: BinaryIO,
+    workspace: Workspace,
+    allowed_extensions,
+    max_files: Optional[int] = None,
+) -> List[tuple]:
+    """
+    Extract the audio files of a zip archive into a workspace.
+
+    The audio members are counted from the archive's directory before
+    anything is extracted, so an archive over the limit costs no disk.
+    Members are streamed out one at a time and each is size-limited by
+    its actual bytes, not the size claimed in the archive.
+
+    Parameters
+    ----------
+    stream : file-like
+        Seekable binary stream of the zip archive.
+    workspace : Workspace
+        Workspace to extract into.
+    allowed_extensions : set of str
+        File extensions to extract; other members are skipped.
+    max_files : int, optional
+        Most audio files the archive may hold; unlimited if None.
+
+    Returns
+    -------
+    files : list of tuple
+        ``(original_name, path)`` pairs of the extracted files.
+
+    Raises
+    ------
+    TooManyFilesError
+        If the archive holds more than ``max_files`` audio files.
+    """
+    files = []
+    with zipfile.ZipFile(stream) as archive:
+        members = []
+        for member in archive.infolist():
+            name = member.filename.rsplit("/", 1)[-1]
+            extension = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+            if not member.is_dir() and extension in allowed_extensions:
+                members.append((member, name, extension))
+
+        if max_files is not None and len(members) > max_files:
+            raise TooManyFilesError(max_files)
+
+        for member, name, extension in members:
+            path = workspace.file(f"{len(files):04d}.{extension}")
+            with archive.open(member) as source:
+                receive_stream(source, path, decode=False)
+            files.append((name, path))
+
+    return files
+
+
+def _run_batch(
+    job: BatchJob,
+    paths: List[str],
+    workspace: Workspace,
+    same_speaker,
+    admitted: Optional[ExitStack] = None,
+):
+    """Process a batch file by file as bulk work and record each result."""
+    scheduler = get_scheduler()
+
+    @contextmanager
+    def slot(index):
+        # Give the slot back between files so interactive jobs get a turn
+        with scheduler.job(job.user_id, BULK):
+            job.update(index, status=PROCESSING)
+            yield
+
+    def on_result(index, result, error):
+        if error is not None:
+            job.update(index, status=FAILED, error=error)
+            return
+
+        # Save the result before reporting it, so it reaches history even
+        # if nobody polls the batch before it is forgotten
+        try:
+            history_id = record_result(
+                db, job.user_id, result, job.files[index]["file_name"]
+            )
+        except PyMongoError as e:
+            logger.error(f"Could not record batch {job.id} item {index}: {e}")
+            history_id = None
+        job.update(
+            index,
+            status=DONE,
+            result=result,
+            history_id=str(history_id) if history_id else None,
+        )
+
+    try:
+        with track_job(job.id, job.user_id):
+            processor = Processor()
+            processor.process_batch(
+                paths,
+                output_dir=workspace.path,
+                same_speaker=same_speaker,
+                on_result=on_result,
+                slot=slot,
+            )
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.error(f"Batch {job.id} failed: {e}")
+        for entry in job.files:
+            if entry["status"] not in (DONE, FAILED):
+                job.update(entry["index"], status=FAILED, error=str(e))
+    finally:
+        if admitted is not None:
+            admitted.close()
+        workspace.cleanup()
+        job.finish()
+        logger.info(f"Batch {job.id} finished")
+
+
+def start_batch(
+    user_id: str,
+    files: List[tuple],
+    workspace: Workspace,
+    same_speaker=False,
+    duration: float = 0.0,
+) -> BatchJob:
+    """
+    Register a batch and start processing it in the background.
+
+    The batch is admitted by its total audio duration and counts as
+    backlog until it finishes.
+
+    Parameters
+    ----------
+    user_id : str
+        Id of the user who submitted the batch.
+    files : list of tuple
+        ``(original_name, path)`` pairs of the received files.
+    workspace : Workspace
+        Created workspace holding the files; removed when the batch ends.
+    same_speaker : bool, default=False
+        Whether all files are recordings of the same speaker.
+    duration : float, default=0.0
+        Total audio duration of the files in seconds.
+
+    Returns
+    -------
+    job : BatchJob
+        The registered batch.
+
+    Raises
+    ------
+    AdmissionRejectedError
+        If the batch would exceed the backlog bound; the workspace is
+        removed.
+    """
+    _prune_batches()
+
+    admitted = ExitStack()
+    try:
+        admitted.enter_context(
+            get_admission().admit(
+                duration, model=(Config.TRANSCRIBER_MODEL_SIZE, Config.TTS_MODEL_NAME)
+            )
+        )
+    except AdmissionRejectedError:
+        workspace.cleanup()
+        raise
+
+    job = BatchJob(user_id, [name for name, _ in files])
+    with _batches_lock:
+        _batches[job.id] = job
+
+    thread = threading.Thread(
+        target=_run_batch,
+        args=(job, [path for _, path in files], workspace, same_speaker, admitted),
+        daemon=True,
+    )
+    thread.start()
+    logger.info(f"Started batch {job.id} with {len(files)} files")
+    return job
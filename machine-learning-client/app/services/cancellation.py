@@ -0,0 +1,279 @@
+"""
+Request deadlines and cancellation of running jobs
+"""
+
+import logging
+import select
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelledError(Exception):
+    """Raised at a checkpoint of a job that was cancelled."""
+
+    def __init__(self, job_id: str, reason: str):
+        super().__init__(f"Job {job_id} {reason}")
+        self.job_id = job_id
+        self.reason = reason
+
+
+class DeadlineExceededError(JobCancelledError):
+    """Raised at a checkpoint of a job that ran past its deadline."""
+
+
+class CancelToken:
+    """
+    Cancellation state of one job.
+
+    Work checks the token between stages and gives up as soon as the job
+    is cancelled or its deadline has passed, so nobody pays for results
+    the client will never receive.
+
+    Attributes
+    ----------
+    job_id : str
+        Id the job can be cancelled by.
+    user_id : str
+        Id of the user who owns the job.
+    deadline : float or None
+        ``time.monotonic()`` time the job must finish by, if any.
+    """
+
+    def __init__(self, job_id: str, user_id: str, deadline: Optional[float] = None):
+        """
+        Initialize the token.
+
+        Parameters
+        ----------
+        job_id : str
+            Id the job can be cancelled by.
+        user_id : str
+            Id of the user who owns the job.
+        deadline : float, optional
+            ``time.monotonic()`` time the job must finish by.
+        """
+        self.job_id = job_id
+        self.user_id = user_id
+        self.deadline = deadline
+        self.finished = threading.Event()
+        self._reason: Optional[str] = None
+
+    def cancel(self, reason: str = "was cancelled"):
+        """
+        Cancel the job; it stops at its next checkpoint.
+
+        Parameters
+        ----------
+        reason : str, default='was cancelled'
+            Why the job was cancelled, for the error message.
+        """
+        if self._reason is None:
+            self._reason = reason
+            logger.info(f"Job {self.job_id} {reason}")
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the job was cancelled."""
+        return self._reason is not None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline, or None without a deadline."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def check(self, stage: str = "the next stage"):
+        """
+        Stop the job if it was cancelled or is past its deadline.
+
+        Parameters
+        ----------
+        stage : str, default='the next stage'
+            Work about to start, for the error message.
+
+        Raises
+        ------
+        JobCancelledError
+            If the job was cancelled.
+        DeadlineExceededError
+            If the job is past its deadline.
+        """
+        if self._reason is not None:
+            raise JobCancelledError(self.job_id, f"{self._reason} before {stage}")
+
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceededError(
+                self.job_id, f"exceeded its deadline before {stage}"
+            )
+
+
+_current: ContextVar[Optional[CancelToken]] = ContextVar("cancel_token", default=None)
+_jobs: Dict[str, CancelToken] = {}
+_jobs_lock = threading.Lock()
+
+
+@contextmanager
+def track_job(job_id: str, user_id: str, timeout: Optional[float] = None):
+    """
+    Register a job as cancellable for the duration of the block.
+
+    Checkpoints reached on this thread inside the block check the job's
+    token.
+
+    Parameters
+    ----------
+    job_id : str
+        Id the job can be cancelled by.
+    user_id : str
+        Id of the user who owns the job.
+    timeout : float, optional
+        Seconds from now the job must finish in. If None or not positive,
+        the job has no deadline.
+
+    Yields
+    ------
+    token : CancelToken
+        The job's cancellation token.
+    """
+    deadline = time.monotonic() + timeout if timeout and timeout > 0 else None
+    token = CancelToken(job_id, user_id, deadline)
+
+    with _jobs_lock:
+        _jobs[job_id] = token
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
+        token.finished.set()
+        with _jobs_lock:
+            if _jobs.get(job_id) is token:
+                del _jobs[job_id]
+
+
+def current_job() -> Optional[CancelToken]:
+    """Get the token of the job running on this thread, if any."""
+    return _current.get()
+
+
+def check_cancelled(stage: str = "the next stage"):
+    """
+    Checkpoint: stop the current job if it was cancelled or timed out.
+
+    Does nothing outside a tracked job.
+
+    Parameters
+    ----------
+    stage : str, default='the next stage'
+        Work about to start, for the error message.
+    """
+    token = _current.get()
+    if token is not None:
+        token.check(stage)
+
+
+def cancel_job(job_id: str, user_id: str) -> bool:
+    """
+    Cancel a running job.
+
+    Parameters
+    ----------
+    job_id : str
+        Id of the job.
+    user_id : str
+        Id of the user asking; only the job's owner may cancel it.
+
+    Returns
+    -------
+    cancelled : bool
+        False if no such job of the user is running.
+    """
+    with _jobs_lock:
+        token = _jobs.get(job_id)
+
+    if token is None or token.user_id != user_id:
+        return False
+
+    token.cancel()
+    return True
+
+
+def bind(fn: Callable) -> Callable:
+    """
+    Make a function run as part of the current job on other threads.
+
+    The function sees the caller's context: it checks the job's token and
+    its trace spans nest under the caller's span.
+
+    Parameters
+    ----------
+    fn : callable
+        Function to run on a worker thread.
+
+    Returns
+    -------
+    wrapper : callable
+        Function running ``fn`` as part of the caller's job.
+    """
+    context = copy_context()
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        # A context can only be entered by one thread at a time
+        return context.copy().run(fn, *args, **kwargs)
+
+    return wrapper
+
+
+def watch_disconnect(
+    token: CancelToken, sock: socket.socket, interval: float
+) -> Optional[threading.Thread]:
+    """
+    Cancel a job when its client closes the connection.
+
+    The request body must have been read completely: the connection then
+    only becomes readable when the client hangs up.
+
+    Parameters
+    ----------
+    token : CancelToken
+        Token of the job serving the connection.
+    sock : socket.socket
+        Client connection of the request.
+    interval : float
+        Seconds between checks; the watch is disabled if not positive.
+
+    Returns
+    -------
+    thread : threading.Thread or None
+        The watching thread, or None when disabled.
+    """
+    if interval <= 0:
+        return None
+
+    def run():
+        while not token.finished.is_set():
+            try:
+                readable, _, _ = select.select([sock], [], [], interval)
+                if not readable:
+                    continue
+                if sock.recv(1, socket.MSG_PEEK) == b"":
+                    token.cancel("was abandoned by its client")
+            except (OSError, ValueError):
+                token.cancel("was abandoned by its client")
+            # Either the client left or sent more data; nothing more to learn
+            return
+
+    thread = threading.Thread(
+        target=run, name=f"disconnect-{token.job_id}", daemon=True
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,202 @@
+"""
+Output audio encoding and transcoding
+"""
+
+import io
+import logging
+import os
+from typing import BinaryIO, Dict, Optional
+
+import soundfile
+from bson import ObjectId
+from scipy.signal import resample_poly
+
+from app.services.audio import compute_peaks
+
+logger = logging.getLogger(__name__)
+
+# codec -> (libsndfile format, subtype, mimetype, file extension)
+CODECS = {
+    "opus": ("OGG", "OPUS", "audio/ogg", "ogg"),
+    "flac": ("FLAC", "PCM_16", "audio/flac", "flac"),
+    "wav": ("WAV", "PCM_16", "audio/wav", "wav"),
+}
+
+# Sample rates the Opus encoder accepts; anything else is resampled to 48 kHz
+OPUS_SAMPLE_RATES = {8000, 12000, 16000, 24000, 48000}
+
+
+def mimetype_of(codec: str) -> str:
+    """
+    Get the mimetype audio in a codec is served as.
+
+    Parameters
+    ----------
+    codec : str
+        Codec name ('opus', 'flac' or 'wav').
+
+    Returns
+    -------
+    mimetype : str
+        Mimetype of the codec's container.
+    """
+    return CODECS[codec][2]
+
+
+def _write(audio, sample_rate: int, target: BinaryIO, codec: str) -> int:
+    """Write samples in a codec, returning the sample rate actually used."""
+    file_format, subtype, _, _ = CODECS[codec]
+
+    if codec == "opus" and sample_rate not in OPUS_SAMPLE_RATES:
+        audio = resample_poly(audio, 48000, sample_rate, axis=0)
+        sample_rate = 48000
+
+    soundfile.write(target, audio, sample_rate, format=file_format, subtype=subtype)
+    return sample_rate
+
+
+def encode_audio(wav_path: str, codec: str, points: int = 0) -> Dict:
+    """
+    Encode a generated WAV file for storage.
+
+    The encoded file is written next to the input with the codec's file
+    extension. WAV input is left as is when the codec is 'wav'.
+
+    Parameters
+    ----------
+    wav_path : str
+        Path to the WAV file to encode.
+    codec : str
+        Codec to store the audio in ('opus', 'flac' or 'wav').
+    points : int, default=0
+        Number of waveform peaks to compute for display.
+
+    Returns
+    -------
+    encoded : dict
+        Dictionary with the encoded file:
+        - path : str
+            Path to the encoded file
+        - codec : str
+            Codec of the encoded file
+        - mimetype : str
+            Mimetype to serve the file as
+        - duration : float
+            Duration in seconds
+        - sample_rate : int
+            Sample rate of the encoded file
+        - peaks : list of float
+            Downsampled peak amplitudes of the waveform
+
+    Raises
+    ------
+    ValueError
+        If the codec is not supported.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unsupported output codec: {codec}")
+
+    audio, sample_rate = soundfile.read(wav_path, dtype="float32")
+    duration = len(audio) / sample_rate
+    peaks = compute_peaks(audio, points)
+
+    if codec == "wav":
+        output_path = wav_path
+    else:
+        output_path = f"{os.path.splitext(wav_path)[0]}.{CODECS[codec][3]}"
+        sample_rate = _write(audio, sample_rate, output_path, codec)
+        logger.info(
+            f"Encoded {wav_path} as {codec}: {os.path.getsize(wav_path)} -> "
+            f"{os.path.getsize(output_path)} bytes"
+        )
+
+    return {
+        "path": output_path,
+        "codec": codec,
+        "mimetype": mimetype_of(codec),
+        "duration": round(duration, 3),
+        "sample_rate": sample_rate,
+        "peaks": peaks,
+    }
+
+
+def transcode_audio(source: BinaryIO, codec: str) -> bytes:
+    """
+    Transcode stored audio to another codec in memory.
+
+    Parameters
+    ----------
+    source : file-like
+        Binary stream of audio in any codec libsndfile can read.
+    codec : str
+        Codec to transcode to ('opus', 'flac' or 'wav').
+
+    Returns
+    -------
+    data : bytes
+        The transcoded audio.
+
+    Raises
+    ------
+    ValueError
+        If the codec is not supported.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unsupported output codec: {codec}")
+
+    audio, sample_rate = soundfile.read(io.BytesIO(source.read()), dtype="float32")
+    target = io.BytesIO()
+    _write(audio, sample_rate, target, codec)
+    return target.getvalue()
+
+
+def get_transcode(storage, file_id: ObjectId, codec: str) -> Optional[ObjectId]:
+    """
+    Get a stored audio file in another codec, transcoding it once.
+
+    Transcodes are cached in the hot storage tier with ``transcode_of``
+    and ``codec`` metadata, so each format is only produced once per file.
+
+    Parameters
+    ----------
+    storage : AudioStorage
+        Storage holding the audio.
+    file_id : ObjectId
+        Id of the stored audio file.
+    codec : str
+        Codec wanted ('opus', 'flac' or 'wav').
+
+    Returns
+    -------
+    file_id : ObjectId or None
+        Id of the file in the wanted codec (the original if it already
+        is), or None if the original does not exist.
+    """
+    try:
+        original = storage.open(file_id)
+    except FileNotFoundError:
+        return None
+
+    with original:
+        metadata = original.metadata or {}
+        if metadata.get("codec", "wav") == codec:
+            return file_id
+
+        cached_id = storage.find_transcode(file_id, codec)
+        if cached_id is not None:
+            return cached_id
+
+        data = transcode_audio(original, codec)
+
+    name = f"{os.path.splitext(original.filename)[0]}.{CODECS[codec][3]}"
+    transcode_id = storage.put(
+        name,
+        io.BytesIO(data),
+        metadata={
+            "transcode_of": file_id,
+            "codec": codec,
+            "mimetype": mimetype_of(codec),
+        },
+    )
+    logger.info(f"Cached {codec} transcode of {file_id} as {transcode_id}")
+    return transcode_id
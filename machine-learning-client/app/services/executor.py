@@ -0,0 +1,255 @@
+"""
+Bounded executors for concurrent model inference
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import torch
+
+from app.config import Config
+from app.services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorBusyError(Exception):
+    """Raised when an inference queue is full and work is rejected."""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} inference queue is full, retry later")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Limits how many calls run concurrently against one model.
+
+    Calls run on the caller's thread once one of ``slots`` slots is free.
+    Callers waiting for a slot form a queue of at most ``max_queue``
+    entries; further callers are rejected with ``ExecutorBusyError``
+    instead of piling up behind the model.
+
+    Attributes
+    ----------
+    name : str
+        Name of the model this executor guards.
+    slots : int
+        Number of calls allowed to run at the same time.
+    max_queue : int
+        Maximum number of callers waiting for a slot.
+    """
+
+    def __init__(self, name: str, slots: int, max_queue: int):
+        """
+        Initialize the executor.
+
+        Parameters
+        ----------
+        name : str
+            Name of the model this executor guards.
+        slots : int
+            Number of calls allowed to run at the same time.
+        max_queue : int
+            Maximum number of callers waiting for a slot.
+        """
+        self.name = name
+        self.slots = max(1, slots)
+        self.max_queue = max(0, max_queue)
+
+        self._cond = threading.Condition()
+        self._running = 0
+        self._queued = 0
+        self._peak_queued = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_time = 0.0
+        self._run_time = 0.0
+
+    def run(self, fn: Callable, *args, **kwargs):
+        """
+        Run a call once a slot is free.
+
+        Parameters
+        ----------
+        fn : callable
+            Function performing the inference.
+        *args, **kwargs
+            Arguments passed to ``fn``.
+
+        Returns
+        -------
+        result : any
+            Return value of ``fn``.
+
+        Raises
+        ------
+        ExecutorBusyError
+            If all slots are busy and the queue is full.
+        """
+        start_time = time.monotonic()
+
+        with span(f"{self.name}.wait"), self._cond:
+            if self._running >= self.slots and self._queued >= self.max_queue:
+                self._rejected += 1
+                logger.warning(f"Rejected {self.name} call, queue is full")
+                raise ExecutorBusyError(self.name, self._retry_after())
+
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+            while self._running >= self.slots:
+                self._cond.wait()
+            self._queued -= 1
+            self._running += 1
+
+        run_start = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            end_time = time.monotonic()
+            with self._cond:
+                self._running -= 1
+                self._completed += 1
+                self._wait_time += run_start - start_time
+                self._run_time += end_time - run_start
+                self._cond.notify()
+
+    def _retry_after(self) -> int:
+        """Estimate seconds until a queued call would get a slot."""
+        if not self._completed:
+            return 1
+        average = self._run_time / self._completed
+        return max(1, int(average * (self._queued + 1) / self.slots))
+
+    def stats(self) -> Dict:
+        """
+        Get queue and throughput metrics.
+
+        Returns
+        -------
+        stats : dict
+            Dictionary with executor metrics:
+            - slots : int
+                Number of concurrent slots
+            - running : int
+                Calls currently running
+            - queued : int
+                Calls currently waiting for a slot
+            - peak_queued : int
+                Highest queue depth seen
+            - max_queue : int
+                Queue capacity
+            - completed : int
+                Calls finished
+            - rejected : int
+                Calls rejected because the queue was full
+            - avg_wait_time : float
+                Average seconds spent waiting for a slot
+            - avg_run_time : float
+                Average seconds spent running
+        """
+        with self._cond:
+            completed = self._completed or 1
+            return {
+                "slots": self.slots,
+                "running": self._running,
+                "queued": self._queued,
+                "peak_queued": self._peak_queued,
+                "max_queue": self.max_queue,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_time": self._wait_time / completed,
+                "avg_run_time": self._run_time / completed,
+            }
+
+
+_executors: Dict[str, InferenceExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def executor_slots() -> Dict[str, int]:
+    """
+    Get the configured number of slots per kind of model.
+
+    Returns
+    -------
+    slots : dict
+        Mapping of model kind to slot count.
+    """
+    return {
+        "transcriber": Config.TRANSCRIBER_SLOTS,
+        "voice_cloner": Config.VOICE_CLONER_SLOTS,
+    }
+
+
+def get_executor(kind: str, model: Optional[str] = None) -> InferenceExecutor:
+    """
+    Get the shared executor for a model, creating it on first use.
+
+    Each model gets its own slots, so requests picking a fast model do
+    not queue behind requests for a slow one of the same kind.
+
+    Parameters
+    ----------
+    kind : str
+        Model kind ('transcriber' or 'voice_cloner'), which sets the
+        number of slots.
+    model : str, optional
+        Whisper size or TTS model name; one executor serves the whole
+        kind if None.
+
+    Returns
+    -------
+    executor : InferenceExecutor
+        Executor shared by all requests for the model in this process.
+    """
+    name = f"{kind}:{model}" if model else kind
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = InferenceExecutor(
+                name,
+                slots=executor_slots().get(kind, 1),
+                max_queue=Config.INFERENCE_QUEUE_SIZE,
+            )
+        return _executors[name]
+
+
+def executor_stats() -> Dict[str, Dict]:
+    """
+    Get metrics for all executors created so far.
+
+    Returns
+    -------
+    stats : dict
+        Mapping of ``kind:model`` to ``InferenceExecutor.stats()``.
+    """
+    with _executors_lock:
+        executors = dict(_executors)
+    return {name: executor.stats() for name, executor in executors.items()}
+
+
+def configure_torch_threads() -> int:
+    """
+    Size torch's intra-op thread pool for the configured slots.
+
+    Torch's thread pool is shared by the whole process, so each slot gets
+    an equal share of the cores and all slots together use every core
+    once, rather than every concurrent call using every core.
+
+    Returns
+    -------
+    threads : int
+        Number of intra-op threads per call.
+    """
+    threads = Config.TORCH_THREADS_PER_SLOT
+    if threads <= 0:
+        total_slots = sum(executor_slots().values())
+        threads = max(1, (os.cpu_count() or 1) // max(1, total_slots))
+
+    torch.set_num_threads(threads)
+    logger.info(f"Using {threads} torch threads per inference slot")
+    return threads
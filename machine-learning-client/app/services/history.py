@@ -0,0 +1,93 @@
+"""
+Translation history entries of users
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+logger = logging.getLogger(__name__)
+
+
+def history_entry(owner: ObjectId, result: Dict, file_name: str) -> Dict:
+    """
+    Build a history document from a processing result.
+
+    The document has the shape the web app gives the translations it
+    records itself, so batch results show up in history alike.
+
+    Parameters
+    ----------
+    owner : ObjectId
+        Id of the user the translation belongs to.
+    result : dict
+        ``Processor.process_audio_file`` result.
+    file_name : str
+        Original name of the translated file.
+
+    Returns
+    -------
+    entry : dict
+        History document.
+    """
+    timestamp = result.get("timestamp")
+    segments = result.get("segments") or {"start": [], "end": [], "text": []}
+    return {
+        "owner": owner,
+        "timestamp": datetime.fromisoformat(timestamp) if timestamp else None,
+        "source_language": result.get("source_language"),
+        "english_text": result.get("english_text"),
+        "processing_time": result.get("processing_time"),
+        "output_file_id": ObjectId(result.get("output_file_id")),
+        "output_mimetype": result.get("output_mimetype", "audio/wav"),
+        "duration": result.get("duration"),
+        "sample_rate": result.get("sample_rate"),
+        "peaks": result.get("peaks", []),
+        "segments": segments,
+        "segment_count": len(segments["text"]),
+        "aligned": result.get("aligned", False),
+        "voice_profile": result.get("voice_profile", False),
+        "usage": result.get("usage"),
+        "file_name": file_name,
+    }
+
+
+def record_result(
+    database, user_id: str, result: Dict, file_name: str
+) -> Optional[ObjectId]:
+    """
+    Save a processing result to a user's history.
+
+    Parameters
+    ----------
+    database : Database
+        Database with the ``users`` and ``history`` collections.
+    user_id : str
+        Id of the user the translation belongs to.
+    result : dict
+        ``Processor.process_audio_file`` result.
+    file_name : str
+        Original name of the translated file.
+
+    Returns
+    -------
+    entry_id : ObjectId or None
+        Id of the history entry, or None if there is no database or the
+        user id is not a user's.
+    """
+    if database is None:
+        return None
+    try:
+        owner = ObjectId(user_id)
+    except (InvalidId, TypeError):
+        logger.warning(f"Not recording history of unknown user {user_id}")
+        return None
+
+    entry_id = database.history.insert_one(
+        history_entry(owner, result, file_name)
+    ).inserted_id
+    database.users.update_one({"_id": owner}, {"$push": {"history": entry_id}})
+    return entry_id
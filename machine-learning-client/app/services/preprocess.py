@@ -0,0 +1,212 @@
+"""
+Normalization and resampling of uploads before inference
+"""
+
+import logging
+import threading
+from math import gcd
+from typing import Dict, Optional
+
+import numpy as np
+from scipy.signal import resample_poly
+from whisper.audio import SAMPLE_RATE, load_audio
+
+from app.config import Config
+from app.services.reference import FRAME_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Frame energy percentile taken as the level of the speech
+SPEECH_PERCENTILE = 90
+# Highest peak normalization may produce, just under full scale
+PEAK_LIMIT = 0.98
+
+
+def downmix(audio: np.ndarray) -> np.ndarray:
+    """
+    Average the channels of a waveform into one.
+
+    Parameters
+    ----------
+    audio : np.ndarray
+        Mono waveform, or samples by channels.
+
+    Returns
+    -------
+    audio : np.ndarray
+        Mono float32 waveform.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    return audio.mean(axis=1, dtype=np.float32) if audio.ndim == 2 else audio
+
+
+def resample(audio: np.ndarray, orig_rate: int, target_rate: int) -> np.ndarray:
+    """
+    Resample a waveform with a polyphase filter.
+
+    Parameters
+    ----------
+    audio : np.ndarray
+        Mono waveform.
+    orig_rate : int
+        Sample rate of ``audio``.
+    target_rate : int
+        Sample rate to convert to.
+
+    Returns
+    -------
+    audio : np.ndarray
+        Float32 waveform at ``target_rate``.
+    """
+    if orig_rate == target_rate:
+        return audio
+    divisor = gcd(orig_rate, target_rate)
+    return resample_poly(audio, target_rate // divisor, orig_rate // divisor).astype(
+        np.float32
+    )
+
+
+def remove_dc(audio: np.ndarray) -> np.ndarray:
+    """Remove the constant offset of a waveform."""
+    return (audio - audio.mean(dtype=np.float64)).astype(np.float32)
+
+
+def normalize_loudness(
+    audio: np.ndarray, target_dbfs: float, max_gain_db: float
+) -> np.ndarray:
+    """
+    Scale a waveform so its speech sits at a fixed level.
+
+    The level is the RMS of the loudest frames rather than of the whole
+    clip, so pauses do not make speech look quiet. The gain is capped so
+    near-silence is not blown up into noise and peaks stay below clipping.
+
+    Parameters
+    ----------
+    audio : np.ndarray
+        Mono waveform.
+    target_dbfs : float
+        Speech level to reach, in dB relative to full scale.
+    max_gain_db : float
+        Largest gain to apply.
+
+    Returns
+    -------
+    audio : np.ndarray
+        Scaled float32 waveform.
+    """
+    frames = len(audio) // FRAME_SIZE
+    if frames == 0:
+        return audio
+
+    framed = audio[: frames * FRAME_SIZE].reshape(frames, FRAME_SIZE)
+    rms = np.sqrt(np.mean(np.square(framed, dtype=np.float64), axis=1))
+    level = np.percentile(rms, SPEECH_PERCENTILE)
+    peak = np.max(np.abs(audio))
+    if level <= 0 or peak <= 0:
+        return audio
+
+    gain = min(
+        10 ** (target_dbfs / 20) / level,
+        10 ** (max_gain_db / 20),
+        PEAK_LIMIT / peak,
+    )
+    return (audio * gain).astype(np.float32)
+
+
+class PreparedAudio:
+    """
+    Preprocessed waveform of an upload, shared by every model.
+
+    Each model reads the waveform at its own sample rate; a rate is
+    resampled from the prepared audio the first time it is asked for and
+    kept for later readers.
+
+    Attributes
+    ----------
+    audio : np.ndarray
+        Prepared mono waveform at ``sample_rate``.
+    sample_rate : int
+        Sample rate of ``audio``.
+    """
+
+    def __init__(self, audio: np.ndarray, sample_rate: int = SAMPLE_RATE):
+        """
+        Initialize the prepared audio.
+
+        Parameters
+        ----------
+        audio : np.ndarray
+            Prepared mono waveform.
+        sample_rate : int, default=16000
+            Sample rate of ``audio``.
+        """
+        self.audio = audio
+        self.sample_rate = sample_rate
+        self._rates: Dict[int, np.ndarray] = {sample_rate: audio}
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self) -> float:
+        """Seconds of audio."""
+        return len(self.audio) / self.sample_rate
+
+    def at_rate(self, sample_rate: int) -> np.ndarray:
+        """
+        Get the waveform at a sample rate.
+
+        Parameters
+        ----------
+        sample_rate : int
+            Sample rate a model consumes.
+
+        Returns
+        -------
+        audio : np.ndarray
+            Prepared waveform at ``sample_rate``.
+        """
+        with self._lock:
+            if sample_rate not in self._rates:
+                self._rates[sample_rate] = resample(
+                    self.audio, self.sample_rate, sample_rate
+                )
+            return self._rates[sample_rate]
+
+
+def prepare_audio(
+    audio_path: str, audio: Optional[np.ndarray] = None
+) -> Optional[PreparedAudio]:
+    """
+    Decode an upload once and condition it for Whisper and TTS.
+
+    The waveform is downmixed and, with ``Config.PREPROCESS_AUDIO`` on,
+    stripped of DC offset and brought to ``Config.NORMALIZE_DBFS``: quiet
+    or offset recordings otherwise push Whisper into temperature
+    fallbacks, each another full decoding pass.
+
+    Parameters
+    ----------
+    audio_path : str
+        Path to the upload.
+    audio : np.ndarray, optional
+        Already decoded 16 kHz waveform of the upload.
+
+    Returns
+    -------
+    prepared : PreparedAudio or None
+        Prepared 16 kHz audio, or None if the upload could not be decoded
+        and the models should read the file themselves.
+    """
+    if audio is None:
+        try:
+            audio = load_audio(audio_path)
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"Could not decode {audio_path} for preprocessing: {e}")
+            return None
+
+    audio = downmix(audio)
+    if Config.PREPROCESS_AUDIO:
+        audio = normalize_loudness(
+            remove_dc(audio), Config.NORMALIZE_DBFS, Config.MAX_NORMALIZE_GAIN_DB
+        )
+    return PreparedAudio(audio)
@@ -4,25 +4,80 @@ Audio processor logic
 
 import logging
 import os
+from contextlib import nullcontext
 from datetime import datetime
 
-from app.db import gridfs
-from app.models.transcriber import Transcriber
-from app.models.voice_cloner import VoiceCloner
+from app.config import Config
+from app.models.registry import get_transcriber, get_voice_cloner
+from app.services.audio import probe_duration
+from app.services.cancellation import check_cancelled
+from app.services.codec import encode_audio
+from app.services.executor import get_executor
+from app.services.preprocess import prepare_audio
+from app.services.reference import select_reference
+from app.services.storage import get_storage
+from app.services.tracing import span
+from app.services.usage import UsageMeter
 
 logger = logging.getLogger(__name__)
 
 
+def compact_segments(segments):
+    """
+    Convert Whisper segments to compact columnar arrays.
+
+    Whisper's per-segment dicts carry tokens, log probabilities and other
+    decoding details; only the timing and text are kept, one array per
+    field, with times rounded to centiseconds.
+
+    Parameters
+    ----------
+    segments : list of dict
+        Segments as returned by Whisper.
+
+    Returns
+    -------
+    segments : dict
+        Dictionary of equally long arrays:
+        - start : list of float
+            Segment start times in seconds
+        - end : list of float
+            Segment end times in seconds
+        - text : list of str
+            Segment texts
+    """
+    return {
+        "start": [round(float(segment["start"]), 2) for segment in segments],
+        "end": [round(float(segment["end"]), 2) for segment in segments],
+        "text": [segment["text"].strip() for segment in segments],
+    }
+
+
 class Processor:
     """
     Service for audio processing operations.
 
-    Combines transcription and voice cloning functionality.
+    Combines transcription and voice cloning functionality. Models are
+    shared across processors and every inference call goes through the
+    model's bounded executor, so concurrent requests queue for a slot
+    instead of oversubscribing the CPU.
     """
 
-    def __init__(self):
-        self.transcriber = Transcriber()
-        self.voice_cloner = VoiceCloner()
+    def __init__(self, transcriber_size=None, tts_model=None):
+        """
+        Initialize the processor with the shared models it uses.
+
+        Parameters
+        ----------
+        transcriber_size : str, optional
+            Whisper model size. If None, the configured default is used.
+        tts_model : str, optional
+            Coqui TTS model name. If None, the configured default is used.
+        """
+        self.transcriber_size = transcriber_size or Config.TRANSCRIBER_MODEL_SIZE
+        self.tts_model_name = tts_model or Config.TTS_MODEL_NAME
+        self.transcriber = get_transcriber(self.transcriber_size)
+        self.voice_cloner = get_voice_cloner(self.tts_model_name)
         logger.info("AudioProcessor initialized")
 
     def transcribe(self, audio_path, language=None):
@@ -55,12 +110,14 @@ class Processor:
                 Path to the processed audio file
         """
         logger.info(f"Transcribing audio: {audio_path}")
-        result = self.transcriber.transcribe(audio_path, language)
+        result = get_executor("transcriber", self.transcriber_size).run(
+            self.transcriber.transcribe, audio_path, language
+        )
         result["timestamp"] = datetime.utcnow().isoformat()
         result["audio_path"] = audio_path
         return result
 
-    def translate_to_english(self, audio_path):
+    def translate_to_english(self, audio_path, audio=None):
         """
         Translate audio to English.
 
@@ -68,6 +125,8 @@ class Processor:
         ----------
         audio_path : str
             Path to audio file.
+        audio : np.ndarray, optional
+            Already decoded 16 kHz mono waveform of the file.
 
         Returns
         -------
@@ -87,12 +146,22 @@ class Processor:
                 Path to the processed audio file
         """
         logger.info(f"Translating audio: {audio_path}")
-        result = self.transcriber.translate_to_english(audio_path)
+        result = get_executor("transcriber", self.transcriber_size).run(
+            self.transcriber.translate_to_english, audio_path, audio=audio
+        )
         result["timestamp"] = datetime.utcnow().isoformat()
         result["audio_path"] = audio_path
         return result
 
-    def clone_voice(self, reference_audio, text, target_language="en"):
+    def clone_voice(
+        self,
+        reference_audio,
+        text,
+        target_language="en",
+        output_dir=None,
+        speaker_embedding=None,
+        segments=None,
+    ):
         """
         Clone voice and synthesize speech.
 
@@ -104,6 +173,15 @@ class Processor:
             Text to synthesize.
         target_language : str, default='en'
             Target language code for synthesis.
+        output_dir : str, optional
+            Directory to write the generated audio to.
+            If None, the voice cloner's output directory is used.
+        speaker_embedding : list of float, optional
+            Precomputed speaker embedding to use instead of encoding
+            ``reference_audio``.
+        segments : dict, optional
+            Columnar source segments to synthesize one by one, aligned to
+            their source timing.
 
         Returns
         -------
@@ -111,24 +189,56 @@ class Processor:
             Path to the generated audio file.
         """
         logger.info(f"Cloning voice from: {reference_audio}")
-        output_path = self.voice_cloner.clone_and_speak(
-            reference_audio, text, target_language
+        output_path = get_executor("voice_cloner", self.tts_model_name).run(
+            self.voice_cloner.clone_and_speak,
+            reference_audio,
+            text,
+            target_language,
+            output_dir=output_dir,
+            speaker_embedding=speaker_embedding,
+            segments=segments,
         )
         return output_path
 
-    def process_audio_file(self, audio_path):
+    def process_audio_file(
+        self,
+        audio_path,
+        audio=None,
+        output_dir=None,
+        speaker_embedding=None,
+        aligned=False,
+    ):
         """
         Complete workflow: translate and clone voice.
 
         This method performs a complete audio processing pipeline:
-        1. Translates the audio to English text
-        2. Clones the original voice with the translated text
-        3. Uploads the output audio to GridFS
+        1. Decodes the audio once for both models, removing DC offset and
+           normalizing the speech level (see ``prepare_audio``)
+        2. Translates the audio to English text
+        3. Clones the original voice with the translated text, encoding
+           only the cleanest few seconds of speech (see ``select_reference``)
+        4. Compresses the output audio with ``Config.OUTPUT_CODEC`` and
+           stores it in the hot storage tier
+
+        The current job is checked before every step, so a cancelled or
+        timed-out request stops without storing its output.
 
         Parameters
         ----------
         audio_path : str
             Path to input audio file.
+        audio : np.ndarray, optional
+            Already decoded 16 kHz mono waveform of the file, e.g. from
+            streaming decode during upload.
+        output_dir : str, optional
+            Scratch directory for intermediate files, e.g. the request's
+            workspace. If None, the voice cloner's output directory is used.
+        speaker_embedding : list of float, optional
+            Precomputed speaker embedding to clone instead of the voice in
+            ``audio_path``.
+        aligned : bool, default=False
+            Synthesize each translated segment separately and place it at
+            the segment's source time, so the output can dub the source.
 
         Returns
         -------
@@ -143,36 +253,104 @@ class Processor:
             - english_text : str
                 Translated English text
             - output_file_id : str
-                ObjectId of the generated audio file in GridFS
+                ObjectId of the generated audio file in storage
+            - output_mimetype : str
+                Mimetype of the stored audio
+            - duration : float
+                Duration of the generated audio in seconds
+            - sample_rate : int
+                Sample rate of the stored audio
+            - peaks : list of float
+                Downsampled waveform peaks for display
+            - segments : dict
+                Timestamped English segments as columnar ``start``, ``end``
+                and ``text`` arrays
+            - aligned : bool
+                Whether the output audio is aligned to the source timing
+            - reference_seconds : float or None
+                Seconds of selected speech the voice was cloned from, None
+                if a given embedding or the whole file was used
             - processing_time : float
                 Total processing time in seconds
+            - usage : dict
+                CPU and wall seconds by stage, peak RSS, audio durations
+                and real-time factor (see ``UsageMeter.report``)
         """
         logger.info(f"Processing audio file: {audio_path}")
 
-        # Step 1: Translate to English
-        translation_result = self.translate_to_english(audio_path)
-        english_text = translation_result["text"]
-        source_language = translation_result["source_language"]
+        # Meter the job's compute for accounting and capacity planning
+        with UsageMeter() as meter:
+            # Step 1: Decode once and condition the audio for both models
+            check_cancelled("preprocessing")
+            with span("stage.preprocess"), meter.stage("preprocess"):
+                prepared = prepare_audio(audio_path, audio)
+            if prepared is not None:
+                audio = prepared.audio
 
-        # Step 2: Clone voice
-        output_audio_path = self.clone_voice(
-            reference_audio=audio_path, text=english_text, target_language="en"
-        )
+            # Step 2: Translate to English
+            check_cancelled("translation")
+            with span("stage.translate"), meter.stage("translate"):
+                translation_result = self.translate_to_english(audio_path, audio=audio)
+            english_text = translation_result["text"]
+            source_language = translation_result["source_language"]
+            segments = compact_segments(translation_result.get("segments", []))
+
+            # Step 3: Clone voice, encoding only the cleanest few seconds
+            check_cancelled("voice cloning")
+            reference_seconds = None
+            if speaker_embedding is None:
+                with span("stage.reference") as selecting, meter.stage("reference"):
+                    reference, rate = self.select_reference(
+                        prepared, translation_result.get("segments", [])
+                    )
+                    if reference is not None:
+                        speaker_embedding = get_executor(
+                            "voice_cloner", self.tts_model_name
+                        ).run(self.voice_cloner.get_waveform_embedding, reference, rate)
+                        reference_seconds = round(len(reference) / rate, 2)
+                    if selecting:
+                        selecting.set_attribute("seconds", reference_seconds)
+            with span("stage.clone", aligned=aligned), meter.stage("clone"):
+                output_audio_path = self.clone_voice(
+                    reference_audio=audio_path,
+                    text=english_text,
+                    target_language="en",
+                    output_dir=output_dir,
+                    speaker_embedding=speaker_embedding,
+                    segments=segments if aligned else None,
+                )
 
-        # Step 3: Upload output audio to GridFS
-        output_filename = os.path.basename(output_audio_path)
-        with open(output_audio_path, "rb") as audio_file:
-            file_id = gridfs.upload_from_stream(
-                output_filename,
-                audio_file,
-                metadata={
-                    "source_language": source_language,
-                    "english_text": english_text,
-                    "timestamp": datetime.utcnow().isoformat(),
-                },
-            )
-
-        os.remove(output_audio_path)
+            # Step 4: Compress output audio and store it
+            encoded_path = None
+            try:
+                check_cancelled("storing the output")
+                with span("stage.encode", codec=Config.OUTPUT_CODEC), meter.stage(
+                    "encode"
+                ):
+                    encoded = encode_audio(
+                        output_audio_path, Config.OUTPUT_CODEC, Config.WAVEFORM_POINTS
+                    )
+                encoded_path = encoded.pop("path")
+                with open(encoded_path, "rb") as audio_file, meter.stage("store"):
+                    file_id = get_storage().put(
+                        os.path.basename(encoded_path),
+                        audio_file,
+                        metadata={
+                            "source_language": source_language,
+                            "english_text": english_text,
+                            "timestamp": datetime.utcnow().isoformat(),
+                            **encoded,
+                        },
+                    )
+            finally:
+                os.remove(output_audio_path)
+                if encoded_path and encoded_path != output_audio_path:
+                    os.remove(encoded_path)
+
+        if prepared is not None:
+            input_seconds = round(prepared.duration, 2)
+        else:
+            input_seconds = probe_duration(audio_path)
 
         result = {
             "timestamp": datetime.utcnow().isoformat(),
@@ -180,7 +358,120 @@ class Processor:
             "source_language": source_language,
             "english_text": english_text,
             "output_file_id": str(file_id),
+            "output_mimetype": encoded["mimetype"],
+            "duration": encoded["duration"],
+            "sample_rate": encoded["sample_rate"],
+            "peaks": encoded["peaks"],
+            "segments": segments,
+            "aligned": aligned,
+            "reference_seconds": reference_seconds,
             "processing_time": translation_result.get("processing_time", 0),
+            "usage": meter.report(input_seconds, encoded["duration"]),
         }
 
         return result
+
+    def select_reference(self, prepared, segments):
+        """
+        Pick the speech of an upload the voice is cloned from.
+
+        The speech is cut from the prepared audio at the speaker encoder's
+        sample rate, so the encoder never resamples it again.
+
+        Parameters
+        ----------
+        prepared : PreparedAudio or None
+            Prepared audio of the file, None if it could not be decoded.
+        segments : list of dict
+            Whisper segments of the file.
+
+        Returns
+        -------
+        reference : np.ndarray or None
+            Up to ``Config.REFERENCE_SECONDS`` of the cleanest speech, or
+            None to encode the whole file instead.
+        sample_rate : int or None
+            Sample rate of ``reference``.
+        """
+        if (
+            prepared is None
+            or Config.REFERENCE_SECONDS <= 0
+            or not self.voice_cloner.is_available()
+        ):
+            return None, None
+
+        rate = self.voice_cloner.embedding_sample_rate() or prepared.sample_rate
+        reference = select_reference(
+            prepared.at_rate(rate),
+            segments,
+            Config.REFERENCE_SECONDS,
+            rate,
+            no_speech_threshold=Config.REFERENCE_NO_SPEECH_THRESHOLD,
+        )
+        return reference, rate
+
+    def process_batch(
+        self,
+        audio_paths,
+        output_dir=None,
+        same_speaker=False,
+        on_result=None,
+        slot=None,
+    ):
+        """
+        Run the complete workflow on several files back to back.
+
+        Files are processed in order on the already loaded models. When
+        all files share one speaker, the speaker embedding is computed
+        from the first file and reused for the rest.
+
+        Parameters
+        ----------
+        audio_paths : list of str
+            Paths to input audio files.
+        output_dir : str, optional
+            Scratch directory for intermediate files.
+        same_speaker : bool, default=False
+            Whether all files are recordings of the same speaker.
+        on_result : callable, optional
+            Called as ``on_result(index, result, error)`` as soon as each
+            file finishes, with either a result dict or an error message.
+        slot : callable, optional
+            Called as ``slot(index)`` for a context manager held while
+            each file is processed, such as a scheduler slot, so it is
+            released between files.
+
+        Returns
+        -------
+        results : list of dict or None
+            ``process_audio_file`` results in input order, None for files
+            that failed.
+        """
+        logger.info(f"Processing batch of {len(audio_paths)} files")
+        results = []
+        speaker_embedding = None
+
+        for index, audio_path in enumerate(audio_paths):
+            try:
+                with slot(index) if slot is not None else nullcontext():
+                    if same_speaker and speaker_embedding is None:
+                        speaker_embedding = get_executor(
+                            "voice_cloner", self.tts_model_name
+                        ).run(self.voice_cloner.get_speaker_embedding, audio_path)
+
+                    result = self.process_audio_file(
+                        audio_path,
+                        output_dir=output_dir,
+                        speaker_embedding=speaker_embedding,
+                    )
+                error = None
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error(f"Batch item {index} failed: {e}")
+                result = None
+                error = str(e)
+
+            results.append(result)
+            if on_result is not None:
+                on_result(index, result, error)
+
+        return results
@@ -0,0 +1,188 @@
+"""
+Sampling profiler for live traffic
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Iterable, Optional
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Files whose frames on top of a stack mean the thread is waiting, not working
+IDLE_FILES = {"threading.py", "selectors.py", "socketserver.py", "queue.py"}
+
+_process_lock = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a process-wide profile is requested while one runs."""
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the Python stacks of running threads.
+
+    A background thread snapshots every thread's stack with
+    ``sys._current_frames`` each ``interval`` seconds, so the profiled code
+    runs unmodified and the overhead stays constant however hot it is.
+    Time in native code (torch kernels, ffmpeg pipes) is charged to the
+    Python frame calling it.
+
+    Attributes
+    ----------
+    interval : float
+        Seconds between samples.
+    thread_ids : set of int or None
+        Threads to sample, None for every thread.
+    idle : bool
+        Whether to keep samples of threads waiting on locks or sockets.
+    samples : Counter
+        Number of samples per collapsed stack.
+    sample_count : int
+        Number of snapshots taken.
+    """
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        thread_ids: Optional[Iterable[int]] = None,
+        idle: bool = False,
+    ):
+        """
+        Initialize the profiler.
+
+        Parameters
+        ----------
+        interval : float, optional
+            Seconds between samples; ``Config.PROFILE_SAMPLE_INTERVAL`` if None.
+        thread_ids : iterable of int, optional
+            Threads to sample; every thread if None.
+        idle : bool, default=False
+            Whether to keep samples of waiting threads, giving a wall-clock
+            rather than an on-CPU profile.
+        """
+        self.interval = interval or Config.PROFILE_SAMPLE_INTERVAL
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        self.idle = idle
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Start sampling in the background."""
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        """Take samples until stopped."""
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()  # pylint: disable=protected-access
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                if self.thread_ids is not None and ident not in self.thread_ids:
+                    continue
+                if not self.idle and _is_idle(frame):
+                    continue
+                self.samples[_collapse(frame, names.get(ident, str(ident)))] += 1
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        """
+        Render the samples as collapsed stacks.
+
+        Returns
+        -------
+        stacks : str
+            One ``thread;outer;...;inner count`` line per distinct stack,
+            the input format of flamegraph.pl, inferno and speedscope.
+        """
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.samples.most_common()
+        )
+
+
+def _frame_name(frame) -> str:
+    """Name a stack frame by its function and where it is defined."""
+    code = frame.f_code
+    path = code.co_filename
+    if "site-packages" in path:
+        path = path.split("site-packages" + os.sep, 1)[-1]
+    else:
+        path = os.path.basename(path)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+def _collapse(frame, thread_name: str) -> str:
+    """Collapse a stack into one line from its thread down to the leaf."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+def _is_idle(frame) -> bool:
+    """Check whether a thread is blocked waiting rather than working."""
+    return os.path.basename(frame.f_code.co_filename) in IDLE_FILES
+
+
+def profile_process(
+    seconds: float, interval: Optional[float] = None, idle: bool = False
+) -> SamplingProfiler:
+    """
+    Profile every thread of the process for a while.
+
+    Parameters
+    ----------
+    seconds : float
+        How long to sample, capped at ``Config.PROFILE_MAX_SECONDS``.
+    interval : float, optional
+        Seconds between samples.
+    idle : bool, default=False
+        Whether to keep samples of waiting threads.
+
+    Returns
+    -------
+    profiler : SamplingProfiler
+        The finished profiler.
+
+    Raises
+    ------
+    ProfilerBusyError
+        If another process-wide profile is running.
+    """
+    if not _process_lock.acquire(blocking=False):  # pylint: disable=consider-using-with
+        raise ProfilerBusyError("A profile is already running")
+
+    try:
+        seconds = min(seconds, Config.PROFILE_MAX_SECONDS)
+        logger.info(f"Profiling the process for {seconds:.1f}s")
+        with SamplingProfiler(interval, idle=idle) as profiler:
+            time.sleep(seconds)
+        return profiler
+    finally:
+        _process_lock.release()
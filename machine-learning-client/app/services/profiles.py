@@ -0,0 +1,179 @@
+"""
+Enrolled speaker profiles of users
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from pymongo import ASCENDING
+
+from app.db import db
+from app.services.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+
+def average_embeddings(
+    embeddings: Sequence[Sequence[float]],
+    previous: Optional[Sequence[float]] = None,
+    previous_clips: int = 0,
+) -> List[float]:
+    """
+    Average speaker embeddings of several clips into one voice.
+
+    Parameters
+    ----------
+    embeddings : sequence of sequence of float
+        Embeddings of the new clips.
+    previous : sequence of float, optional
+        Average of earlier clips to extend.
+    previous_clips : int, default=0
+        Number of clips ``previous`` averages.
+
+    Returns
+    -------
+    embedding : list of float
+        Mean embedding of all clips, as the TTS speaker encoder averages
+        several reference clips.
+    """
+    total = np.sum(np.asarray(embeddings, dtype=np.float64), axis=0)
+    clips = len(embeddings)
+    if previous is not None and previous_clips > 0:
+        total += np.asarray(previous, dtype=np.float64) * previous_clips
+        clips += previous_clips
+    return (total / clips).tolist()
+
+
+class ProfileStore:
+    """
+    Speaker embeddings enrolled by users, kept in Mongo.
+
+    Embeddings only make sense to the speaker encoder that computed them,
+    so a user has one profile per TTS model.
+
+    Attributes
+    ----------
+    profiles : Collection
+        The ``speaker_profiles`` collection.
+    """
+
+    def __init__(self, database):
+        """
+        Initialize the store.
+
+        Parameters
+        ----------
+        database : Database
+            Database holding the ``speaker_profiles`` collection.
+        """
+        self.profiles = database["speaker_profiles"]
+        self.profiles.create_index(
+            [("user_id", ASCENDING), ("model", ASCENDING)], unique=True
+        )
+
+    @traced("mongo.profile_get")
+    def get(self, user_id: str, model: str) -> Optional[Dict]:
+        """
+        Get a user's profile for a TTS model.
+
+        Parameters
+        ----------
+        user_id : str
+            Id of the user.
+        model : str
+            TTS model name.
+
+        Returns
+        -------
+        profile : dict or None
+            Profile document, or None if the user has not enrolled.
+        """
+        return self.profiles.find_one({"user_id": user_id, "model": model})
+
+    def enroll(
+        self,
+        user_id: str,
+        model: str,
+        embeddings: Sequence[Sequence[float]],
+        append: bool = False,
+    ) -> Dict:
+        """
+        Store the averaged embedding of a user's reference clips.
+
+        Parameters
+        ----------
+        user_id : str
+            Id of the user.
+        model : str
+            TTS model name the embeddings were computed with.
+        embeddings : sequence of sequence of float
+            Embeddings of the reference clips.
+        append : bool, default=False
+            Whether to average the clips into the existing profile instead
+            of replacing it.
+
+        Returns
+        -------
+        profile : dict
+            The stored profile.
+        """
+        previous = self.get(user_id, model) if append else None
+        previous_clips = previous["clips"] if previous else 0
+        now = datetime.utcnow()
+
+        profile = {
+            "user_id": user_id,
+            "model": model,
+            "embedding": average_embeddings(
+                embeddings, previous and previous["embedding"], previous_clips
+            ),
+            "clips": len(embeddings) + previous_clips,
+            "updated": now,
+        }
+        self.profiles.update_one(
+            {"user_id": user_id, "model": model},
+            {"$set": profile, "$setOnInsert": {"created": now}},
+            upsert=True,
+        )
+        logger.info(f"Enrolled {profile['clips']} clips for user {user_id}")
+        return profile
+
+    def delete(self, user_id: str) -> int:
+        """
+        Delete every profile of a user.
+
+        Parameters
+        ----------
+        user_id : str
+            Id of the user.
+
+        Returns
+        -------
+        deleted : int
+            Number of profiles deleted.
+        """
+        return self.profiles.delete_many({"user_id": user_id}).deleted_count
+
+
+_profiles: Optional[ProfileStore] = None
+_profiles_lock = threading.Lock()
+
+
+def get_profiles() -> ProfileStore:
+    """
+    Get the process-wide profile store.
+
+    Returns
+    -------
+    profiles : ProfileStore
+        Store backed by the configured database.
+    """
+    global _profiles  # pylint: disable=global-statement
+
+    with _profiles_lock:
+        if _profiles is None:
+            _profiles = ProfileStore(db)
+        return _profiles
@@ -0,0 +1,154 @@
+"""
+Selection of the cleanest speech to clone a voice from
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Frame length of the SNR estimate (20 ms at 16 kHz)
+FRAME_SIZE = 320
+# Frame energy percentiles taken as the noise floor and the speech level
+NOISE_PERCENTILE = 10
+SPEECH_PERCENTILE = 90
+
+
+def estimate_snr(audio: np.ndarray, frame_size: int = FRAME_SIZE) -> float:
+    """
+    Estimate the signal-to-noise ratio of a stretch of speech.
+
+    Speech pauses between words leave quiet frames that show the noise
+    floor, so the ratio of loud to quiet frame energies approximates the
+    SNR without a separate noise recording.
+
+    Parameters
+    ----------
+    audio : np.ndarray
+        Mono waveform.
+    frame_size : int, default=FRAME_SIZE
+        Samples per energy frame.
+
+    Returns
+    -------
+    snr : float
+        Estimated SNR in dB; 0 for audio shorter than two frames.
+    """
+    frames = len(audio) // frame_size
+    if frames < 2:
+        return 0.0
+
+    framed = audio[: frames * frame_size].reshape(frames, frame_size)
+    rms = np.sqrt(np.mean(np.square(framed, dtype=np.float64), axis=1))
+    noise = np.percentile(rms, NOISE_PERCENTILE)
+    speech = np.percentile(rms, SPEECH_PERCENTILE)
+    return float(20 * np.log10((speech + 1e-8) / (noise + 1e-8)))
+
+
+def score_segments(
+    audio: np.ndarray,
+    segments: List[Dict],
+    sample_rate: int,
+    no_speech_threshold: float,
+) -> List[Dict]:
+    """
+    Rate Whisper segments by how cleanly they capture the speaker.
+
+    Parameters
+    ----------
+    audio : np.ndarray
+        Mono waveform the segments were decoded from.
+    segments : list of dict
+        Whisper segments with ``start``, ``end`` and ``no_speech_prob``.
+    sample_rate : int
+        Sample rate of ``audio``.
+    no_speech_threshold : float
+        Segments more likely than this to hold no speech are skipped.
+
+    Returns
+    -------
+    candidates : list of dict
+        Usable segments, best first, with ``start`` and ``end`` sample
+        indices and their ``score``: the estimated SNR weighted by the
+        probability that the segment is speech.
+    """
+    candidates = []
+    for segment in segments:
+        no_speech_prob = float(segment.get("no_speech_prob", 0.0))
+        if no_speech_prob > no_speech_threshold:
+            continue
+
+        start = max(0, int(float(segment["start"]) * sample_rate))
+        end = min(len(audio), int(float(segment["end"]) * sample_rate))
+        if end <= start:
+            continue
+
+        snr = estimate_snr(audio[start:end])
+        candidates.append(
+            {"start": start, "end": end, "score": snr * (1 - no_speech_prob)}
+        )
+
+    candidates.sort(key=lambda candidate: candidate["score"], reverse=True)
+    return candidates
+
+
+def select_reference(
+    audio: np.ndarray,
+    segments: List[Dict],
+    seconds: float,
+    sample_rate: int,
+    no_speech_threshold: float = 0.5,
+) -> Optional[np.ndarray]:
+    """
+    Extract the best few seconds of speech to clone a voice from.
+
+    The speaker encoder's cost grows with the length of its input while a
+    few seconds of clean speech already pin down the voice, so only the
+    highest scoring segments are kept, up to ``seconds`` in total, joined
+    in their original order.
+
+    Parameters
+    ----------
+    audio : np.ndarray
+        Mono waveform the segments were decoded from.
+    segments : list of dict
+        Whisper segments with ``start``, ``end`` and ``no_speech_prob``.
+    seconds : float
+        Length of reference audio to select.
+    sample_rate : int
+        Sample rate of ``audio``.
+    no_speech_threshold : float, default=0.5
+        Segments more likely than this to hold no speech are skipped.
+
+    Returns
+    -------
+    reference : np.ndarray or None
+        Selected speech, the whole waveform if it is short enough already,
+        or None if no segment holds usable speech.
+    """
+    budget = int(seconds * sample_rate)
+    if len(audio) <= budget:
+        return audio
+
+    candidates = score_segments(audio, segments, sample_rate, no_speech_threshold)
+    if not candidates:
+        return None
+
+    chosen = []
+    remaining = budget
+    for candidate in candidates:
+        length = min(candidate["end"] - candidate["start"], remaining)
+        chosen.append((candidate["start"], candidate["start"] + length))
+        remaining -= length
+        if remaining <= 0:
+            break
+
+    chosen.sort()
+    reference = np.concatenate([audio[start:end] for start, end in chosen])
+    logger.info(
+        f"Selected {len(reference) / sample_rate:.1f}s of reference speech from "
+        f"{len(chosen)} of {len(segments)} segments"
+    )
+    return reference
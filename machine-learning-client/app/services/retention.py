@@ -0,0 +1,241 @@
+"""
+Garbage collection and retention of generated audio
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from bson import ObjectId
+
+from app.config import Config
+from app.db import db
+from app.services.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+
+# Last file id each storage tier's orphan scan examined, to resume from
+_orphan_cursors: Dict[str, Optional[ObjectId]] = {}
+
+
+def collect_orphans(
+    storage,
+    database,
+    grace_period: float,
+    batch_size: int,
+    cursors: Optional[Dict[str, Optional[ObjectId]]] = None,
+) -> Dict:
+    """
+    Delete stored audio that no history entry references.
+
+    Audio is orphaned when the web app fails between the ML client
+    storing the output and the history entry being saved. Files newer
+    than ``grace_period`` are left alone so in-flight requests are not
+    affected. At most ``batch_size`` files per tier are examined and at
+    most ``batch_size`` deleted per call; each tier's scan resumes after
+    the last file the previous call examined and starts over once it
+    reaches the end, so every pass costs the same however many files
+    are stored.
+
+    Parameters
+    ----------
+    storage : AudioStorage
+        Storage holding the audio.
+    database : Database
+        Database with the ``history`` collection.
+    grace_period : float
+        Seconds a new file may stay unreferenced.
+    batch_size : int
+        Most files to check per tier and to delete.
+    cursors : dict, optional
+        Last file id examined per tier, read and updated in place. If
+        None, every tier is scanned from the start.
+
+    Returns
+    -------
+    report : dict
+        Dictionary with ``deleted`` files and ``bytes`` reclaimed.
+    """
+    old = {"uploadDate": {"$lt": datetime.utcnow() - timedelta(seconds=grace_period)}}
+    cursors = {} if cursors is None else cursors
+    report = {"deleted": 0, "bytes": 0}
+
+    # Transcodes are removed together with their original
+    tiers = (
+        ("hot", storage.files, {**old, "metadata.transcode_of": {"$exists": False}}),
+        ("cold", storage.cold, dict(old)),
+    )
+    for tier, collection, query in tiers:
+        if report["deleted"] >= batch_size:
+            break
+
+        if cursors.get(tier) is not None:
+            query["_id"] = {"$gt": cursors[tier]}
+        ids = [
+            doc["_id"]
+            for doc in collection.find(query, {"_id": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+        ]
+        if not ids:
+            cursors[tier] = None
+            continue
+
+        referenced = set(
+            database.history.distinct(
+                "output_file_id", {"output_file_id": {"$in": ids}}
+            )
+        )
+        examined = 0
+        for file_id in ids:
+            if report["deleted"] >= batch_size:
+                break
+            examined += 1
+            if file_id not in referenced:
+                report["bytes"] += storage.delete(file_id)
+                report["deleted"] += 1
+
+        if examined == len(ids) and len(ids) < batch_size:
+            cursors[tier] = None
+        else:
+            cursors[tier] = ids[examined - 1]
+
+    return report
+
+
+def expire_history(storage, database, default_days: int, batch_size: int) -> Dict:
+    """
+    Delete history entries and their audio past each user's retention.
+
+    A user's ``retention_days`` field overrides ``default_days``; 0 keeps
+    translations forever. Entries of users on the default are found by
+    age alone through the ``timestamp`` index, so a pass does not visit
+    every user; only the users with their own setting are expired one by
+    one. At most ``batch_size`` entries are deleted per call.
+
+    Parameters
+    ----------
+    storage : AudioStorage
+        Storage holding the audio.
+    database : Database
+        Database with the ``users`` and ``history`` collections.
+    default_days : int
+        Days to keep translations of users without their own setting.
+    batch_size : int
+        Most history entries to delete.
+
+    Returns
+    -------
+    report : dict
+        Dictionary with ``deleted`` entries and audio ``bytes`` reclaimed.
+    """
+    report = {"deleted": 0, "bytes": 0}
+    now = datetime.utcnow()
+
+    overrides = {
+        user["_id"]: user["retention_days"]
+        for user in database.users.find(
+            {"retention_days": {"$exists": True}}, {"retention_days": 1}
+        )
+    }
+    queries = []
+    if default_days:
+        queries.append(
+            {
+                "owner": {"$nin": list(overrides)},
+                "timestamp": {"$lt": now - timedelta(days=default_days)},
+            }
+        )
+    queries.extend(
+        {"owner": owner, "timestamp": {"$lt": now - timedelta(days=days)}}
+        for owner, days in overrides.items()
+        if days
+    )
+
+    for query in queries:
+        remaining = batch_size - report["deleted"]
+        if remaining <= 0:
+            break
+
+        expired = list(
+            database.history.find(query, {"owner": 1, "output_file_id": 1}).limit(
+                remaining
+            )
+        )
+        if not expired:
+            continue
+
+        entry_ids = [entry["_id"] for entry in expired]
+        for entry in expired:
+            if entry.get("output_file_id") is not None:
+                report["bytes"] += storage.delete(entry["output_file_id"])
+
+        database.history.delete_many({"_id": {"$in": entry_ids}})
+        database.users.update_many(
+            {"_id": {"$in": list({entry["owner"] for entry in expired})}},
+            {"$pull": {"history": {"$in": entry_ids}}},
+        )
+        report["deleted"] += len(entry_ids)
+
+    return report
+
+
+def collect_garbage() -> Dict:
+    """
+    Run one garbage collection pass with the configured limits.
+
+    Returns
+    -------
+    report : dict
+        Dictionary with the pass results:
+        - orphans_deleted : int
+            Unreferenced audio files deleted
+        - expired_deleted : int
+            History entries deleted by retention
+        - bytes_reclaimed : int
+            Audio bytes freed in both storage tiers
+    """
+    storage = get_storage()
+    orphans = collect_orphans(
+        storage, db, Config.GC_GRACE_PERIOD, Config.GC_BATCH_SIZE, _orphan_cursors
+    )
+    expired = expire_history(
+        storage, db, Config.HISTORY_RETENTION_DAYS, Config.GC_BATCH_SIZE
+    )
+
+    report = {
+        "orphans_deleted": orphans["deleted"],
+        "expired_deleted": expired["deleted"],
+        "bytes_reclaimed": orphans["bytes"] + expired["bytes"],
+    }
+    logger.info(f"Garbage collection: {report}")
+    return report
+
+
+def start_gc_thread() -> Optional[threading.Thread]:
+    """
+    Run garbage collection periodically in the background.
+
+    Returns
+    -------
+    thread : threading.Thread or None
+        The collection thread, or None when disabled by ``GC_INTERVAL=0``
+        or when no database is configured.
+    """
+    if Config.GC_INTERVAL <= 0 or db is None:
+        return None
+
+    def run():
+        while True:
+            time.sleep(Config.GC_INTERVAL)
+            try:
+                collect_garbage()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error(f"Garbage collection failed: {e}")
+
+    thread = threading.Thread(target=run, name="audio-gc", daemon=True)
+    thread.start()
+    return thread
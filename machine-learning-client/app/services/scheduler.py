@@ -0,0 +1,292 @@
+"""
+Fair scheduling of translation jobs across users
+"""
+
+import logging
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app.config import Config
+from app.services.cancellation import JobCancelledError, current_job
+from app.services.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+# Seconds between cancellation checks of a job waiting for a slot
+CANCEL_POLL_INTERVAL = 0.5
+
+
+class SchedulerBusyError(Exception):
+    """Raised when a user already has too many jobs waiting."""
+
+    def __init__(self, user_id: str, retry_after: int = 5):
+        super().__init__(f"Too many queued jobs for user {user_id}, retry later")
+        self.user_id = user_id
+        self.retry_after = retry_after
+
+
+def classify(duration: Optional[float]) -> str:
+    """
+    Pick the priority class of a job from its audio duration.
+
+    Parameters
+    ----------
+    duration : float or None
+        Decoded audio duration in seconds. Unknown durations are treated
+        as bulk work.
+
+    Returns
+    -------
+    priority : str
+        'interactive' for short clips, 'bulk' otherwise.
+    """
+    if duration is not None and duration <= Config.INTERACTIVE_MAX_DURATION:
+        return INTERACTIVE
+    return BULK
+
+
+class _Ticket:
+    """A job waiting for, or holding, a run slot."""
+
+    def __init__(self, user_id: str, priority: str):
+        self.user_id = user_id
+        self.priority = priority
+        self.granted = False
+
+
+class FairScheduler:
+    """
+    Admits jobs with per-user fair queuing and priority classes.
+
+    Waiting jobs are kept in one FIFO per user and priority class. When a
+    slot frees up, interactive jobs are served before bulk ones, and
+    within a class users take turns round-robin, so one user with many
+    uploads cannot hold up everyone else. Each user may run at most
+    ``per_user_limit`` jobs at once, and bulk jobs never take the last
+    free slot so short clips always have somewhere to run.
+
+    Attributes
+    ----------
+    max_running : int
+        Total jobs allowed to run at the same time.
+    per_user_limit : int
+        Jobs a single user may run at the same time.
+    max_queued_per_user : int
+        Jobs a single user may have waiting before being rejected.
+    """
+
+    def __init__(self, max_running: int, per_user_limit: int, max_queued_per_user: int):
+        """
+        Initialize the scheduler.
+
+        Parameters
+        ----------
+        max_running : int
+            Total jobs allowed to run at the same time.
+        per_user_limit : int
+            Jobs a single user may run at the same time.
+        max_queued_per_user : int
+            Jobs a single user may have waiting before being rejected.
+        """
+        self.max_running = max(1, max_running)
+        self.per_user_limit = max(1, per_user_limit)
+        self.max_queued_per_user = max(0, max_queued_per_user)
+
+        self._cond = threading.Condition()
+        # priority -> user -> waiting tickets; dict order is the round-robin order
+        self._queues = {priority: OrderedDict() for priority in PRIORITIES}
+        self._running_by_user: Dict[str, int] = {}
+        self._running_by_priority = {priority: 0 for priority in PRIORITIES}
+        self._queued_by_user: Dict[str, int] = {}
+        self._completed = {priority: 0 for priority in PRIORITIES}
+
+    @contextmanager
+    def job(self, user_id: str, priority: str):
+        """
+        Wait for a run slot and hold it for the duration of the block.
+
+        Parameters
+        ----------
+        user_id : str
+            Id of the user the job belongs to.
+        priority : str
+            Priority class ('interactive' or 'bulk').
+
+        Raises
+        ------
+        SchedulerBusyError
+            If the user already has ``max_queued_per_user`` jobs waiting.
+        JobCancelledError
+            If the current job is cancelled or reaches its deadline while
+            waiting; it gives up its place in the queue.
+        """
+        ticket = self._acquire(user_id, priority)
+        try:
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    @traced("scheduler.wait")
+    def _acquire(self, user_id: str, priority: str) -> _Ticket:
+        """Queue a ticket and block until it is granted a slot."""
+        ticket = _Ticket(user_id, priority)
+
+        with self._cond:
+            if self._queued_by_user.get(user_id, 0) >= self.max_queued_per_user:
+                logger.warning(f"Rejected job for user {user_id}, queue is full")
+                raise SchedulerBusyError(user_id)
+
+            self._queues[priority].setdefault(user_id, deque()).append(ticket)
+            self._queued_by_user[user_id] = self._queued_by_user.get(user_id, 0) + 1
+            self._dispatch()
+
+            token = current_job()
+            while not ticket.granted:
+                if token is None:
+                    self._cond.wait()
+                    continue
+
+                try:
+                    token.check("a run slot")
+                except JobCancelledError:
+                    self._withdraw(ticket)
+                    raise
+                # Wake up to notice cancellation, and at the deadline
+                remaining = token.remaining()
+                if remaining is None:
+                    remaining = CANCEL_POLL_INTERVAL
+                self._cond.wait(max(0.0, min(remaining, CANCEL_POLL_INTERVAL)))
+
+        logger.info(f"Started {priority} job for user {user_id}")
+        return ticket
+
+    def _withdraw(self, ticket: _Ticket):
+        """Remove a waiting ticket from its queue. Caller holds the lock."""
+        queues = self._queues[ticket.priority]
+        waiting = queues.get(ticket.user_id)
+        if waiting is None or ticket not in waiting:
+            return
+
+        waiting.remove(ticket)
+        if not waiting:
+            del queues[ticket.user_id]
+        self._queued_by_user[ticket.user_id] -= 1
+        if not self._queued_by_user[ticket.user_id]:
+            del self._queued_by_user[ticket.user_id]
+        logger.info(f"Withdrew {ticket.priority} job of user {ticket.user_id}")
+
+    def _release(self, ticket: _Ticket):
+        """Free the slot held by a ticket and hand it to the next job."""
+        with self._cond:
+            self._running_by_user[ticket.user_id] -= 1
+            if not self._running_by_user[ticket.user_id]:
+                del self._running_by_user[ticket.user_id]
+            self._running_by_priority[ticket.priority] -= 1
+            self._completed[ticket.priority] += 1
+            self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to waiting tickets. Caller holds the lock."""
+        granted = False
+
+        while sum(self._running_by_priority.values()) < self.max_running:
+            ticket = self._next_ticket()
+            if ticket is None:
+                break
+
+            ticket.granted = True
+            granted = True
+            self._running_by_user[ticket.user_id] = (
+                self._running_by_user.get(ticket.user_id, 0) + 1
+            )
+            self._running_by_priority[ticket.priority] += 1
+            self._queued_by_user[ticket.user_id] -= 1
+            if not self._queued_by_user[ticket.user_id]:
+                del self._queued_by_user[ticket.user_id]
+
+        if granted:
+            self._cond.notify_all()
+
+    def _next_ticket(self) -> Optional[_Ticket]:
+        """Pop the next eligible ticket in priority and round-robin order."""
+        running = sum(self._running_by_priority.values())
+
+        for priority in PRIORITIES:
+            # Keep one slot free for interactive jobs
+            if priority == BULK and running >= max(1, self.max_running - 1):
+                continue
+
+            queues = self._queues[priority]
+            for user_id in list(queues):
+                if self._running_by_user.get(user_id, 0) >= self.per_user_limit:
+                    continue
+
+                waiting = queues.pop(user_id)
+                ticket = waiting.popleft()
+                if waiting:
+                    # Re-insert at the end so other users go first next time
+                    queues[user_id] = waiting
+                return ticket
+
+        return None
+
+    def stats(self) -> Dict:
+        """
+        Get scheduler metrics.
+
+        Returns
+        -------
+        stats : dict
+            Dictionary with scheduler metrics:
+            - running : dict
+                Running jobs per priority class
+            - queued : dict
+                Waiting jobs per priority class
+            - completed : dict
+                Finished jobs per priority class
+            - active_users : int
+                Users with running or waiting jobs
+        """
+        with self._cond:
+            return {
+                "running": dict(self._running_by_priority),
+                "queued": {
+                    priority: sum(len(q) for q in self._queues[priority].values())
+                    for priority in PRIORITIES
+                },
+                "completed": dict(self._completed),
+                "active_users": len(
+                    set(self._running_by_user) | set(self._queued_by_user)
+                ),
+            }
+
+
+_scheduler: Optional[FairScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> FairScheduler:
+    """
+    Get the process-wide job scheduler.
+
+    Returns
+    -------
+    scheduler : FairScheduler
+        Scheduler configured from ``Config``.
+    """
+    global _scheduler  # pylint: disable=global-statement
+
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FairScheduler(
+                max_running=Config.MAX_CONCURRENT_JOBS,
+                per_user_limit=Config.PER_USER_MAX_JOBS,
+                max_queued_per_user=Config.PER_USER_MAX_QUEUED,
+            )
+        return _scheduler
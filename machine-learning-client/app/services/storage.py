@@ -0,0 +1,403 @@
+"""
+Tiered storage of generated audio
+"""
+
+import io
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, Optional
+
+from bson import ObjectId
+from gridfs.errors import NoFile
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app.config import Config
+from app.db import db, gridfs
+from app.services.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+
+class ColdFile(io.FileIO):
+    """
+    Audio file read from the cold tier.
+
+    Mirrors the GridFS attributes readers rely on.
+
+    Attributes
+    ----------
+    _id : ObjectId
+        Id of the file.
+    filename : str
+        Original file name.
+    metadata : dict
+        Metadata recorded when the file was stored.
+    length : int
+        Size of the file in bytes.
+    """
+
+    def __init__(self, path: str, doc: Dict):
+        super().__init__(path, "rb")
+        self._id = doc["_id"]
+        self.filename = doc["filename"]
+        self.metadata = doc.get("metadata") or {}
+        self.length = doc["length"]
+
+
+class AudioStorage:
+    """
+    Audio storage with a GridFS hot tier and a filesystem cold tier.
+
+    New files are written to GridFS. A migration pass moves files that
+    have not been read for a while (or the least recently read ones, when
+    the hot tier is over its size budget) to the cold directory and
+    records them in the ``audio.cold`` collection, keeping Mongo's cache
+    for user and history documents. Reads check the hot tier first and
+    fall back to the cold one, so callers never need to know where a
+    file lives. A migrated file's GridFS copy is marked rather than
+    deleted, sending new reads to the cold copy, and is only deleted a
+    grace period later so streams already reading it can finish.
+
+    Attributes
+    ----------
+    bucket : GridFSBucket
+        Hot tier bucket.
+    cold_dir : str
+        Directory of the cold tier.
+    files : Collection
+        GridFS files collection of the hot tier.
+    cold : Collection
+        Records of the files in the cold tier.
+    """
+
+    def __init__(self, database, bucket, cold_dir: str):
+        """
+        Initialize the storage.
+
+        Parameters
+        ----------
+        database : Database
+            Database holding the bucket.
+        bucket : GridFSBucket
+            Hot tier bucket.
+        cold_dir : str
+            Directory of the cold tier.
+        """
+        self.bucket = bucket
+        self.cold_dir = cold_dir
+        self.files = database["audio.files"]
+        self.cold = database["audio.cold"]
+
+        # Migration visits files by last access and purges migrated copies
+        self.files.create_index([("metadata.last_access", ASCENDING)])
+        self.files.create_index([("metadata.migrated", ASCENDING)], sparse=True)
+        # Files stored before access was recorded count from their upload
+        self.files.update_many(
+            {"metadata.last_access": None},
+            [{"$set": {"metadata.last_access": "$uploadDate"}}],
+        )
+
+    @traced("gridfs.put")
+    def put(self, filename: str, source: BinaryIO, metadata: Dict) -> ObjectId:
+        """
+        Store a file in the hot tier, accessed as of now.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file.
+        source : file-like
+            Binary stream of the contents.
+        metadata : dict
+            Metadata to keep with the file.
+
+        Returns
+        -------
+        file_id : ObjectId
+            Id of the stored file.
+        """
+        return self.bucket.upload_from_stream(
+            filename,
+            source,
+            metadata={**metadata, "last_access": datetime.utcnow()},
+        )
+
+    @traced("storage.open")
+    def open(self, file_id: ObjectId):
+        """
+        Open a stored file from whichever tier holds it.
+
+        Parameters
+        ----------
+        file_id : ObjectId
+            Id of the file.
+
+        Returns
+        -------
+        file : GridOut or ColdFile
+            Readable file with ``filename`` and ``metadata`` attributes.
+
+        Raises
+        ------
+        FileNotFoundError
+            If neither tier has the file.
+        """
+        try:
+            file = self.bucket.open_download_stream(file_id)
+        except NoFile:
+            pass
+        else:
+            if not (file.metadata or {}).get("migrated"):
+                return file
+            # The hot copy is only kept for streams that opened it earlier
+            file.close()
+
+        doc = self.cold.find_one({"_id": file_id})
+        if doc is None:
+            raise FileNotFoundError(f"Audio file {file_id} not found")
+        return ColdFile(os.path.join(self.cold_dir, doc["path"]), doc)
+
+    def delete(self, file_id: ObjectId) -> int:
+        """
+        Delete a stored file and its cached transcodes from both tiers.
+
+        Parameters
+        ----------
+        file_id : ObjectId
+            Id of the file.
+
+        Returns
+        -------
+        freed : int
+            Bytes reclaimed; 0 if the file did not exist.
+        """
+        freed = 0
+        hot_docs = self.files.find(
+            {"$or": [{"_id": file_id}, {"metadata.transcode_of": file_id}]},
+            {"length": 1},
+        )
+        for doc in hot_docs:
+            try:
+                self.bucket.delete(doc["_id"])
+                freed += doc["length"]
+            except NoFile:
+                # Deleted concurrently
+                pass
+
+        cold_doc = self.cold.find_one_and_delete({"_id": file_id})
+        if cold_doc is not None:
+            try:
+                os.remove(os.path.join(self.cold_dir, cold_doc["path"]))
+            except FileNotFoundError:
+                pass
+            freed += cold_doc["length"]
+
+        return freed
+
+    def find_transcode(self, file_id: ObjectId, codec: str) -> Optional[ObjectId]:
+        """
+        Look up a cached transcode of a file.
+
+        Parameters
+        ----------
+        file_id : ObjectId
+            Id of the original file.
+        codec : str
+            Codec of the transcode.
+
+        Returns
+        -------
+        file_id : ObjectId or None
+            Id of the transcode, or None if there is none.
+        """
+        doc = self.files.find_one(
+            {"metadata.transcode_of": file_id, "metadata.codec": codec}, {"_id": 1}
+        )
+        return doc["_id"] if doc else None
+
+    def migrate(
+        self,
+        max_age: float,
+        max_hot_bytes: int = 0,
+        limit: int = 100,
+        grace_period: float = 0,
+    ):
+        """
+        Move least recently used files from the hot to the cold tier.
+
+        Files are visited oldest access first, straight off the
+        ``metadata.last_access`` index. A file is moved when it is older
+        than ``max_age`` or while the hot tier is above ``max_hot_bytes``.
+        Cached transcodes are deleted instead of moved since they can be
+        produced again. The GridFS copies of files moved more than
+        ``grace_period`` ago are deleted first.
+
+        Parameters
+        ----------
+        max_age : float
+            Seconds since last access after which a file goes cold.
+        max_hot_bytes : int, default=0
+            Size budget of the hot tier in bytes; 0 means no budget.
+        limit : int, default=100
+            Most files to visit, and to purge, in one pass.
+        grace_period : float, default=0
+            Seconds a moved file's GridFS copy is kept for readers that
+            opened it before the move.
+
+        Returns
+        -------
+        report : dict
+            Dictionary with the pass results:
+            - migrated : int
+                Files moved to the cold tier
+            - dropped_transcodes : int
+                Cached transcodes deleted
+            - bytes_freed : int
+                Bytes removed from the hot tier
+        """
+        now = datetime.utcnow()
+        report = {"migrated": 0, "dropped_transcodes": 0, "bytes_freed": 0}
+
+        report["bytes_freed"] += self._purge_migrated(
+            now - timedelta(seconds=grace_period), limit
+        )
+
+        # Moved files awaiting deletion no longer count against the budget
+        current = {"metadata.migrated": {"$exists": False}}
+        hot_bytes = 0
+        if max_hot_bytes:
+            total = list(
+                self.files.aggregate(
+                    [
+                        {"$match": current},
+                        {"$group": {"_id": None, "bytes": {"$sum": "$length"}}},
+                    ]
+                )
+            )
+            hot_bytes = total[0]["bytes"] if total else 0
+
+        cutoff = now - timedelta(seconds=max_age)
+        docs = self.files.find(current).sort("metadata.last_access", 1).limit(limit)
+        for doc in docs:
+            metadata = doc.get("metadata") or {}
+            over_budget = max_hot_bytes and hot_bytes > max_hot_bytes
+            if metadata["last_access"] >= cutoff and not over_budget:
+                break
+
+            if metadata.get("transcode_of"):
+                self.bucket.delete(doc["_id"])
+                report["dropped_transcodes"] += 1
+                report["bytes_freed"] += doc["length"]
+            else:
+                self._move_to_cold(doc, now)
+                report["migrated"] += 1
+
+            hot_bytes -= doc["length"]
+
+        logger.info(f"Storage migration: {report}")
+        return report
+
+    def _purge_migrated(self, before: datetime, limit: int) -> int:
+        """Delete the GridFS copies of files migrated before a time."""
+        freed = 0
+        docs = self.files.find(
+            {"metadata.migrated": {"$lt": before}}, {"length": 1}
+        ).limit(limit)
+        for doc in docs:
+            try:
+                self.bucket.delete(doc["_id"])
+                freed += doc["length"]
+            except NoFile:
+                # Deleted concurrently
+                pass
+        return freed
+
+    def _move_to_cold(self, doc: Dict, now: datetime):
+        """Copy a GridFS file to the cold directory and mark it migrated."""
+        file_id = doc["_id"]
+        extension = os.path.splitext(doc["filename"])[1]
+        relative_path = os.path.join(str(file_id)[-2:], f"{file_id}{extension}")
+        path = os.path.join(self.cold_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write under a temporary name so readers never see a partial file
+        partial_path = f"{path}.partial"
+        with open(partial_path, "wb") as target:
+            self.bucket.download_to_stream(file_id, target)
+        os.replace(partial_path, path)
+
+        try:
+            self.cold.insert_one(
+                {
+                    "_id": file_id,
+                    "path": relative_path,
+                    "filename": doc["filename"],
+                    "length": doc["length"],
+                    "metadata": doc.get("metadata"),
+                    "uploadDate": doc.get("uploadDate"),
+                    "migrated": now,
+                }
+            )
+        except DuplicateKeyError:
+            # Another worker migrated the same file concurrently
+            pass
+
+        # New reads go to the cold copy; the next passes delete this one
+        self.files.update_one({"_id": file_id}, {"$set": {"metadata.migrated": now}})
+        logger.debug(f"Moved {file_id} to cold storage: {relative_path}")
+
+
+_storage: Optional[AudioStorage] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> AudioStorage:
+    """
+    Get the process-wide audio storage.
+
+    Returns
+    -------
+    storage : AudioStorage
+        Storage over the ``audio`` bucket and ``Config.COLD_STORAGE_DIR``.
+    """
+    global _storage  # pylint: disable=global-statement
+
+    with _storage_lock:
+        if _storage is None:
+            _storage = AudioStorage(db, gridfs, Config.COLD_STORAGE_DIR)
+        return _storage
+
+
+def start_migration_thread() -> Optional[threading.Thread]:
+    """
+    Run storage migration periodically in the background.
+
+    Returns
+    -------
+    thread : threading.Thread or None
+        The migration thread, or None when disabled by
+        ``STORAGE_MIGRATE_INTERVAL=0`` or when no database is configured.
+    """
+    if Config.STORAGE_MIGRATE_INTERVAL <= 0 or db is None:
+        return None
+
+    def run():
+        while True:
+            time.sleep(Config.STORAGE_MIGRATE_INTERVAL)
+            try:
+                get_storage().migrate(
+                    Config.HOT_STORAGE_MAX_AGE,
+                    max_hot_bytes=Config.HOT_STORAGE_MAX_BYTES,
+                    limit=Config.STORAGE_MIGRATE_BATCH,
+                    grace_period=Config.MIGRATE_GRACE_PERIOD,
+                )
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error(f"Storage migration failed: {e}")
+
+    thread = threading.Thread(target=run, name="storage-migration", daemon=True)
+    thread.start()
+    return thread
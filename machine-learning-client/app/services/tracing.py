@@ -0,0 +1,345 @@
+"""
+Request tracing with spans shared across services
+
+Spans follow the OpenTelemetry data model and the W3C ``traceparent``
+header, so a trace started by the web app continues here under the same
+trace id, the request's correlation id. Finished traces are appended to
+``TRACE_FILE`` as JSON lines and/or posted to an OTLP/HTTP collector at
+``TRACE_ENDPOINT``.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "ml-client"
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+# Span kinds: work within the service, handling an incoming request, or
+# calling another service
+INTERNAL = "INTERNAL"
+SERVER = "SERVER"
+CLIENT = "CLIENT"
+# Span kinds as numbered in the OTLP encoding
+OTLP_SPAN_KINDS = {INTERNAL: 1, SERVER: 2, CLIENT: 3}
+
+
+class Span:  # pylint: disable=too-many-instance-attributes
+    """
+    A timed operation within a trace.
+
+    Attributes
+    ----------
+    trace_id : str
+        32 hex digit id shared by every span of the request.
+    span_id : str
+        16 hex digit id of the span.
+    parent_id : str or None
+        Id of the enclosing span, possibly in another service.
+    name : str
+        Operation name, e.g. 'whisper.translate'.
+    kind : str
+        INTERNAL, SERVER or CLIENT.
+    start : int
+        Start time in nanoseconds since the epoch.
+    end : int or None
+        End time in nanoseconds since the epoch, None while running.
+    attributes : dict
+        Details of the operation.
+    error : str or None
+        Error the operation failed with, if any.
+    """
+
+    def __init__(
+        self,
+        trace_id: str,
+        parent_id: Optional[str],
+        name: str,
+        attributes,
+        kind: str = INTERNAL,
+    ):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end: Optional[int] = None
+        self.attributes = dict(attributes)
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value):
+        """Record a detail of the operation."""
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        """Seconds the span took, or has taken so far."""
+        return ((self.end or time.time_ns()) - self.start) / 1e9
+
+    def traceparent(self) -> str:
+        """Get the ``traceparent`` header continuing the trace under this span."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict:
+        """Convert the span to an OTLP-style JSON object."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "service": SERVICE_NAME,
+            "startTimeUnixNano": self.start,
+            "endTimeUnixNano": self.end,
+            "attributes": self.attributes,
+            "status": (
+                {"code": "ERROR", "message": self.error}
+                if self.error
+                else {"code": "OK"}
+            ),
+        }
+
+
+@dataclass
+class _Trace:
+    """Finished spans of one request in this service."""
+
+    spans: List[Span] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+_current_trace: ContextVar[Optional[_Trace]] = ContextVar("trace", default=None)
+_export_lock = threading.Lock()
+
+
+def parse_traceparent(header: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Read the trace and parent span ids from a ``traceparent`` header.
+
+    Parameters
+    ----------
+    header : str or None
+        Header value.
+
+    Returns
+    -------
+    trace_id : str or None
+        Trace id, None if the header is missing or malformed.
+    parent_id : str or None
+        Span id of the caller's span.
+    """
+    match = TRACEPARENT_PATTERN.match((header or "").strip().lower())
+    if not match:
+        return None, None
+    return match.group(1), match.group(2)
+
+
+def current_span() -> Optional[Span]:
+    """Get the innermost running span of this thread, if any."""
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """Get the trace id of the request running on this thread, if any."""
+    active = _current_span.get()
+    return active.trace_id if active else None
+
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, **attributes):
+    """
+    Trace a request for the duration of the block.
+
+    The root span is a SERVER span handling the request. Spans opened
+    inside the block on this thread become children of it; the whole
+    trace is exported when the block ends.
+
+    Parameters
+    ----------
+    name : str
+        Name of the root span.
+    traceparent : str, optional
+        Incoming ``traceparent`` header; a new trace is started without it.
+    **attributes
+        Details of the request.
+
+    Yields
+    ------
+    span : Span
+        The root span.
+    """
+    trace_id, parent_id = parse_traceparent(traceparent)
+    root = Span(trace_id or os.urandom(16).hex(), parent_id, name, attributes, SERVER)
+    trace = _Trace()
+    reset = _current_trace.set(trace)
+    try:
+        with _record(trace, root):
+            yield root
+    finally:
+        _current_trace.reset(reset)
+        export(trace.spans)
+
+
+@contextmanager
+def span(name: str, kind: str = INTERNAL, **attributes):
+    """
+    Time an operation as a child of the current span.
+
+    Outside a traced request the operation runs untraced.
+
+    Parameters
+    ----------
+    name : str
+        Operation name.
+    kind : str, default=INTERNAL
+        CLIENT for calls to other services.
+    **attributes
+        Details of the operation.
+
+    Yields
+    ------
+    span : Span or None
+        The running span, None when not tracing.
+    """
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    if trace is None or parent is None:
+        yield None
+        return
+
+    with _record(
+        trace, Span(parent.trace_id, parent.span_id, name, attributes, kind)
+    ) as active:
+        yield active
+
+
+@contextmanager
+def _record(trace: _Trace, active: Span):
+    """Make a span current for the block and add it to the trace when done."""
+    reset = _current_span.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        active.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(reset)
+        active.end = time.time_ns()
+        with trace.lock:
+            trace.spans.append(active)
+
+
+def traced(name: str):
+    """
+    Decorate a function to run in a span.
+
+    Parameters
+    ----------
+    name : str
+        Operation name of the span.
+
+    Returns
+    -------
+    decorator : callable
+        Decorator wrapping the function.
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def export(spans: List[Span]):
+    """
+    Export the finished spans of a request.
+
+    Parameters
+    ----------
+    spans : list of Span
+        Spans to export.
+    """
+    if not spans:
+        return
+
+    documents = [finished.to_dict() for finished in spans]
+    if Config.TRACE_FILE:
+        try:
+            with _export_lock, open(Config.TRACE_FILE, "a", encoding="utf-8") as file:
+                for document in documents:
+                    file.write(json.dumps(document, default=str) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write trace: {e}")
+
+    if Config.TRACE_ENDPOINT:
+        # Never make the request wait for the collector
+        threading.Thread(
+            target=_post_spans, args=(documents,), name="trace-export", daemon=True
+        ).start()
+
+
+def _post_spans(documents: List[Dict]):
+    """Post spans to an OTLP/HTTP collector as JSON."""
+    payload = {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+                    ]
+                },
+                "scopeSpans": [{"spans": [_otlp_span(doc) for doc in documents]}],
+            }
+        ]
+    }
+    request = urllib.request.Request(
+        f"{Config.TRACE_ENDPOINT.rstrip('/')}/v1/traces",
+        data=json.dumps(payload, default=str).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5):
+            pass
+    except OSError as e:
+        logger.warning(f"Could not export trace: {e}")
+
+
+def _otlp_span(document: Dict) -> Dict:
+    """Convert an exported span to the OTLP JSON encoding."""
+    status = {"code": 1}
+    if document["status"]["code"] == "ERROR":
+        status = {"code": 2, "message": document["status"]["message"]}
+    return {
+        "traceId": document["traceId"],
+        "spanId": document["spanId"],
+        "parentSpanId": document["parentSpanId"],
+        "name": document["name"],
+        "kind": OTLP_SPAN_KINDS[document["kind"]],
+        "startTimeUnixNano": str(document["startTimeUnixNano"]),
+        "endTimeUnixNano": str(document["endTimeUnixNano"]),
+        "attributes": [
+            {"key": key, "value": {"stringValue": str(value)}}
+            for key, value in document["attributes"].items()
+        ],
+        "status": status,
+    }
@@ -0,0 +1,237 @@
+"""
+Incremental handling of uploaded audio streams
+"""
+
+import hashlib
+import logging
+import subprocess
+import threading
+from typing import BinaryIO, Dict, Optional
+
+import numpy as np
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Whisper consumes 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload stream exceeds the configured size limit."""
+
+
+class StreamingDecoder:
+    """
+    Decode audio with ffmpeg while it is still being received.
+
+    Chunks are piped into an ffmpeg subprocess as they arrive and the
+    decoded PCM is drained on a background thread, so decoding overlaps
+    with the upload instead of starting after it.
+
+    Attributes
+    ----------
+    sample_rate : int
+        Sample rate of the decoded audio.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE):
+        """
+        Start the ffmpeg decoding process.
+
+        Parameters
+        ----------
+        sample_rate : int, default=16000
+            Sample rate of the decoded audio.
+        """
+        self.sample_rate = sample_rate
+        self._pcm = []
+        self._reader = None
+
+        cmd = [
+            "ffmpeg",
+            "-nostdin",
+            "-threads",
+            "0",
+            "-i",
+            "pipe:0",
+            "-f",
+            "s16le",
+            "-ac",
+            "1",
+            "-acodec",
+            "pcm_s16le",
+            "-ar",
+            str(sample_rate),
+            "pipe:1",
+        ]
+        try:
+            self._proc = subprocess.Popen(  # pylint: disable=consider-using-with
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as e:
+            logger.warning(f"Streaming decode unavailable: {e}")
+            self._proc = None
+            return
+
+        self._reader = threading.Thread(target=self._drain, daemon=True)
+        self._reader.start()
+
+    def _drain(self):
+        """Collect decoded PCM from ffmpeg's stdout."""
+        for chunk in iter(
+            lambda: self._proc.stdout.read(Config.UPLOAD_CHUNK_SIZE), b""
+        ):
+            self._pcm.append(chunk)
+
+    def feed(self, chunk: bytes):
+        """
+        Pass a chunk of encoded audio to the decoder.
+
+        Parameters
+        ----------
+        chunk : bytes
+            Raw bytes of the uploaded file.
+        """
+        if self._proc is None:
+            return
+
+        try:
+            self._proc.stdin.write(chunk)
+        except (BrokenPipeError, ValueError):
+            # ffmpeg gave up (e.g. a container that needs seeking);
+            # the file on disk is still decoded later the usual way
+            logger.warning("Streaming decoder stopped accepting input")
+            self.abort()
+
+    def finish(self) -> Optional[np.ndarray]:
+        """
+        Signal end of input and collect the decoded audio.
+
+        Returns
+        -------
+        audio : np.ndarray or None
+            Mono float32 waveform in [-1, 1], or None if decoding failed.
+        """
+        if self._proc is None:
+            return None
+
+        try:
+            self._proc.stdin.close()
+        except (BrokenPipeError, ValueError):
+            pass
+
+        returncode = self._proc.wait()
+        self._reader.join()
+
+        if returncode != 0 or not self._pcm:
+            logger.warning("Streaming decode failed, falling back to file decode")
+            return None
+
+        pcm = np.frombuffer(b"".join(self._pcm), dtype=np.int16)
+        return pcm.astype(np.float32) / 32768.0
+
+    def abort(self):
+        """Stop the decoder and discard any decoded audio."""
+        if self._proc is None:
+            return
+
+        self._proc.kill()
+        self._proc.wait()
+        if self._reader is not None:
+            self._reader.join()
+        self._proc = None
+        self._pcm = []
+
+
+def receive_stream(
+    stream: BinaryIO,
+    dest_path: str,
+    max_bytes: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    decode: Optional[bool] = None,
+) -> Dict:
+    """
+    Consume an upload stream chunk by chunk.
+
+    Each chunk is hashed, counted against the size limit, written to disk
+    and (optionally) fed to a streaming decoder, so the upload is never
+    held in memory as a whole.
+
+    Parameters
+    ----------
+    stream : file-like
+        Readable binary stream of the uploaded file.
+    dest_path : str
+        Path to write the received file to.
+    max_bytes : int, optional
+        Maximum accepted size. Defaults to ``Config.MAX_CONTENT_LENGTH``.
+    chunk_size : int, optional
+        Read size. Defaults to ``Config.UPLOAD_CHUNK_SIZE``.
+    decode : bool, optional
+        Decode while receiving. Defaults to ``Config.STREAM_DECODE``.
+
+    Returns
+    -------
+    upload : dict
+        Dictionary describing the received upload:
+        - path : str
+            Path of the written file
+        - size : int
+            Number of bytes received
+        - sha256 : str
+            Hex digest of the file contents
+        - audio : np.ndarray or None
+            Decoded 16 kHz waveform, if streaming decode succeeded
+
+    Raises
+    ------
+    UploadTooLargeError
+        If the stream exceeds ``max_bytes``.
+    """
+    if max_bytes is None:
+        max_bytes = Config.MAX_CONTENT_LENGTH
+    if chunk_size is None:
+        chunk_size = Config.UPLOAD_CHUNK_SIZE
+    if decode is None:
+        decode = Config.STREAM_DECODE
+
+    digest = hashlib.sha256()
+    decoder = StreamingDecoder() if decode else None
+    size = 0
+
+    try:
+        with open(dest_path, "wb") as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLargeError(
+                        f"Upload exceeds maximum size of {max_bytes} bytes"
+                    )
+
+                digest.update(chunk)
+                out.write(chunk)
+                if decoder is not None:
+                    decoder.feed(chunk)
+    except Exception:
+        if decoder is not None:
+            decoder.abort()
+        raise
+
+    audio = decoder.finish() if decoder is not None else None
+    logger.info(f"Received upload of {size} bytes")
+
+    return {
+        "path": dest_path,
+        "size": size,
+        "sha256": digest.hexdigest(),
+        "audio": audio,
+    }
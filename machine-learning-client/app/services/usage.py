@@ -0,0 +1,155 @@
+"""
+Compute and memory used by each translation
+"""
+
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+def peak_rss_mb() -> float:
+    """Get the highest resident set size the process has reached, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class UsageMeter:
+    """
+    Resources a job consumes, stage by stage.
+
+    Model inference runs on torch's intra-op threads rather than the
+    job's own thread, so CPU time is measured for the whole process and
+    split evenly between the jobs metered at the time; with one job
+    running it is exact.
+
+    Attributes
+    ----------
+    stages : dict
+        Wall and CPU seconds of each finished stage, by name.
+    """
+
+    # Meters running in the process, sharing its CPU time
+    _active = 0
+    _active_lock = threading.Lock()
+
+    def __init__(self):
+        """Initialize the meter."""
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._start = 0.0
+        self._wall = 0.0
+        self._rss = 0.0
+        self._rss_delta = 0.0
+
+    def __enter__(self):
+        with UsageMeter._active_lock:
+            UsageMeter._active += 1
+        self._start = time.monotonic()
+        self._rss = peak_rss_mb()
+        return self
+
+    def __exit__(self, *exc):
+        with UsageMeter._active_lock:
+            UsageMeter._active -= 1
+        self._wall = time.monotonic() - self._start
+        self._rss_delta = peak_rss_mb() - self._rss
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Measure a stage of the job for the duration of the block.
+
+        Parameters
+        ----------
+        name : str
+            Stage name, e.g. 'translate'.
+        """
+        share = self._cpu_share()
+        wall = time.monotonic()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            # Average the share over the stage as other jobs come and go
+            share = (share + self._cpu_share()) / 2
+            self.add(
+                name,
+                time.monotonic() - wall,
+                (time.process_time() - cpu) * share,
+            )
+
+    @staticmethod
+    def _cpu_share() -> float:
+        """Get the fraction of process CPU time a metered job is charged."""
+        with UsageMeter._active_lock:
+            return 1 / max(1, UsageMeter._active)
+
+    def add(self, name: str, wall_seconds: float, cpu_seconds: float = 0.0):
+        """
+        Record a stage measured elsewhere.
+
+        Parameters
+        ----------
+        name : str
+            Stage name.
+        wall_seconds : float
+            Seconds the stage took.
+        cpu_seconds : float, default=0.0
+            CPU seconds charged to the stage.
+        """
+        self.stages[name] = {
+            "wall_seconds": round(wall_seconds, 3),
+            "cpu_seconds": round(cpu_seconds, 3),
+        }
+
+    def report(
+        self, input_seconds: Optional[float], output_seconds: Optional[float]
+    ) -> Dict:
+        """
+        Summarize the job's resource usage.
+
+        Parameters
+        ----------
+        input_seconds : float or None
+            Duration of the input audio.
+        output_seconds : float or None
+            Duration of the generated audio.
+
+        Returns
+        -------
+        usage : dict
+            Dictionary with:
+            - cpu_seconds : float
+                CPU seconds charged to the job
+            - wall_seconds : float
+                Seconds the job took
+            - stages : dict
+                Wall and CPU seconds by stage
+            - peak_rss_mb : float
+                Process peak resident set size after the job
+            - peak_rss_delta_mb : float
+                How much the job raised the process peak
+            - input_seconds, output_seconds : float or None
+                Audio durations
+            - real_time_factor : float or None
+                Wall seconds per second of input audio
+        """
+        # Round first so the real-time factor agrees with the reported wall time
+        wall = round(self._wall or time.monotonic() - self._start, 3)
+        return {
+            "cpu_seconds": round(
+                sum(stage["cpu_seconds"] for stage in self.stages.values()), 3
+            ),
+            "wall_seconds": wall,
+            "stages": dict(self.stages),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "peak_rss_delta_mb": round(max(0.0, self._rss_delta), 1),
+            "input_seconds": input_seconds,
+            "output_seconds": output_seconds,
+            "real_time_factor": (
+                round(wall / input_seconds, 3) if input_seconds else None
+            ),
+        }
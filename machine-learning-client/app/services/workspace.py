@@ -0,0 +1,120 @@
+"""
+Per-request scratch workspaces
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Shared-memory filesystem present on most Linux hosts and containers
+TMPFS_DIR = "/dev/shm"
+
+
+def scratch_root() -> str:
+    """
+    Choose the directory under which request workspaces are created.
+
+    Uses ``Config.SCRATCH_DIR`` when set. Otherwise prefers the tmpfs at
+    ``/dev/shm`` if it is writable and has room for a few maximum-size
+    uploads, and falls back to ``Config.UPLOAD_FOLDER``.
+
+    Returns
+    -------
+    root : str
+        Directory to create workspaces in.
+    """
+    if Config.SCRATCH_DIR:
+        return Config.SCRATCH_DIR
+
+    if os.path.isdir(TMPFS_DIR) and os.access(TMPFS_DIR, os.W_OK):
+        free = shutil.disk_usage(TMPFS_DIR).free
+        if free >= Config.SCRATCH_TMPFS_MIN_FREE:
+            return TMPFS_DIR
+
+    return Config.UPLOAD_FOLDER
+
+
+class Workspace:
+    """
+    Unique scratch directory for the files of a single request.
+
+    Used as a context manager; the directory and everything in it is
+    removed on exit, including when processing raised an exception.
+
+    Attributes
+    ----------
+    path : str or None
+        Path of the workspace directory while it exists.
+    """
+
+    def __init__(self, root: Optional[str] = None, prefix: str = "request-"):
+        """
+        Prepare a workspace.
+
+        Parameters
+        ----------
+        root : str, optional
+            Parent directory. If None, defaults to ``scratch_root()``.
+        prefix : str, default='request-'
+            Prefix of the directory name.
+        """
+        self.root = root
+        self.prefix = prefix
+        self.path = None
+
+    def __enter__(self):
+        return self.create()
+
+    def create(self):
+        """
+        Create the workspace directory.
+
+        Use this instead of the context manager when the workspace must
+        outlive the current block (e.g. background jobs); the owner is
+        then responsible for calling ``cleanup()``.
+
+        Returns
+        -------
+        workspace : Workspace
+            This workspace.
+        """
+        root = self.root or scratch_root()
+        os.makedirs(root, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix=self.prefix, dir=root)
+        logger.debug(f"Created workspace: {self.path}")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+        return False
+
+    def file(self, name: str) -> str:
+        """
+        Get the path of a file inside the workspace.
+
+        Parameters
+        ----------
+        name : str
+            File name, without directories.
+
+        Returns
+        -------
+        path : str
+            Path of the file inside the workspace.
+        """
+        return os.path.join(self.path, os.path.basename(name))
+
+    def cleanup(self):
+        """Remove the workspace directory and its contents."""
+        if self.path is None:
+            return
+
+        shutil.rmtree(self.path, ignore_errors=True)
+        logger.debug(f"Removed workspace: {self.path}")
+        self.path = None
@@ -47,3 +47,10 @@ def mock_ml_client():
     ml_client.transcriber = MagicMock()
     ml_client.voice_cloner = MagicMock()
     return ml_client
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    """Model cache in a temporary directory"""
+    with patch("app.models.artifacts.Config.MODEL_CACHE_DIR", str(tmp_path)):
+        yield tmp_path
@@ -0,0 +1,64 @@
+"""Admission control unit tests"""
+
+import pytest
+
+from app.services.admission import AdmissionController, AdmissionRejectedError
+
+
+def test_idle_service_admits_any_job():
+    """A job is never rejected when nothing else is waiting"""
+    admission = AdmissionController(max_backlog=10, workers=1, rtf=1.0)
+
+    with admission.admit(3600) as cost:
+        assert cost == 3600
+        assert admission.stats()["backlog_seconds"] == 3600
+
+    assert admission.stats()["backlog_seconds"] == 0
+
+
+def test_rejects_when_projected_backlog_too_long():
+    """Jobs projected to finish past the bound are rejected with retry-after"""
+    admission = AdmissionController(max_backlog=60, workers=2, rtf=0.5)
+
+    with admission.admit(100):
+        # 50s backlog over 2 workers plus 10s of own work fits in 60s
+        with admission.admit(20):
+            pass
+
+        with pytest.raises(AdmissionRejectedError) as excinfo:
+            with admission.admit(80):
+                pass
+        assert excinfo.value.retry_after == 5
+
+        # A client that only waits 30s is turned away sooner
+        with pytest.raises(AdmissionRejectedError):
+            with admission.admit(20, timeout=30):
+                pass
+
+    assert admission.stats()["rejected"] == 2
+
+
+def test_observe_updates_real_time_factor():
+    """Measured jobs move the real-time factor towards what they took"""
+    admission = AdmissionController(max_backlog=60, workers=1, rtf=1.0)
+
+    admission.observe(10, 30)
+    admission.observe(0, 30)
+
+    assert admission.real_time_factor() == pytest.approx(1.4)
+    assert admission.estimate(10) == pytest.approx(14)
+
+
+def test_real_time_factor_per_model():
+    """Each model pair is seeded by its Whisper size and measured on its own"""
+    admission = AdmissionController(
+        max_backlog=60, workers=1, rtf=1.0, seeds={"tiny": 0.5, "large": 5.0}
+    )
+    fast, accurate = ("tiny", "xtts"), ("large", "xtts")
+
+    admission.observe(10, 10, fast)
+
+    assert admission.real_time_factor(fast) == pytest.approx(0.6)
+    assert admission.estimate(10, accurate) == pytest.approx(50)
+    assert admission.real_time_factor(("medium", "xtts")) == 1.0
+    assert admission.stats()["rtf"] == {"tiny/xtts": pytest.approx(0.6)}
@@ -0,0 +1,44 @@
+"""Segment alignment unit tests"""
+
+import numpy as np
+
+from app.services.alignment import (
+    align_segments,
+    crossfade_concat,
+    fit_to_window,
+    stretch_to_length,
+)
+
+
+def test_crossfade_concat_overlaps_joins():
+    """Joins fade linearly from one waveform into the next"""
+    joined = crossfade_concat([np.ones(4), np.zeros(4)], overlap=3)
+
+    assert len(joined) == 5
+    np.testing.assert_allclose(joined, [1.0, 1.0, 0.5, 0.0, 0.0])
+    assert len(crossfade_concat([np.ones(2), np.ones(5)], overlap=10)) == 5
+    assert len(crossfade_concat([], overlap=3)) == 0
+
+
+def test_stretch_to_length_interpolates():
+    """Resampling keeps the endpoints and hits the exact length"""
+    stretched = stretch_to_length(np.array([0.0, 1.0]), 5)
+    np.testing.assert_allclose(stretched, [0.0, 0.25, 0.5, 0.75, 1.0])
+
+
+def test_fit_to_window_limits_speed_up():
+    """Long audio is compressed into the window, but not beyond max_stretch"""
+    assert len(fit_to_window(np.ones(120), 100, 1.5)) == 100
+    assert len(fit_to_window(np.ones(300), 100, 1.5)) == 200
+    assert len(fit_to_window(np.ones(80), 100, 1.5)) == 80
+
+
+def test_align_segments_pads_and_pushes_overruns():
+    """Segments start at source times; overruns delay the next segment"""
+    wavs = [np.ones(300), np.full(10, 0.5)]
+    audio = align_segments(wavs, [0.0, 1.0], [1.0, 3.0], sample_rate=100)
+
+    assert len(audio) == 300
+    assert audio[:200].all()
+    np.testing.assert_allclose(audio[200:210], 0.5)
+    assert not audio[210:].any()
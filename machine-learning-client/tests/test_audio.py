@@ -0,0 +1,39 @@
+"""Audio helper unit tests"""
+
+from unittest.mock import patch
+
+import numpy as np
+import soundfile
+
+from app.services.audio import compute_peaks, probe_duration
+
+
+def test_probe_duration_falls_back_to_soundfile(tmp_path):
+    """Probe duration test without ffprobe"""
+    path = tmp_path / "clip.wav"
+    soundfile.write(path, np.zeros(8000, dtype=np.float32), 16000)
+
+    with patch("subprocess.run", side_effect=OSError("ffprobe not found")):
+        assert probe_duration(str(path)) == 0.5
+
+
+def test_probe_duration_unknown(tmp_path):
+    """Probe duration test with unreadable audio"""
+    path = tmp_path / "clip.mp3"
+    path.write_bytes(b"not audio")
+
+    with patch("subprocess.run", side_effect=OSError("ffprobe not found")):
+        assert probe_duration(str(path)) is None
+
+
+def test_compute_peaks():
+    """Peaks test with two constant halves"""
+    audio = np.concatenate([np.full(100, 0.25), np.full(100, -0.5)])
+    assert compute_peaks(audio, 2) == [0.25, 0.5]
+    assert len(compute_peaks(np.zeros(16000), 200)) == 200
+
+
+def test_compute_peaks_short_audio():
+    """Peaks test with fewer samples than points"""
+    assert compute_peaks(np.array([0.1, -0.2]), 200) == [0.1, 0.2]
+    assert not compute_peaks(np.array([]), 200)
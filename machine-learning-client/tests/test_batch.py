@@ -0,0 +1,160 @@
+"""Batch job unit tests"""
+
+import io
+import os
+import zipfile
+from unittest.mock import MagicMock, patch
+
+import pytest
+from bson import ObjectId
+
+from app.services.admission import AdmissionRejectedError
+from app.services.batch import (
+    DONE,
+    FAILED,
+    PROCESSING,
+    BatchJob,
+    TooManyFilesError,
+    _run_batch,
+    extract_archive,
+    get_batch,
+    start_batch,
+)
+from app.services.workspace import Workspace
+
+
+def test_batch_job_to_dict():
+    """Batch snapshot counts finished files"""
+    job = BatchJob("user-1", ["a.wav", "b.wav"])
+    job.update(0, status=DONE, result={"english_text": "Hi"})
+
+    batch = job.to_dict()
+    assert batch["status"] == "processing"
+    assert batch["total"] == 2
+    assert batch["completed"] == 1
+    assert batch["files"][0]["result"] == {"english_text": "Hi"}
+
+    job.finish()
+    assert job.to_dict()["status"] == "done"
+
+
+def test_extract_archive_skips_other_files(tmp_path):
+    """Archive extraction keeps only allowed audio files"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("folder/one.wav", b"one")
+        archive.writestr("notes.txt", b"text")
+        archive.writestr("../two.MP3", b"two")
+    buffer.seek(0)
+
+    with Workspace(root=str(tmp_path)) as workspace:
+        files = extract_archive(buffer, workspace, {"wav", "mp3"})
+
+        assert [name for name, _ in files] == ["one.wav", "two.MP3"]
+        for _, path in files:
+            assert os.path.dirname(path) == workspace.path
+        with open(files[1][1], "rb") as f:
+            assert f.read() == b"two"
+
+
+def test_extract_archive_rejects_too_many_files(tmp_path):
+    """Archives over the file limit are rejected before extracting anything"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for index in range(3):
+            archive.writestr(f"{index}.wav", b"audio")
+        archive.writestr("notes.txt", b"text")
+    buffer.seek(0)
+
+    with Workspace(root=str(tmp_path)) as workspace:
+        with pytest.raises(TooManyFilesError):
+            extract_archive(buffer, workspace, {"wav"}, max_files=2)
+        assert not os.listdir(workspace.path)
+
+        buffer.seek(0)
+        assert len(extract_archive(buffer, workspace, {"wav"}, max_files=3)) == 3
+
+
+@patch("app.services.batch.record_result")
+@patch("app.services.batch.get_scheduler")
+@patch("app.services.batch.Processor")
+def test_run_batch_records_results(
+    mock_processor_class, mock_get_scheduler, mock_record_result, tmp_path
+):
+    """Batch runner saves each result to history, one slot per file"""
+    history_id = ObjectId()
+    mock_record_result.return_value = history_id
+    job = BatchJob("user-1", ["a.wav", "b.wav"])
+
+    def process_batch(paths, on_result, slot, **_):
+        for index in range(len(paths)):
+            with slot(index):
+                assert job.files[index]["status"] == PROCESSING
+        on_result(0, {"english_text": "Hello"}, None)
+        on_result(1, None, "bad audio")
+
+    mock_processor_class.return_value.process_batch.side_effect = process_batch
+    workspace = Workspace(root=str(tmp_path)).create()
+    admitted = MagicMock()
+
+    _run_batch(job, ["a", "b"], workspace, same_speaker=True, admitted=admitted)
+
+    batch = job.to_dict()
+    assert batch["status"] == DONE
+    assert batch["files"][0]["status"] == DONE
+    assert batch["files"][0]["history_id"] == str(history_id)
+    assert batch["files"][1] == {
+        "index": 1,
+        "file_name": "b.wav",
+        "status": FAILED,
+        "result": None,
+        "history_id": None,
+        "error": "bad audio",
+    }
+    mock_record_result.assert_called_once()
+    assert mock_record_result.call_args.args[1:] == (
+        "user-1",
+        {"english_text": "Hello"},
+        "a.wav",
+    )
+    assert mock_get_scheduler.return_value.job.call_count == 2
+    admitted.close.assert_called_once()
+    assert not os.listdir(tmp_path)
+
+
+@patch("app.services.batch.Processor")
+def test_run_batch_fails_remaining_files(mock_processor_class, tmp_path):
+    """Batch runner marks unfinished files failed on errors"""
+    mock_processor_class.side_effect = RuntimeError("model missing")
+    workspace = Workspace(root=str(tmp_path)).create()
+    job = BatchJob("user-1", ["a.wav"])
+
+    _run_batch(job, ["a"], workspace, same_speaker=False)
+
+    assert job.to_dict()["files"][0]["error"] == "model missing"
+
+
+@patch("app.services.batch.threading.Thread")
+@patch("app.services.batch.get_admission")
+def test_start_batch_rejected_when_backlogged(mock_get_admission, mock_thread):
+    """Batches are admitted by their total duration"""
+    mock_get_admission.return_value.admit.side_effect = AdmissionRejectedError(
+        900, retry_after=30
+    )
+    workspace = MagicMock()
+
+    with pytest.raises(AdmissionRejectedError):
+        start_batch("user-1", [("a.wav", "/tmp/a.wav")], workspace, duration=600)
+
+    assert mock_get_admission.return_value.admit.call_args.args == (600,)
+    workspace.cleanup.assert_called_once()
+    mock_thread.assert_not_called()
+
+
+@patch("app.services.batch.threading.Thread")
+def test_start_batch_registers_job(mock_thread):
+    """Started batches can be looked up by id"""
+    job = start_batch("user-1", [("a.wav", "/tmp/a.wav")], MagicMock())
+
+    assert get_batch(job.id) is job
+    mock_thread.return_value.start.assert_called_once()
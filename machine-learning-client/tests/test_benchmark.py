@@ -0,0 +1,27 @@
+"""Synthesis benchmark unit tests"""
+
+from unittest.mock import MagicMock, patch
+
+from app.benchmark import run_benchmark
+
+
+@patch("app.benchmark.Config.TTS_PROCESSES", 4)
+def test_run_benchmark_reports_speedup():
+    """Every path is timed and the speedup is relative to the single call"""
+    cloner = MagicMock()
+    cloner.get_speaker_embedding.return_value = [0.1]
+
+    with patch("app.benchmark.time_best", side_effect=[4.0, 3.0, 1.0]):
+        report = run_benchmark(cloner, "ref.wav", "One. Two.", repeat=1)
+
+    assert report == {
+        "single_call": 4.0,
+        "sequential": 3.0,
+        "parallel": 1.0,
+        "processes": 4,
+        "speedup": 4.0,
+    }
+    cloner.start_workers.assert_called_once_with()
+    cloner._synthesize.assert_called_once_with(  # pylint: disable=protected-access
+        [0.1], "One. Two.", "en"
+    )
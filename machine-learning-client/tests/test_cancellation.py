@@ -0,0 +1,74 @@
+"""Deadline and cancellation unit tests"""
+
+import socket
+import time
+
+import pytest
+
+from app.services.cancellation import (
+    DeadlineExceededError,
+    JobCancelledError,
+    bind,
+    cancel_job,
+    check_cancelled,
+    current_job,
+    track_job,
+    watch_disconnect,
+)
+
+
+def test_check_cancelled_outside_job_is_noop():
+    """Checkpoints reached outside a tracked job never raise"""
+    assert current_job() is None
+    check_cancelled()
+
+
+def test_cancel_job_stops_at_next_checkpoint():
+    """Only the owner can cancel, and the job stops at its next checkpoint"""
+    with track_job("job-1", "user-1") as token:
+        assert not cancel_job("job-1", "user-2")
+        check_cancelled()
+
+        assert cancel_job("job-1", "user-1")
+        with pytest.raises(JobCancelledError, match="before cloning"):
+            check_cancelled("cloning")
+
+    assert token.finished.is_set()
+    assert not cancel_job("job-1", "user-1")
+
+
+def test_deadline_exceeded():
+    """A job past its deadline raises at checkpoints"""
+    with track_job("job-1", "user-1", timeout=0.01) as token:
+        assert token.remaining() > 0
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceededError):
+            check_cancelled()
+
+    with track_job("job-2", "user-1", timeout=0) as token:
+        assert token.remaining() is None
+
+
+def test_bind_carries_job_to_other_threads():
+    """Bound functions check the caller's job on a worker thread"""
+    with track_job("job-1", "user-1") as token:
+        checkpoint = bind(check_cancelled)
+        token.cancel()
+
+    with pytest.raises(JobCancelledError):
+        checkpoint()
+
+
+def test_watch_disconnect_cancels_on_hang_up():
+    """Closing the client side of the connection cancels the job"""
+    server, client = socket.socketpair()
+    try:
+        with track_job("job-1", "user-1") as token:
+            thread = watch_disconnect(token, server, interval=0.01)
+            client.close()
+            thread.join(timeout=1)
+            assert token.cancelled
+    finally:
+        server.close()
+
+    assert watch_disconnect(token, server, interval=0) is None
@@ -0,0 +1,94 @@
+"""Codec service unit tests"""
+
+import io
+import os
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+import soundfile
+from bson import ObjectId
+
+from app.services.codec import encode_audio, get_transcode, transcode_audio
+
+
+@pytest.fixture(name="wav_path")
+def fixture_wav_path(tmp_path):
+    """One second of a 440 Hz tone at 16 kHz"""
+    path = tmp_path / "cloned.wav"
+    t = np.arange(16000) / 16000
+    soundfile.write(path, (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32), 16000)
+    return str(path)
+
+
+@pytest.mark.parametrize("codec", ["opus", "flac"])
+def test_encode_audio_compresses(wav_path, codec):
+    """Encode test for compressed codecs"""
+    encoded = encode_audio(wav_path, codec, points=100)
+
+    info = soundfile.info(encoded["path"])
+    assert encoded["path"] != wav_path
+    assert encoded["codec"] == codec
+    assert encoded["duration"] == 1.0
+    assert info.samplerate == encoded["sample_rate"] == 16000
+    assert len(encoded["peaks"]) == 100
+    assert max(encoded["peaks"]) == pytest.approx(0.3, abs=0.01)
+    assert os.path.getsize(encoded["path"]) < os.path.getsize(wav_path)
+
+
+def test_encode_audio_wav_is_unchanged(wav_path):
+    """Encode test when storing WAV"""
+    encoded = encode_audio(wav_path, "wav")
+    assert encoded["path"] == wav_path
+    assert encoded["mimetype"] == "audio/wav"
+
+
+def test_encode_audio_unknown_codec(wav_path):
+    """Encode test with an unsupported codec"""
+    with pytest.raises(ValueError):
+        encode_audio(wav_path, "mp3")
+
+
+def test_get_transcode_caches_result(wav_path):
+    """Transcode is produced once and then served from the cache"""
+    encoded = encode_audio(wav_path, "opus")
+    with open(encoded["path"], "rb") as source:
+        data = source.read()
+
+    def open_original(_):
+        original = io.BytesIO(data)
+        original.metadata = {"codec": "opus"}
+        original.filename = "cloned.ogg"
+        return original
+
+    original_id = ObjectId()
+    storage = MagicMock()
+    storage.open.side_effect = open_original
+    storage.find_transcode.return_value = None
+    storage.put.return_value = "wav_id"
+
+    assert get_transcode(storage, original_id, "wav") == "wav_id"
+    name, transcoded = storage.put.call_args.args
+    assert name == "cloned.wav"
+    assert soundfile.info(transcoded).format == "WAV"
+    assert storage.put.call_args.kwargs["metadata"]["transcode_of"] == original_id
+
+    storage.find_transcode.return_value = "wav_id"
+    storage.put.reset_mock()
+
+    assert get_transcode(storage, original_id, "wav") == "wav_id"
+    storage.put.assert_not_called()
+
+
+def test_get_transcode_missing_original():
+    """Transcode of an unknown file"""
+    storage = MagicMock()
+    storage.open.side_effect = FileNotFoundError
+    assert get_transcode(storage, ObjectId(), "wav") is None
+
+
+def test_transcode_audio_to_flac(wav_path):
+    """Transcode WAV bytes to FLAC"""
+    with open(wav_path, "rb") as source:
+        data = transcode_audio(source, "flac")
+    assert soundfile.info(io.BytesIO(data)).format == "FLAC"
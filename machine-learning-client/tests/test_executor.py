@@ -0,0 +1,95 @@
+"""Inference executor unit tests"""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.services.executor import (
+    ExecutorBusyError,
+    InferenceExecutor,
+    configure_torch_threads,
+    get_executor,
+)
+
+
+def test_run_returns_result():
+    """Run executes the call and records it"""
+    executor = InferenceExecutor("test", slots=1, max_queue=1)
+
+    assert executor.run(lambda x, y=0: x + y, 1, y=2) == 3
+    stats = executor.stats()
+    assert stats["completed"] == 1
+    assert stats["running"] == 0
+
+
+def test_run_releases_slot_on_error():
+    """A failing call frees its slot"""
+    executor = InferenceExecutor("test", slots=1, max_queue=0)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        executor.run(fail)
+    assert executor.run(lambda: "ok") == "ok"
+
+
+def test_run_rejects_when_queue_full():
+    """Calls beyond slots plus queue capacity are rejected"""
+    executor = InferenceExecutor("test", slots=1, max_queue=1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    running = threading.Thread(target=executor.run, args=(block,))
+    running.start()
+    started.wait(5)
+
+    queued = threading.Thread(target=executor.run, args=(lambda: None,))
+    queued.start()
+    while executor.stats()["queued"] == 0:
+        pass
+
+    with pytest.raises(ExecutorBusyError) as excinfo:
+        executor.run(lambda: None)
+
+    release.set()
+    running.join(5)
+    queued.join(5)
+
+    stats = executor.stats()
+    assert excinfo.value.retry_after >= 1
+    assert stats["rejected"] == 1
+    assert stats["peak_queued"] == 1
+    assert stats["completed"] == 2
+
+
+def test_configure_torch_threads_splits_cores():
+    """Torch threads are divided between all slots"""
+    with patch("app.services.executor.os.cpu_count", return_value=8), patch(
+        "app.services.executor.Config.TORCH_THREADS_PER_SLOT", 0
+    ), patch("app.services.executor.Config.TRANSCRIBER_SLOTS", 2), patch(
+        "app.services.executor.Config.VOICE_CLONER_SLOTS", 2
+    ), patch(
+        "app.services.executor.torch.set_num_threads"
+    ) as set_num_threads:
+        assert configure_torch_threads() == 2
+
+    set_num_threads.assert_called_once_with(2)
+
+
+def test_get_executor_per_model():
+    """Each model gets its own executor with its kind's slots"""
+    with patch("app.services.executor._executors", {}), patch(
+        "app.services.executor.Config.TRANSCRIBER_SLOTS", 3
+    ):
+        tiny = get_executor("transcriber", "tiny")
+        large = get_executor("transcriber", "large")
+
+        assert get_executor("transcriber", "tiny") is tiny
+        assert large is not tiny
+        assert large.stats()["slots"] == 3
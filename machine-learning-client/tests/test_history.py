@@ -0,0 +1,42 @@
+"""History entry unit tests"""
+
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from bson import ObjectId
+
+from app.services.history import record_result
+
+
+def test_record_result_saves_entry_for_user():
+    """Results are saved to history and the user's list of entries"""
+    owner, entry_id, audio_id = ObjectId(), ObjectId(), ObjectId()
+    database = MagicMock()
+    database.history.insert_one.return_value.inserted_id = entry_id
+    result = {
+        "timestamp": "2025-01-01T12:00:00",
+        "english_text": "Hello",
+        "output_file_id": str(audio_id),
+        "segments": {"start": [0.0], "end": [1.0], "text": ["Hello"]},
+    }
+
+    assert record_result(database, str(owner), result, "a.wav") == entry_id
+
+    entry = database.history.insert_one.call_args.args[0]
+    assert entry["owner"] == owner
+    assert entry["timestamp"] == datetime(2025, 1, 1, 12)
+    assert entry["output_file_id"] == audio_id
+    assert entry["segment_count"] == 1
+    assert entry["file_name"] == "a.wav"
+    database.users.update_one.assert_called_once_with(
+        {"_id": owner}, {"$push": {"history": entry_id}}
+    )
+
+
+def test_record_result_skips_unknown_users():
+    """Anonymous batches are not recorded"""
+    database = MagicMock()
+
+    assert record_result(database, "anonymous", {}, "a.wav") is None
+    assert record_result(None, str(ObjectId()), {}, "a.wav") is None
+    database.history.insert_one.assert_not_called()
@@ -0,0 +1,99 @@
+"""Model cache and prefetch unit tests"""
+
+import hashlib
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.models.artifacts import (
+    ArtifactMissingError,
+    check_offline_cache,
+    load_whisper_checkpoint,
+    record_artifact,
+    require_artifact,
+    verify_artifact,
+)
+from app.prefetch import main
+
+
+def write_file(path, data):
+    """Write bytes to a file, creating its directory"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+    return str(path)
+
+
+def test_verify_artifact_detects_corruption(cache_dir):
+    """Recorded files verify until their content changes"""
+    path = write_file(cache_dir / "tts" / "model.pth", b"weights")
+    record_artifact("tts-model", [path])
+
+    assert verify_artifact("tts-model") == []
+
+    write_file(path, b"WEIGHTS")
+    assert verify_artifact("tts-model", checksums=False) == []
+    assert verify_artifact("tts-model") == [
+        os.path.join("tts", "model.pth") + " has the wrong checksum"
+    ]
+    assert verify_artifact("tts-other") == ["tts-other is not in the model cache"]
+
+
+@patch("app.models.artifacts.Config.OFFLINE_MODE", True)
+@patch("app.models.artifacts.Config.TRANSCRIBER_MODEL_SIZES", ["tiny"])
+@patch("app.models.artifacts.Config.CASCADE_MODEL_SIZE", "")
+@patch("app.models.artifacts.Config.TTS_MODEL_NAMES", [])
+def test_offline_mode_requires_cached_models(cache_dir):
+    """Offline startup fails until every configured model is cached"""
+    with pytest.raises(ArtifactMissingError, match="whisper-tiny"):
+        check_offline_cache()
+
+    checkpoint = write_file(cache_dir / "whisper" / "tiny.pt", b"checkpoint")
+    record_artifact("whisper-tiny", [checkpoint])
+    check_offline_cache()
+
+    with pytest.raises(ArtifactMissingError):
+        require_artifact("tts-missing")
+
+
+@patch("app.models.artifacts.Config.OFFLINE_MODE", True)
+def test_offline_whisper_loads_by_path(cache_dir):
+    """Offline Whisper loads from the cached checkpoint, never by name"""
+    checkpoint = write_file(cache_dir / "whisper" / "tiny.pt", b"checkpoint")
+    record_artifact("whisper-tiny", [checkpoint])
+
+    with patch("app.models.artifacts.whisper.load_model") as load_model:
+        model = load_whisper_checkpoint("tiny", device="cpu")
+
+    load_model.assert_called_once_with(checkpoint, device="cpu")
+    assert model is load_model.return_value
+    load_model.return_value.set_alignment_heads.assert_called_once()
+
+
+@patch("app.prefetch.Config.TRANSCRIBER_MODEL_SIZES", ["tiny"])
+@patch("app.prefetch.Config.CASCADE_MODEL_SIZE", "")
+@patch("app.prefetch.Config.TTS_MODEL_NAMES", ["tts_models/en/ds/model"])
+def test_prefetch_fetches_and_verifies(cache_dir):
+    """Prefetch downloads every model and checks the published checksum"""
+
+    def download(url, root, in_memory):  # pylint: disable=unused-argument
+        return write_file(os.path.join(root, "tiny.pt"), b"checkpoint")
+
+    def download_tts(model_name):  # pylint: disable=unused-argument
+        write_file(cache_dir / "tts" / "tts_models--en--ds--model" / "a.pth", b"a")
+
+    manager = MagicMock()
+    manager.download_model.side_effect = download_tts
+
+    with patch("app.prefetch.whisper._download", side_effect=download), patch(
+        "app.prefetch.ModelManager", return_value=manager
+    ), patch("app.prefetch.whisper_sha256") as published:
+        published.return_value = "0" * 64
+        assert main([]) == 1
+
+        published.return_value = hashlib.sha256(b"checkpoint").hexdigest()
+        assert main([]) == 0
+        assert main(["--verify"]) == 0
+
+    assert manager.download_model.call_count == 2
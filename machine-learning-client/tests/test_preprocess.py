@@ -0,0 +1,88 @@
+"""Audio preprocessing unit tests"""
+
+from unittest.mock import patch
+
+import numpy as np
+
+from app.services.preprocess import (
+    PreparedAudio,
+    downmix,
+    normalize_loudness,
+    prepare_audio,
+    remove_dc,
+)
+
+
+def tone(seconds=1.0, amplitude=0.01, rate=16000):
+    """Sine tone at 440 Hz"""
+    t = np.arange(int(seconds * rate)) / rate
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def level_dbfs(audio):
+    """RMS level of a waveform in dBFS"""
+    return 20 * np.log10(np.sqrt(np.mean(np.square(audio, dtype=np.float64))))
+
+
+def test_downmix_and_remove_dc():
+    """Channels are averaged and the offset removed"""
+    stereo = np.stack([tone() + 0.2, tone() + 0.4], axis=1)
+
+    mono = remove_dc(downmix(stereo))
+
+    assert mono.ndim == 1
+    assert mono.dtype == np.float32
+    assert abs(float(mono.mean())) < 1e-6
+    np.testing.assert_allclose(mono, tone(), atol=1e-5)
+
+
+def test_normalize_loudness_reaches_target_within_limits():
+    """Quiet speech is raised to the target without clipping or blowing up noise"""
+    normalized = normalize_loudness(tone(amplitude=0.01), -20, 30)
+    assert abs(level_dbfs(normalized) - -20) < 0.5
+
+    # Gain is capped for near-silence
+    hiss = normalize_loudness(tone(amplitude=1e-4), -20, 30)
+    assert abs(level_dbfs(hiss) - (level_dbfs(tone(amplitude=1e-4)) + 30)) < 0.5
+
+    # Peaks never exceed full scale
+    spiky = tone(amplitude=0.01)
+    spiky[100] = 0.5
+    assert np.max(np.abs(normalize_loudness(spiky, -3, 30))) <= 0.98 + 1e-6
+
+
+def test_prepared_audio_resamples_once_per_rate():
+    """Each model rate is resampled once and reused"""
+    prepared = PreparedAudio(tone())
+
+    with patch(
+        "app.services.preprocess.resample", wraps=lambda a, o, t: a[:: o // t]
+    ) as resample:
+        assert len(prepared.at_rate(8000)) == 8000
+        prepared.at_rate(8000)
+        assert prepared.at_rate(16000) is prepared.audio
+
+    resample.assert_called_once()
+    assert prepared.duration == 1.0
+
+
+def test_prepared_audio_polyphase_resample():
+    """Resampled audio keeps its duration and level"""
+    resampled = PreparedAudio(tone(amplitude=0.5)).at_rate(22050)
+
+    assert len(resampled) == 22050
+    assert resampled.dtype == np.float32
+    assert (
+        abs(level_dbfs(resampled[1000:-1000]) - level_dbfs(tone(amplitude=0.5))) < 0.1
+    )
+
+
+@patch("app.services.preprocess.Config.PREPROCESS_AUDIO", False)
+def test_prepare_audio_passthrough_and_undecodable():
+    """Conditioning can be turned off, and undecodable files are left to the models"""
+    audio = tone() + 0.1
+
+    np.testing.assert_array_equal(prepare_audio("clip.wav", audio).audio, audio)
+
+    with patch("app.services.preprocess.load_audio", side_effect=RuntimeError):
+        assert prepare_audio("clip.mp3") is None
@@ -1,10 +1,13 @@
 """Processor service unit tests"""
 
 from unittest.mock import MagicMock, patch
-import app.services.processor
 
+import numpy as np
+import pytest
+import soundfile
 
-app.services.processor.gridfs = MagicMock()
+from app.services.cancellation import JobCancelledError, track_job
+from app.services.processor import Processor, compact_segments
 
 
 def test_transcribe(mock_ml_client):
@@ -51,10 +54,23 @@ def test_clone_voice(mock_ml_client):
     assert output_path == "output.mp3"
 
 
+ENCODED = {
+    "path": "output.ogg",
+    "codec": "opus",
+    "mimetype": "audio/ogg",
+    "duration": 1.5,
+    "sample_rate": 16000,
+    "peaks": [0.1, 0.5],
+}
+
+
 @patch("builtins.open")
 @patch("os.remove")
-@patch("app.services.processor.gridfs.upload_from_stream")
-def test_process_audio_file(mock_upload, mock_remove, mock_open, mock_ml_client):
+@patch("app.services.processor.encode_audio", side_effect=lambda *_: dict(ENCODED))
+@patch("app.services.processor.get_storage")
+def test_process_audio_file(
+    mock_storage, mock_encode, mock_remove, mock_open, mock_ml_client
+):
     """Test process_audio_file function wiht mocks"""
     mock_open.new_callable = MagicMock()
 
@@ -64,7 +80,8 @@ def test_process_audio_file(mock_upload, mock_remove, mock_open, mock_ml_client)
     )
     # Mock voice cloning
     mock_ml_client.clone_voice = MagicMock(return_value="output.mp3")
-    # Mock GridFS
+    # Mock storage
+    mock_upload = mock_storage.return_value.put
     mock_upload.return_value = "mock_file_id"
 
     result = mock_ml_client.process_audio_file("audio.mp3")
@@ -75,10 +92,186 @@ def test_process_audio_file(mock_upload, mock_remove, mock_open, mock_ml_client)
     assert result["english_text"] == "Hello"
     assert result["output_file_id"] == "mock_file_id"
     assert result["processing_time"] == 2.0
+    assert result["output_mimetype"] == "audio/ogg"
+    assert result["duration"] == 1.5
+    assert list(result["usage"]["stages"]) == [
+        "preprocess",
+        "translate",
+        "reference",
+        "clone",
+        "encode",
+        "store",
+    ]
+    assert result["usage"]["output_seconds"] == 1.5
 
-    mock_ml_client.translate_to_english.assert_called_once_with("audio.mp3")
+    mock_ml_client.translate_to_english.assert_called_once_with("audio.mp3", audio=None)
     mock_ml_client.clone_voice.assert_called_once_with(
-        reference_audio="audio.mp3", text="Hello", target_language="en"
+        reference_audio="audio.mp3",
+        text="Hello",
+        target_language="en",
+        output_dir=None,
+        speaker_embedding=None,
+        segments=None,
     )
+    assert result["peaks"] == [0.1, 0.5]
+    mock_encode.assert_called_once_with("output.mp3", "opus", 200)
     mock_upload.assert_called_once()
-    mock_remove.assert_called_once_with("output.mp3")
+    assert mock_upload.call_args.args[0] == "output.ogg"
+    assert mock_upload.call_args.kwargs["metadata"]["codec"] == "opus"
+    mock_remove.assert_any_call("output.mp3")
+    mock_remove.assert_any_call("output.ogg")
+
+
+@patch("builtins.open")
+@patch("os.remove")
+@patch("app.services.processor.encode_audio", side_effect=lambda *_: dict(ENCODED))
+@patch("app.services.processor.get_storage")
+@patch("app.services.processor.Config.REFERENCE_SECONDS", 2)
+def test_process_audio_file_encodes_selected_reference(
+    _mock_storage, _mock_encode, _mock_remove, _mock_open, mock_ml_client
+):
+    """Only the selected reference speech is encoded for cloning"""
+    audio = np.random.default_rng(0).standard_normal(16000 * 5).astype(np.float32)
+    mock_ml_client.translate_to_english = MagicMock(
+        return_value={
+            "text": "Hello",
+            "source_language": "fr",
+            "segments": [
+                {"start": 0.0, "end": 5.0, "text": "Hello", "no_speech_prob": 0.1}
+            ],
+        }
+    )
+    mock_ml_client.clone_voice = MagicMock(return_value="output.mp3")
+    mock_ml_client.voice_cloner.get_waveform_embedding.return_value = [0.5]
+    mock_ml_client.voice_cloner.embedding_sample_rate.return_value = 22050
+
+    result = mock_ml_client.process_audio_file("audio.mp3", audio=audio)
+
+    reference, rate = mock_ml_client.voice_cloner.get_waveform_embedding.call_args[0]
+    assert len(reference) == 2 * 22050
+    assert rate == 22050
+    assert mock_ml_client.clone_voice.call_args.kwargs["speaker_embedding"] == [0.5]
+    assert result["reference_seconds"] == 2.0
+
+
+@patch("builtins.open")
+@patch("os.remove")
+@patch("app.services.processor.encode_audio", side_effect=lambda *_: dict(ENCODED))
+@patch("app.services.processor.get_storage")
+def test_process_audio_file_cleans_up_on_upload_error(
+    mock_storage, _mock_encode, mock_remove, _mock_open, mock_ml_client
+):
+    """Test process_audio_file removes the output when the upload fails"""
+    mock_ml_client.translate_to_english = MagicMock(
+        return_value={"text": "Hello", "source_language": "fr"}
+    )
+    mock_ml_client.clone_voice = MagicMock(return_value="output.wav")
+    mock_storage.return_value.put.side_effect = RuntimeError("GridFS down")
+
+    with pytest.raises(RuntimeError):
+        mock_ml_client.process_audio_file("audio.mp3", output_dir="/tmp/ws")
+
+    mock_remove.assert_any_call("output.wav")
+    mock_remove.assert_any_call("output.ogg")
+    assert mock_ml_client.clone_voice.call_args.kwargs["output_dir"] == "/tmp/ws"
+
+
+@patch("app.services.processor.get_storage")
+def test_process_audio_file_mock_mode(mock_storage, voice_cloner, tmp_path):
+    """Test the mock-mode voice cloner output is encoded and stored"""
+    audio_path = tmp_path / "audio.wav"
+    audio = np.zeros(16000, dtype=np.float32)
+    soundfile.write(audio_path, audio, 16000)
+    processor = Processor()
+    processor.transcriber = MagicMock()
+    processor.transcriber.translate_to_english.return_value = {
+        "text": "Hello",
+        "source_language": "fr",
+    }
+    processor.voice_cloner = voice_cloner
+    mock_storage.return_value.put.return_value = "mock_file_id"
+
+    result = processor.process_audio_file(
+        str(audio_path), audio=audio, output_dir=str(tmp_path)
+    )
+
+    assert result["output_file_id"] == "mock_file_id"
+    assert result["duration"] == pytest.approx(1.0, abs=0.05)
+    assert list(tmp_path.iterdir()) == [audio_path]
+
+
+@patch("app.services.processor.prepare_audio")
+def test_process_audio_file_cancelled_before_preprocessing(
+    mock_prepare, mock_ml_client
+):
+    """A job cancelled while queued stops before decoding its upload"""
+    with track_job("job-1", "user-1") as token:
+        token.cancel()
+        with pytest.raises(JobCancelledError):
+            mock_ml_client.process_audio_file("audio.mp3")
+
+    mock_prepare.assert_not_called()
+
+
+def test_process_batch_reuses_speaker_embedding(mock_ml_client):
+    """Test process_batch computes one embedding for a single speaker"""
+    mock_ml_client.voice_cloner.get_speaker_embedding.return_value = [0.1, 0.2]
+    mock_ml_client.process_audio_file = MagicMock(
+        side_effect=[{"english_text": "One"}, RuntimeError("bad audio")]
+    )
+    on_result = MagicMock()
+
+    results = mock_ml_client.process_batch(
+        ["a.wav", "b.wav"], output_dir="/tmp/ws", same_speaker=True, on_result=on_result
+    )
+
+    assert results == [{"english_text": "One"}, None]
+    mock_ml_client.voice_cloner.get_speaker_embedding.assert_called_once_with("a.wav")
+    for call in mock_ml_client.process_audio_file.call_args_list:
+        assert call.kwargs["speaker_embedding"] == [0.1, 0.2]
+    on_result.assert_any_call(0, {"english_text": "One"}, None)
+    on_result.assert_any_call(1, None, "bad audio")
+
+
+def test_compact_segments():
+    """Test Whisper segments become columnar arrays"""
+    segments = [
+        {"id": 0, "start": 0.0, "end": 2.456, "text": " Hello", "tokens": [1, 2]},
+        {"id": 1, "start": 2.456, "end": 4.0, "text": " world.", "avg_logprob": -0.2},
+    ]
+
+    assert compact_segments(segments) == {
+        "start": [0.0, 2.46],
+        "end": [2.46, 4.0],
+        "text": ["Hello", "world."],
+    }
+
+
+@patch("builtins.open")
+@patch("os.remove")
+@patch("app.services.processor.encode_audio", side_effect=lambda *_: dict(ENCODED))
+@patch("app.services.processor.get_storage")
+def test_process_audio_file_aligned(
+    _mock_storage, _mock_encode, _mock_remove, _mock_open, mock_ml_client
+):
+    """Test aligned processing passes the source segments to voice cloning"""
+    mock_ml_client.translate_to_english = MagicMock(
+        return_value={
+            "text": "Hello world",
+            "source_language": "fr",
+            "segments": [
+                {"start": 0.0, "end": 1.0, "text": " Hello"},
+                {"start": 1.5, "end": 2.0, "text": " world"},
+            ],
+        }
+    )
+    mock_ml_client.clone_voice = MagicMock(return_value="output.wav")
+
+    result = mock_ml_client.process_audio_file("audio.mp3", aligned=True)
+
+    assert result["aligned"]
+    assert mock_ml_client.clone_voice.call_args.kwargs["segments"] == {
+        "start": [0.0, 1.5],
+        "end": [1.0, 2.0],
+        "text": ["Hello", "world"],
+    }
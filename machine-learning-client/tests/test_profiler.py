@@ -0,0 +1,67 @@
+"""Sampling profiler unit tests"""
+
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.services.profiler import (
+    ProfilerBusyError,
+    SamplingProfiler,
+    _process_lock,
+    profile_process,
+)
+
+
+def spin(seconds):
+    """Keep the CPU busy for a while"""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+def test_profiler_samples_busy_thread():
+    """Samples land on the busy function of the profiled thread"""
+    with SamplingProfiler(interval=0.001, thread_ids=[threading.get_ident()]) as prof:
+        spin(0.2)
+
+    lines = prof.collapsed().splitlines()
+    assert prof.sample_count > 0
+    assert lines
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any(";spin (test_profiler.py:" in line for line in lines)
+    assert all(line.startswith("MainThread;") for line in lines)
+
+
+def test_profiler_skips_idle_threads():
+    """Threads blocked on a lock are left out unless asked for"""
+    release = threading.Event()
+    waiter = threading.Thread(target=release.wait, name="waiter")
+    waiter.start()
+    try:
+        with SamplingProfiler(interval=0.001, thread_ids=[waiter.ident]) as busy:
+            time.sleep(0.05)
+        with SamplingProfiler(
+            interval=0.001, thread_ids=[waiter.ident], idle=True
+        ) as idle:
+            time.sleep(0.05)
+    finally:
+        release.set()
+        waiter.join()
+
+    assert busy.collapsed() == ""
+    assert idle.collapsed().startswith("waiter;")
+
+
+@patch("app.services.profiler.Config.PROFILE_MAX_SECONDS", 0.05)
+def test_profile_process_one_at_a_time():
+    """Profiles are capped in length and refused while another runs"""
+    with _process_lock, pytest.raises(ProfilerBusyError):
+        profile_process(1)
+
+    started = time.monotonic()
+    profiler = profile_process(60, interval=0.001)
+
+    assert time.monotonic() - started < 1
+    assert profiler.sample_count > 0
@@ -0,0 +1,110 @@
+"""Speaker profile unit tests"""
+
+import io
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from app.services.profiles import ProfileStore, average_embeddings
+
+
+def test_average_embeddings_extends_previous():
+    """Appended clips are weighted like the clips already averaged"""
+    assert average_embeddings([[1.0, 0.0], [3.0, 2.0]]) == [2.0, 1.0]
+    assert average_embeddings([[4.0, 4.0]], previous=[1.0, 1.0], previous_clips=2) == [
+        2.0,
+        2.0,
+    ]
+
+
+def test_enroll_appends_to_stored_profile():
+    """Enrolling with append averages into the stored profile"""
+    database = MagicMock()
+    store = ProfileStore(database)
+    store.profiles.find_one.return_value = {"embedding": [0.0, 0.0], "clips": 1}
+
+    profile = store.enroll("user-1", "your_tts", [[3.0, 6.0]], append=True)
+
+    assert profile["embedding"] == [1.5, 3.0]
+    assert profile["clips"] == 2
+    store.profiles.update_one.assert_called_once()
+    assert store.profiles.update_one.call_args[0][0] == {
+        "user_id": "user-1",
+        "model": "your_tts",
+    }
+
+
+@patch("app.api.routes.allowed_file", return_value=True)
+@patch("app.api.routes.get_profiles")
+@patch("app.api.routes.get_voice_cloner")
+def test_enroll_profile_route(
+    mock_get_voice_cloner, mock_get_profiles, _mock_allowed_file, client
+):
+    """Every clip is encoded and the embeddings are enrolled together"""
+    voice_cloner = MagicMock()
+    voice_cloner.model_name = "your_tts"
+    voice_cloner.get_speaker_embedding.side_effect = [[1.0], [3.0]]
+    mock_get_voice_cloner.return_value = voice_cloner
+    mock_get_profiles.return_value.enroll.return_value = {
+        "model": "your_tts",
+        "clips": 2,
+        "updated": datetime(2025, 1, 1),
+    }
+
+    response = client.post(
+        "/profiles",
+        data={
+            "audio": [(io.BytesIO(b"one"), "one.wav"), (io.BytesIO(b"two"), "two.wav")]
+        },
+        headers={"X-User-Id": "user-1"},
+    )
+
+    assert response.status_code == 201
+    assert response.json == {
+        "model": "your_tts",
+        "clips": 2,
+        "updated": "2025-01-01T00:00:00",
+    }
+    mock_get_profiles.return_value.enroll.assert_called_once_with(
+        "user-1", "your_tts", [[1.0], [3.0]], append=False
+    )
+
+
+def test_enroll_profile_requires_user(client):
+    """Profiles belong to a user"""
+    response = client.post(
+        "/profiles", data={"audio": [(io.BytesIO(b"one"), "one.wav")]}
+    )
+    assert response.status_code == 400
+
+
+@patch("app.api.routes.allowed_file", return_value=True)
+@patch("app.api.routes.Processor")
+@patch("app.api.routes.get_profiles")
+@patch("app.api.routes.receive_stream")
+def test_process_with_profile(
+    mock_receive, mock_get_profiles, mock_processor_class, _mock_allowed_file, client
+):
+    """The enrolled embedding replaces the voice of the upload"""
+    mock_receive.return_value = {
+        "path": "/tmp/test.wav",
+        "size": 19,
+        "sha256": "abc",
+        "audio": None,
+    }
+    mock_processor_class.return_value.process_audio_file.return_value = {}
+    mock_get_profiles.return_value.get.side_effect = [None, {"embedding": [0.5]}]
+    headers = {"X-Filename": "clip.wav", "X-User-Id": "user-1"}
+
+    with patch("app.api.routes.probe_duration", return_value=1.0):
+        missing = client.post(
+            "/process/stream?profile=true", data=b"audio", headers=headers
+        )
+        response = client.post(
+            "/process/stream?profile=true", data=b"audio", headers=headers
+        )
+
+    assert missing.status_code == 404
+    assert response.status_code == 200
+    assert response.json["voice_profile"] is True
+    kwargs = mock_processor_class.return_value.process_audio_file.call_args[1]
+    assert kwargs["speaker_embedding"] == [0.5]
@@ -0,0 +1,47 @@
+"""Reference speech selection unit tests"""
+
+import numpy as np
+
+from app.services.reference import estimate_snr, select_reference
+
+RATE = 1000
+
+
+def speech(seconds, noise, seed=0):
+    """Bursts of tone separated by pauses, over white noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * RATE)) / RATE
+    bursts = np.sin(2 * np.pi * 50 * t) * (np.sin(2 * np.pi * 2 * t) > 0)
+    return (bursts + noise * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def test_estimate_snr_prefers_clean_speech():
+    """Noise raises the floor between words and lowers the estimate"""
+    assert estimate_snr(speech(2, 0.01), frame_size=20) > estimate_snr(
+        speech(2, 0.3), frame_size=20
+    )
+
+
+def test_select_reference_keeps_best_segments():
+    """The cleanest speech is kept, up to the budget, in source order"""
+    audio = np.concatenate([speech(4, 0.3), speech(4, 0.01, seed=1), speech(4, 0)])
+    segments = [
+        {"start": 0.0, "end": 4.0, "no_speech_prob": 0.1},
+        {"start": 4.0, "end": 8.0, "no_speech_prob": 0.1},
+        # Clean, but probably not speech
+        {"start": 8.0, "end": 12.0, "no_speech_prob": 0.9},
+    ]
+
+    reference = select_reference(audio, segments, seconds=3, sample_rate=RATE)
+
+    assert len(reference) == 3 * RATE
+    np.testing.assert_array_equal(reference, audio[4 * RATE : 7 * RATE])
+
+
+def test_select_reference_short_or_silent_audio():
+    """Short uploads are used whole; uploads without speech are not"""
+    audio = speech(2, 0.01)
+    assert select_reference(audio, [], seconds=5, sample_rate=RATE) is audio
+
+    segments = [{"start": 0.0, "end": 2.0, "no_speech_prob": 0.95}]
+    assert select_reference(audio, segments, seconds=1, sample_rate=RATE) is None
@@ -0,0 +1,107 @@
+"""Model registry unit tests"""
+
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.models import registry
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    """Run every test against an empty registry"""
+    with patch.object(registry, "_models", registry.OrderedDict()), patch.dict(
+        registry._counters,  # pylint: disable=protected-access
+        {"hits": 0, "loads": 0, "evictions": 0},
+    ):
+        yield
+
+
+def fake_model(megabytes):
+    """Model whose weights take the given memory"""
+    model = MagicMock()
+    model.memory_bytes.return_value = megabytes * 2**20
+    return model
+
+
+def load(name, model, requires=()):
+    """Get a model from the registry, loading it as ``model``"""
+    return registry._get_or_load(  # pylint: disable=protected-access
+        name, lambda: model, requires
+    )
+
+
+@patch("app.models.registry.Config.MODEL_MEMORY_BUDGET_MB", 250)
+def test_evicts_least_recently_used_over_budget():
+    """Loading past the budget evicts the least recently used model"""
+    first, second, third = fake_model(100), fake_model(100), fake_model(100)
+    load("a", first)
+    load("b", second)
+    assert load("a", MagicMock()) is first
+
+    load("c", third)
+
+    stats = registry.registry_stats()
+    assert list(stats["models"]) == ["a", "c"]
+    assert stats["used_bytes"] == 200 * 2**20
+    assert (stats["hits"], stats["loads"], stats["evictions"]) == (1, 3, 1)
+    second.close.assert_called_once()
+
+
+@patch("app.models.registry.Config.MODEL_MEMORY_BUDGET_MB", 250)
+def test_required_models_are_not_evicted():
+    """A model another loaded model depends on stays loaded"""
+    load("small", fake_model(100))
+    load("tiny", fake_model(100), requires=("small",))
+    load("tts", fake_model(100))
+
+    # "small" is least recently used but still needed by "tiny"
+    assert list(registry.registry_stats()["models"]) == ["small", "tts"]
+
+
+@patch("app.models.registry.Config.CASCADE_MODEL_SIZE", "small")
+@patch("app.models.registry.Transcriber")
+def test_get_transcriber_shares_cascade_model(mock_transcriber):
+    """Transcribers of each size are shared, escalating to one cascade model"""
+    tiny = registry.get_transcriber("tiny")
+    small = registry.get_transcriber("small")
+
+    assert registry.get_transcriber("tiny") is tiny
+    mock_transcriber.assert_any_call("small", escalation=None)
+    mock_transcriber.assert_any_call("tiny", escalation=small)
+    assert mock_transcriber.call_count == 2
+
+
+def test_loading_does_not_block_other_models():
+    """A cold load blocks neither loaded models nor a second load of itself"""
+    loaded, slow = fake_model(1), fake_model(1)
+    load("fast", loaded)
+    started, finish = threading.Event(), threading.Event()
+    loads = []
+
+    def load_slowly():
+        loads.append(1)
+        started.set()
+        finish.wait(5)
+        return slow
+
+    def get_slow():
+        results.append(
+            registry._get_or_load(  # pylint: disable=protected-access
+                "slow", load_slowly
+            )
+        )
+
+    results = []
+    threads = [threading.Thread(target=get_slow) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    assert started.wait(5)
+
+    assert load("fast", MagicMock()) is loaded
+    finish.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == [slow, slow]
+    assert loads == [1]
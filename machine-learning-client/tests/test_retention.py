@@ -0,0 +1,108 @@
+"""Garbage collection and retention unit tests"""
+
+from unittest.mock import MagicMock
+
+from bson import ObjectId
+
+from app.services.retention import collect_orphans, expire_history
+
+
+def _cursor(docs):
+    """Mock Mongo cursor supporting sort/limit chaining"""
+    cursor = MagicMock()
+    cursor.sort.return_value = cursor
+    cursor.limit.return_value = docs
+    return cursor
+
+
+def test_collect_orphans_deletes_unreferenced_files():
+    """Only files no history entry points to are deleted"""
+    referenced, orphan, cold_orphan = ObjectId(), ObjectId(), ObjectId()
+    storage = MagicMock()
+    storage.files.find.side_effect = [
+        _cursor([{"_id": referenced}, {"_id": orphan}]),
+        _cursor([]),
+    ]
+    storage.cold.find.side_effect = [_cursor([{"_id": cold_orphan}]), _cursor([])]
+    storage.delete.return_value = 100
+    database = MagicMock()
+    database.history.distinct.side_effect = [[referenced], []]
+
+    report = collect_orphans(storage, database, grace_period=3600, batch_size=10)
+
+    assert report == {"deleted": 2, "bytes": 200}
+    deleted = [call.args[0] for call in storage.delete.call_args_list]
+    assert deleted == [orphan, cold_orphan]
+    assert "uploadDate" in storage.files.find.call_args_list[0].args[0]
+
+
+def test_collect_orphans_is_bounded():
+    """No more than batch_size files are deleted in one pass"""
+    storage = MagicMock()
+    storage.files.find.return_value = _cursor([{"_id": ObjectId()} for _ in range(5)])
+    storage.delete.return_value = 1
+    database = MagicMock()
+    database.history.distinct.return_value = []
+
+    report = collect_orphans(storage, database, grace_period=0, batch_size=3)
+
+    assert report["deleted"] == 3
+    storage.cold.find.assert_not_called()
+
+
+def test_collect_orphans_resumes_between_passes():
+    """Each pass examines one page per tier, resuming where the last stopped"""
+    first, second = ObjectId(), ObjectId()
+    storage = MagicMock()
+    storage.files.find.side_effect = [
+        _cursor([{"_id": first}, {"_id": second}]),
+        _cursor([]),
+    ]
+    storage.cold.find.return_value = _cursor([])
+    database = MagicMock()
+    database.history.distinct.return_value = [first, second]
+    cursors = {}
+
+    collect_orphans(storage, database, grace_period=0, batch_size=2, cursors=cursors)
+    assert cursors == {"hot": second, "cold": None}
+    assert storage.files.find.call_count == 1
+
+    collect_orphans(storage, database, grace_period=0, batch_size=2, cursors=cursors)
+    assert storage.files.find.call_args.args[0]["_id"] == {"$gt": second}
+    assert cursors == {"hot": None, "cold": None}
+    storage.delete.assert_not_called()
+
+
+def test_expire_history_uses_per_user_retention():
+    """Users' own retention overrides the default; 0 keeps everything"""
+    keep_forever, short, other = ObjectId(), ObjectId(), ObjectId()
+    old_id, short_id, audio_id = ObjectId(), ObjectId(), ObjectId()
+    storage = MagicMock()
+    storage.delete.return_value = 50
+    database = MagicMock()
+    database.users.find.return_value = [
+        {"_id": keep_forever, "retention_days": 0},
+        {"_id": short, "retention_days": 7},
+    ]
+    database.history.find.return_value.limit.side_effect = [
+        [{"_id": old_id, "owner": other}],
+        [{"_id": short_id, "owner": short, "output_file_id": audio_id}],
+    ]
+
+    report = expire_history(storage, database, default_days=30, batch_size=10)
+
+    assert report == {"deleted": 2, "bytes": 50}
+    # Users on the default are expired by age without being looked up
+    database.users.find.assert_called_once_with(
+        {"retention_days": {"$exists": True}}, {"retention_days": 1}
+    )
+    default_query, short_query = [
+        call.args[0] for call in database.history.find.call_args_list
+    ]
+    assert default_query["owner"] == {"$nin": [keep_forever, short]}
+    assert short_query["owner"] == short
+    storage.delete.assert_called_once_with(audio_id)
+    database.history.delete_many.assert_called_with({"_id": {"$in": [short_id]}})
+    database.users.update_many.assert_any_call(
+        {"_id": {"$in": [other]}}, {"$pull": {"history": {"$in": [old_id]}}}
+    )
@@ -1,9 +1,20 @@
 """Test for api route"""
 
+import hashlib
 import io
 import os
+import time
+import zipfile
 from unittest.mock import MagicMock, patch
 
+from bson import ObjectId
+
+from app.config import Config
+from app.services.admission import AdmissionRejectedError
+from app.services.cancellation import DeadlineExceededError, check_cancelled
+from app.services.executor import ExecutorBusyError
+from app.services.scheduler import SchedulerBusyError
+
 
 def test_process_no_file(client):
     """Process function without file test"""
@@ -31,10 +42,14 @@ def test_process_disallowed_file(mock_allowed_file, client):
 
 
 @patch("app.api.routes.Processor")
-@patch("os.remove")
+@patch("app.services.workspace.scratch_root")
 @patch("app.api.routes.allowed_file")
-def test_process_success(mock_allowed_file, mock_remove, mock_processor_class, client):
+def test_process_success(
+    mock_allowed_file, mock_scratch_root, mock_processor_class, client, tmp_path
+):
     """Process function unit test"""
+    mock_scratch_root.return_value = str(tmp_path)
+
     # Mock processor
     mock_processor = MagicMock()
     mock_processor.process_audio_file.return_value = {
@@ -50,14 +65,27 @@ def test_process_success(mock_allowed_file, mock_remove, mock_processor_class, c
     response = client.post("/process", data=data, content_type="multipart/form-data")
 
     assert response.status_code == 200
-    assert response.json == {"text": "Hello", "audio_id": "123"}
+    assert response.json["text"] == "Hello"
+    assert response.json["audio_id"] == "123"
+    assert (
+        response.json["input_sha256"]
+        == hashlib.sha256(b"dummy audio content").hexdigest()
+    )
 
-    # Check processor was called with correct path
-    uploaded_path = os.path.join("/tmp", "test.wav")
-    mock_processor.process_audio_file.assert_called_once_with(uploaded_path)
+    # Check processor was called with a file inside the request workspace
+    args, kwargs = mock_processor.process_audio_file.call_args
+    workspace_dir = os.path.dirname(args[0])
+    assert os.path.basename(args[0]) == "test.wav"
+    assert os.path.dirname(workspace_dir) == str(tmp_path)
+    assert kwargs == {
+        "audio": None,
+        "output_dir": workspace_dir,
+        "speaker_embedding": None,
+        "aligned": False,
+    }
 
-    # Ensure file cleanup attempted
-    mock_remove.assert_called_once_with(uploaded_path)
+    # Ensure the workspace was cleaned up
+    assert not os.path.exists(workspace_dir)
 
 
 @patch("app.api.routes.Processor")
@@ -81,3 +109,427 @@ def test_process_processor_exception(
 
     assert response.status_code == 500
     assert "Processing failed" in response.json["error"]
+
+
+@patch("app.api.routes.Processor")
+@patch("app.api.routes.receive_stream")
+@patch("app.api.routes.allowed_file", return_value=True)
+def test_process_stream_success(
+    mock_allowed_file, mock_receive, mock_processor_class, client
+):
+    """Raw-body streaming upload test"""
+    mock_receive.return_value = {
+        "path": "/tmp/test.wav",
+        "size": 19,
+        "sha256": "abc",
+        "audio": None,
+    }
+    mock_processor = MagicMock()
+    mock_processor.process_audio_file.return_value = {"english_text": "Hello"}
+    mock_processor_class.return_value = mock_processor
+
+    with patch("os.remove"):
+        response = client.post(
+            "/process/stream",
+            data=b"dummy audio content",
+            headers={
+                "X-Filename": "my%20clip.wav",
+                "Content-Type": "audio/wav",
+                "X-Job-Id": "job-1",
+                "traceparent": f"00-{'a' * 32}-{'b' * 16}-01",
+            },
+        )
+
+    assert response.status_code == 200
+    assert response.json == {
+        "english_text": "Hello",
+        "input_sha256": "abc",
+        "job_id": "job-1",
+        "voice_profile": False,
+        "trace_id": "a" * 32,
+    }
+    assert os.path.basename(mock_receive.call_args[0][1]) == "my_clip.wav"
+    mock_allowed_file.assert_called_once_with("my clip.wav")
+
+
+def test_process_stream_no_filename(client):
+    """Raw-body streaming upload without a file name"""
+    response = client.post("/process/stream", data=b"dummy audio content")
+    assert response.status_code == 400
+    assert response.json == {"error": "No file selected"}
+
+
+@patch("app.api.routes.Processor")
+@patch("app.api.routes.allowed_file", return_value=True)
+def test_process_stream_too_large(_mock_allowed_file, mock_processor_class, client):
+    """Raw-body streaming upload over the size limit"""
+    client.application.config["MAX_CONTENT_LENGTH"] = 4
+
+    response = client.post(
+        "/process/stream",
+        data=b"dummy audio content",
+        headers={"X-Filename": "test.wav"},
+    )
+
+    assert response.status_code == 413
+    mock_processor_class.assert_not_called()
+
+
+@patch("app.api.routes.Processor")
+@patch("app.services.workspace.scratch_root")
+@patch("app.api.routes.allowed_file", return_value=True)
+def test_process_error_removes_workspace(
+    _mock_allowed_file, mock_scratch_root, mock_processor_class, client, tmp_path
+):
+    """Process function test where the upload is removed after a failure"""
+    mock_scratch_root.return_value = str(tmp_path)
+    mock_processor_class.return_value.process_audio_file.side_effect = Exception(
+        "Processing failed"
+    )
+
+    data = {"audio": (io.BytesIO(b"dummy audio content"), "test.wav")}
+    response = client.post("/process", data=data, content_type="multipart/form-data")
+
+    assert response.status_code == 500
+    assert not os.listdir(tmp_path)
+
+
+@patch("app.api.routes.Processor")
+@patch("app.api.routes.allowed_file", return_value=True)
+def test_process_busy_returns_503(_mock_allowed_file, mock_processor_class, client):
+    """Process test where the inference queue is full"""
+    mock_processor_class.return_value.process_audio_file.side_effect = (
+        ExecutorBusyError("transcriber", retry_after=7)
+    )
+
+    data = {"audio": (io.BytesIO(b"dummy audio content"), "test.wav")}
+    response = client.post("/process", data=data, content_type="multipart/form-data")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+
+
+@patch("app.api.routes.Processor")
+@patch("app.api.routes.allowed_file", return_value=True)
+def test_process_past_deadline_returns_504(
+    _mock_allowed_file, mock_processor_class, client
+):
+    """Process test where the client's timeout passes before processing"""
+
+    def process_audio_file(*_args, **_kwargs):
+        time.sleep(0.02)
+        check_cancelled("translation")
+
+    mock_processor_class.return_value.process_audio_file.side_effect = (
+        process_audio_file
+    )
+
+    data = {"audio": (io.BytesIO(b"dummy audio content"), "test.wav")}
+    response = client.post(
+        "/process",
+        data=data,
+        content_type="multipart/form-data",
+        headers={"X-Request-Timeout": "0.01", "X-Job-Id": "job-1"},
+    )
+
+    assert response.status_code == 504
+    assert response.json == {
+        "error": str(
+            DeadlineExceededError("job-1", "exceeded its deadline before translation")
+        )
+    }
+
+
+@patch("app.api.routes.cancel_job")
+def test_cancel_job_endpoint(mock_cancel_job, client):
+    """Cancel endpoint test for a running and an unknown job"""
+    mock_cancel_job.return_value = True
+    response = client.post("/jobs/job-1/cancel", headers={"X-User-Id": "user-1"})
+    assert response.status_code == 202
+    mock_cancel_job.assert_called_once_with("job-1", "user-1")
+
+    mock_cancel_job.return_value = False
+    response = client.post("/jobs/job-2/cancel")
+    assert response.status_code == 404
+
+
+@patch("app.api.routes.Config.TRANSCRIBER_MODEL_SIZES", ["tiny", "small"])
+@patch("app.api.routes.get_admission")
+@patch("app.api.routes.Processor")
+@patch("app.api.routes.allowed_file", return_value=True)
+def test_process_backlogged_returns_503(
+    _mock_allowed_file, mock_processor_class, mock_get_admission, client
+):
+    """Process test where admission control turns the job away"""
+    mock_get_admission.return_value.admit.side_effect = AdmissionRejectedError(
+        900, retry_after=42
+    )
+
+    data = {"audio": (io.BytesIO(b"dummy audio content"), "test.wav")}
+    response = client.post(
+        "/process?transcriber=tiny",
+        data=data,
+        content_type="multipart/form-data",
+        headers={"X-Request-Timeout": "60"},
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "42"
+    # Unprobeable uploads are costed by their size, at the request's models
+    mock_get_admission.return_value.admit.assert_called_once_with(
+        19 / 16000, 60.0, ("tiny", Config.TTS_MODEL_NAME)
+    )
+    mock_processor_class.return_value.process_audio_file.assert_not_called()
+
+
+@patch("app.api.routes.Config.TRANSCRIBER_MODEL_SIZES", ["tiny", "small"])
+@patch("app.api.routes.Processor")
+@patch("app.api.routes.allowed_file", return_value=True)
+def test_process_selects_models(_mock_allowed_file, mock_processor_class, client):
+    """Process test picking a transcriber size per request"""
+    mock_processor_class.return_value.process_audio_file.return_value = {}
+
+    data = {"audio": (io.BytesIO(b"dummy audio content"), "test.wav")}
+    response = client.post(
+        "/process?transcriber=small", data=data, content_type="multipart/form-data"
+    )
+    assert response.status_code == 200
+    mock_processor_class.assert_called_once_with("small", None)
+
+    data = {"audio": (io.BytesIO(b"dummy audio content"), "test.wav")}
+    response = client.post(
+        "/process?transcriber=large", data=data, content_type="multipart/form-data"
+    )
+    assert response.status_code == 400
+    assert response.json == {"error": "Unsupported transcriber: large"}
+
+
+@patch("app.api.routes.Config.ADMIN_TOKEN", "secret")
+@patch("app.api.routes.collect_garbage", return_value={"orphans_deleted": 0})
+@patch("app.api.routes.get_storage")
+def test_storage_maintenance_admin_only(mock_get_storage, mock_collect, client):
+    """Manual migration and GC need the admin token; migration keeps the grace"""
+    mock_get_storage.return_value.migrate.return_value = {"migrated": 0}
+    assert client.post("/storage/migrate").status_code == 401
+    assert client.post("/storage/gc").status_code == 401
+    mock_get_storage.return_value.migrate.assert_not_called()
+    mock_collect.assert_not_called()
+
+    headers = {"Authorization": "Bearer secret"}
+    assert client.post("/storage/migrate", headers=headers).status_code == 200
+    assert client.post("/storage/gc", headers=headers).status_code == 200
+    migrate = mock_get_storage.return_value.migrate
+    assert migrate.call_args.kwargs["grace_period"] == 600
+    mock_collect.assert_called_once_with()
+
+
+@patch("app.api.routes.Config.ADMIN_TOKEN", "secret")
+@patch("app.api.routes.profile_process")
+def test_admin_profile(mock_profile_process, client):
+    """Profiler endpoint test"""
+    mock_profile_process.return_value.collapsed.return_value = "MainThread;run 3\n"
+    mock_profile_process.return_value.sample_count = 3
+
+    assert client.post("/admin/profile").status_code == 401
+    response = client.post(
+        "/admin/profile?seconds=5", headers={"Authorization": "Bearer secret"}
+    )
+
+    assert response.status_code == 200
+    assert response.data == b"MainThread;run 3\n"
+    assert response.headers["X-Profile-Samples"] == "3"
+    mock_profile_process.assert_called_once_with(5.0, None, idle=False)
+
+    with patch("app.api.routes.Config.ADMIN_TOKEN", ""):
+        response = client.post("/admin/profile", headers={"Authorization": "Bearer "})
+    assert response.status_code == 404
+
+
+@patch("app.api.routes.Config.ADMIN_TOKEN", "secret")
+@patch("app.api.routes.Processor")
+@patch("app.api.routes.allowed_file", return_value=True)
+def test_process_cpu_profile(_mock_allowed_file, mock_processor_class, client):
+    """Per-request profiles are returned to admins only"""
+    mock_processor_class.return_value.process_audio_file.return_value = {}
+
+    data = {"audio": (io.BytesIO(b"dummy audio content"), "test.wav")}
+    response = client.post(
+        "/process?cpu_profile=true", data=data, content_type="multipart/form-data"
+    )
+    assert response.status_code == 403
+
+    data = {"audio": (io.BytesIO(b"dummy audio content"), "test.wav")}
+    response = client.post(
+        "/process?cpu_profile=true",
+        data=data,
+        content_type="multipart/form-data",
+        headers={"Authorization": "Bearer secret"},
+    )
+    assert response.status_code == 200
+    assert isinstance(response.json["cpu_profile"], str)
+
+
+def test_metrics(client):
+    """Metrics endpoint test"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "executors" in response.json
+
+
+@patch("app.api.routes.get_scheduler")
+@patch("app.api.routes.Processor")
+@patch("app.api.routes.allowed_file", return_value=True)
+def test_process_schedules_by_user(
+    _mock_allowed_file, mock_processor_class, mock_get_scheduler, client
+):
+    """Process test passing the user id to the scheduler"""
+    mock_processor_class.return_value.process_audio_file.return_value = {}
+
+    data = {"audio": (io.BytesIO(b"dummy audio content"), "test.wav")}
+    response = client.post(
+        "/process",
+        data=data,
+        content_type="multipart/form-data",
+        headers={"X-User-Id": "user-1"},
+    )
+
+    assert response.status_code == 200
+    mock_get_scheduler.return_value.job.assert_called_once_with("user-1", "bulk")
+
+
+@patch("app.api.routes.get_scheduler")
+@patch("app.api.routes.allowed_file", return_value=True)
+def test_process_user_queue_full(_mock_allowed_file, mock_get_scheduler, client):
+    """Process test where the user already has too many jobs queued"""
+    mock_get_scheduler.return_value.job.side_effect = SchedulerBusyError("user-1")
+
+    data = {"audio": (io.BytesIO(b"dummy audio content"), "test.wav")}
+    response = client.post("/process", data=data, content_type="multipart/form-data")
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+
+@patch("app.api.routes.start_batch")
+@patch("app.services.workspace.scratch_root")
+def test_process_batch(mock_scratch_root, mock_start_batch, client, tmp_path):
+    """Batch endpoint receives every file and starts a batch"""
+    mock_scratch_root.return_value = str(tmp_path)
+    mock_start_batch.return_value.to_dict.return_value = {"batch_id": "abc"}
+    client.application.config.update(
+        ALLOWED_EXTENSIONS={"wav"},
+        MAX_BATCH_FILES=10,
+        MAX_BATCH_CONTENT_LENGTH=1024,
+    )
+
+    data = {
+        "audio": [(io.BytesIO(b"one"), "one.wav"), (io.BytesIO(b"two"), "two.wav")],
+        "same_speaker": "true",
+    }
+    response = client.post(
+        "/process/batch",
+        data=data,
+        content_type="multipart/form-data",
+        headers={"X-User-Id": "user-1"},
+    )
+
+    assert response.status_code == 202
+    assert response.json == {"batch_id": "abc"}
+    (
+        user_id,
+        files,
+        _,
+    ) = mock_start_batch.call_args.args
+    assert user_id == "user-1"
+    assert [name for name, _ in files] == ["one.wav", "two.wav"]
+    # Unprobeable files are costed by their size
+    assert mock_start_batch.call_args.kwargs == {
+        "same_speaker": True,
+        "duration": 6 / 16000,
+    }
+
+
+@patch("app.api.routes.start_batch")
+@patch("app.services.workspace.scratch_root")
+def test_process_batch_too_many_files(
+    mock_scratch_root, mock_start_batch, client, tmp_path
+):
+    """Batch endpoint rejects batches over the file limit"""
+    mock_scratch_root.return_value = str(tmp_path)
+    client.application.config.update(
+        ALLOWED_EXTENSIONS={"wav"},
+        MAX_BATCH_FILES=1,
+        MAX_BATCH_CONTENT_LENGTH=1024,
+    )
+
+    data = {"audio": [(io.BytesIO(b"1"), "1.wav"), (io.BytesIO(b"2"), "2.wav")]}
+    response = client.post(
+        "/process/batch", data=data, content_type="multipart/form-data"
+    )
+
+    assert response.status_code == 400
+    mock_start_batch.assert_not_called()
+    assert not os.listdir(tmp_path)
+
+
+@patch("app.api.routes.start_batch")
+@patch("app.services.workspace.scratch_root")
+def test_process_batch_archive_too_many_files(
+    mock_scratch_root, mock_start_batch, client, tmp_path
+):
+    """Batch endpoint rejects archives over the file limit without extracting"""
+    mock_scratch_root.return_value = str(tmp_path)
+    client.application.config.update(
+        ALLOWED_EXTENSIONS={"wav"},
+        MAX_BATCH_FILES=2,
+        MAX_BATCH_CONTENT_LENGTH=1024,
+    )
+    archive_buffer = io.BytesIO()
+    with zipfile.ZipFile(archive_buffer, "w") as archive:
+        archive.writestr("2.wav", b"2")
+        archive.writestr("3.wav", b"3")
+    archive_buffer.seek(0)
+
+    data = {"audio": [(io.BytesIO(b"1"), "1.wav"), (archive_buffer, "clips.zip")]}
+    with patch("app.services.batch.receive_stream") as mock_receive:
+        response = client.post(
+            "/process/batch", data=data, content_type="multipart/form-data"
+        )
+
+    assert response.status_code == 400
+    assert response.json == {"error": "Too many files, the limit is 2"}
+    mock_receive.assert_not_called()
+    mock_start_batch.assert_not_called()
+
+
+@patch("app.api.routes.get_batch")
+def test_batch_status_owner_only(mock_get_batch, client):
+    """Batch status is only visible to its owner"""
+    mock_get_batch.return_value.user_id = "user-1"
+    mock_get_batch.return_value.to_dict.return_value = {"batch_id": "abc"}
+
+    response = client.get("/batch/abc", headers={"X-User-Id": "user-1"})
+    assert response.status_code == 200
+    assert response.json == {"batch_id": "abc"}
+
+    response = client.get("/batch/abc", headers={"X-User-Id": "user-2"})
+    assert response.status_code == 404
+
+
+def test_transcode_endpoint(client):
+    """Test /transcode returns the cached transcode id"""
+    file_id = ObjectId()
+    with patch("app.api.routes.get_storage"), patch(
+        "app.api.routes.get_transcode", return_value=file_id
+    ) as transcode:
+        response = client.post(f"/audio/{ObjectId()}/transcode?format=wav")
+
+    assert response.status_code == 200
+    assert response.json == {"file_id": str(file_id), "mimetype": "audio/wav"}
+    assert transcode.call_args.args[2] == "wav"
+
+
+def test_transcode_endpoint_rejects_unknown_format(client):
+    """Test /transcode with an unsupported format"""
+    response = client.post(f"/audio/{ObjectId()}/transcode?format=mp3")
+    assert response.status_code == 400
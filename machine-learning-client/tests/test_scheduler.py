@@ -0,0 +1,174 @@
+"""Fair scheduler unit tests"""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.services.cancellation import (
+    DeadlineExceededError,
+    JobCancelledError,
+    cancel_job,
+    track_job,
+)
+from app.services.scheduler import (
+    BULK,
+    INTERACTIVE,
+    FairScheduler,
+    SchedulerBusyError,
+    classify,
+)
+
+
+def _hold(scheduler, user_id, priority):
+    """Start a job on a thread and return (thread, release event)"""
+    started = threading.Event()
+    release = threading.Event()
+
+    def run():
+        with scheduler.job(user_id, priority):
+            started.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, started, release
+
+
+def _wait_queued(scheduler, count):
+    """Block until the scheduler has `count` waiting jobs"""
+    while sum(scheduler.stats()["queued"].values()) < count:
+        pass
+
+
+def test_classify_by_duration():
+    """Short clips are interactive, long or unknown ones bulk"""
+    with patch("app.services.scheduler.Config.INTERACTIVE_MAX_DURATION", 30):
+        assert classify(5.0) == INTERACTIVE
+        assert classify(600.0) == BULK
+        assert classify(None) == BULK
+
+
+def test_round_robin_between_users():
+    """A user with many queued jobs does not block another user"""
+    scheduler = FairScheduler(max_running=1, per_user_limit=1, max_queued_per_user=5)
+    order = []
+
+    first, started, release = _hold(scheduler, "busy", INTERACTIVE)
+    started.wait(5)
+
+    def queue(user_id):
+        with scheduler.job(user_id, INTERACTIVE):
+            order.append(user_id)
+
+    threads = []
+    for user_id in ["busy", "busy", "other"]:
+        thread = threading.Thread(target=queue, args=(user_id,))
+        thread.start()
+        threads.append(thread)
+        _wait_queued(scheduler, len(threads))
+
+    release.set()
+    for thread in [first] + threads:
+        thread.join(5)
+
+    assert order == ["busy", "other", "busy"]
+
+
+def test_interactive_before_bulk():
+    """Waiting interactive jobs run before waiting bulk jobs"""
+    scheduler = FairScheduler(max_running=1, per_user_limit=5, max_queued_per_user=5)
+    order = []
+
+    first, started, release = _hold(scheduler, "a", BULK)
+    started.wait(5)
+
+    def queue(user_id, priority):
+        with scheduler.job(user_id, priority):
+            order.append(priority)
+
+    bulk = threading.Thread(target=queue, args=("b", BULK))
+    bulk.start()
+    _wait_queued(scheduler, 1)
+    interactive = threading.Thread(target=queue, args=("c", INTERACTIVE))
+    interactive.start()
+    _wait_queued(scheduler, 2)
+
+    release.set()
+    for thread in [first, bulk, interactive]:
+        thread.join(5)
+
+    assert order == [INTERACTIVE, BULK]
+
+
+def test_bulk_leaves_slot_for_interactive():
+    """Bulk jobs never take the last free slot"""
+    scheduler = FairScheduler(max_running=2, per_user_limit=5, max_queued_per_user=5)
+
+    first, started, release = _hold(scheduler, "a", BULK)
+    started.wait(5)
+
+    second, second_started, second_release = _hold(scheduler, "b", BULK)
+    _wait_queued(scheduler, 1)
+    assert not second_started.is_set()
+
+    with scheduler.job("c", INTERACTIVE):
+        assert scheduler.stats()["running"] == {INTERACTIVE: 1, BULK: 1}
+
+    release.set()
+    second_release.set()
+    first.join(5)
+    second.join(5)
+    assert second_started.is_set()
+
+
+def test_per_user_queue_limit():
+    """A user cannot queue more than the configured number of jobs"""
+    scheduler = FairScheduler(max_running=1, per_user_limit=1, max_queued_per_user=1)
+
+    first, started, release = _hold(scheduler, "a", INTERACTIVE)
+    started.wait(5)
+    queued, _, queued_release = _hold(scheduler, "a", INTERACTIVE)
+    _wait_queued(scheduler, 1)
+
+    with pytest.raises(SchedulerBusyError):
+        with scheduler.job("a", INTERACTIVE):
+            pass
+
+    release.set()
+    queued_release.set()
+    first.join(5)
+    queued.join(5)
+    assert scheduler.stats()["completed"][INTERACTIVE] == 2
+
+
+def test_cancelled_job_leaves_the_queue():
+    """Jobs cancelled or past their deadline while queued give up their place"""
+    scheduler = FairScheduler(max_running=1, per_user_limit=1, max_queued_per_user=5)
+    holder, started, release = _hold(scheduler, "busy", INTERACTIVE)
+    started.wait(5)
+    errors = []
+
+    def queue(job_id, timeout=None):
+        with track_job(job_id, "other", timeout=timeout):
+            try:
+                with scheduler.job("other", INTERACTIVE):
+                    pass
+            except JobCancelledError as e:
+                errors.append(e)
+
+    timed_out = threading.Thread(target=queue, args=("late", 0.1))
+    timed_out.start()
+    timed_out.join(5)
+    assert isinstance(errors.pop(), DeadlineExceededError)
+
+    cancelled = threading.Thread(target=queue, args=("gone",))
+    cancelled.start()
+    _wait_queued(scheduler, 1)
+    assert cancel_job("gone", "other")
+    cancelled.join(5)
+    assert not isinstance(errors.pop(), DeadlineExceededError)
+
+    assert scheduler.stats()["queued"] == {INTERACTIVE: 0, BULK: 0}
+    release.set()
+    holder.join(5)
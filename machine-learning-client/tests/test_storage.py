@@ -0,0 +1,141 @@
+"""Tiered storage unit tests"""
+
+import io
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from bson import ObjectId
+from gridfs.errors import NoFile
+
+from app.services.storage import AudioStorage
+
+
+@pytest.fixture(name="storage")
+def fixture_storage(tmp_path):
+    """Storage over mocked Mongo collections and a temporary cold tier"""
+    database = {"audio.files": MagicMock(), "audio.cold": MagicMock()}
+    return AudioStorage(database, MagicMock(), str(tmp_path))
+
+
+def _file_doc(age_days, length=10, **metadata):
+    """GridFS files document last accessed some days ago"""
+    last_access = datetime.utcnow() - timedelta(days=age_days)
+    return {
+        "_id": ObjectId(),
+        "filename": "cloned.ogg",
+        "length": length,
+        "metadata": {"last_access": last_access, **metadata},
+    }
+
+
+def _cursor(docs):
+    """Mock Mongo cursor supporting sort/limit chaining"""
+    cursor = MagicMock()
+    cursor.sort.return_value = cursor
+    cursor.limit.return_value = docs
+    return cursor
+
+
+def test_migrate_moves_old_files_to_cold_tier(storage):
+    """Old files are copied to disk, recorded and marked migrated"""
+    old = _file_doc(10, codec="opus")
+    transcode = _file_doc(9, transcode_of=ObjectId())
+    recent = _file_doc(0)
+    storage.files.find.side_effect = [_cursor([]), _cursor([old, transcode, recent])]
+    storage.bucket.download_to_stream.side_effect = lambda _, target: target.write(
+        b"audio"
+    )
+
+    report = storage.migrate(max_age=7 * 24 * 3600, grace_period=600)
+
+    assert report == {"migrated": 1, "dropped_transcodes": 1, "bytes_freed": 10}
+    assert storage.files.find.call_args.args[0] == {
+        "metadata.migrated": {"$exists": False}
+    }
+    cold_doc = storage.cold.insert_one.call_args.args[0]
+    assert cold_doc["_id"] == old["_id"]
+    assert cold_doc["metadata"]["codec"] == "opus"
+    # The hot copy is kept for open streams until a later pass
+    storage.bucket.delete.assert_called_once_with(transcode["_id"])
+    update = storage.files.update_one.call_args.args
+    assert update[0] == {"_id": old["_id"]}
+    assert "metadata.migrated" in update[1]["$set"]
+
+    # Reads go to the cold tier once the file is marked migrated
+    storage.bucket.open_download_stream.return_value.metadata = {"migrated": 1}
+    storage.cold.find_one.return_value = cold_doc
+    with storage.open(old["_id"]) as file:
+        assert file.read() == b"audio"
+        assert file.filename == "cloned.ogg"
+        assert file.metadata["codec"] == "opus"
+    storage.bucket.open_download_stream.return_value.close.assert_called_once()
+
+
+def test_migrate_purges_hot_copies_after_grace_period(storage):
+    """GridFS copies of files migrated before the grace period are deleted"""
+    moved = {"_id": ObjectId(), "length": 30}
+    storage.files.find.side_effect = [_cursor([moved]), _cursor([])]
+
+    report = storage.migrate(max_age=7 * 24 * 3600, grace_period=600)
+
+    assert report == {"migrated": 0, "dropped_transcodes": 0, "bytes_freed": 30}
+    storage.bucket.delete.assert_called_once_with(moved["_id"])
+    cutoff = storage.files.find.call_args_list[0].args[0]["metadata.migrated"]["$lt"]
+    assert datetime.utcnow() - cutoff >= timedelta(seconds=600)
+
+
+def test_migrate_enforces_hot_size_budget(storage):
+    """Recent files are moved too while the hot tier is over budget"""
+    first, second = _file_doc(1, length=60), _file_doc(0, length=60)
+    storage.files.aggregate.return_value = [{"bytes": 120}]
+    storage.files.find.side_effect = [_cursor([]), _cursor([first, second])]
+    storage.bucket.download_to_stream.side_effect = lambda _, target: target.write(
+        b"audio"
+    )
+
+    report = storage.migrate(max_age=7 * 24 * 3600, max_hot_bytes=100)
+
+    assert report["migrated"] == 1
+    storage.files.update_one.assert_called_once()
+    assert storage.files.update_one.call_args.args[0] == {"_id": first["_id"]}
+
+
+def test_open_missing_file(storage):
+    """Opening a file neither tier has"""
+    storage.bucket.open_download_stream.side_effect = NoFile
+    storage.cold.find_one.return_value = None
+
+    with pytest.raises(FileNotFoundError):
+        storage.open(ObjectId())
+
+
+def test_put_writes_hot_tier(storage):
+    """New files go to GridFS, accessed as of now"""
+    storage.bucket.upload_from_stream.return_value = "file_id"
+    assert storage.put("a.ogg", io.BytesIO(b"x"), {"codec": "opus"}) == "file_id"
+    metadata = storage.bucket.upload_from_stream.call_args.kwargs["metadata"]
+    assert metadata["codec"] == "opus"
+    assert isinstance(metadata["last_access"], datetime)
+
+
+def test_init_indexes_last_access(storage):
+    """Migration's sort key is indexed and backfilled for older files"""
+    storage.files.create_index.assert_any_call([("metadata.last_access", 1)])
+    assert storage.files.update_many.call_args.args[0] == {"metadata.last_access": None}
+
+
+def test_delete_removes_both_tiers_and_transcodes(storage, tmp_path):
+    """Delete frees the original, its transcodes and the cold copy"""
+    file_id, transcode_id = ObjectId(), ObjectId()
+    storage.files.find.return_value = [
+        {"_id": file_id, "length": 10},
+        {"_id": transcode_id, "length": 30},
+    ]
+    (tmp_path / "cold.ogg").write_bytes(b"x" * 5)
+    storage.cold.find_one_and_delete.return_value = {"path": "cold.ogg", "length": 5}
+
+    assert storage.delete(file_id) == 45
+    storage.bucket.delete.assert_any_call(file_id)
+    storage.bucket.delete.assert_any_call(transcode_id)
+    assert not (tmp_path / "cold.ogg").exists()
@@ -0,0 +1,95 @@
+"""Request tracing unit tests"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from app.services.cancellation import bind
+from app.services.tracing import (
+    CLIENT,
+    parse_traceparent,
+    span,
+    start_trace,
+    traced,
+)
+
+
+def read_spans(path):
+    """Read exported spans by name"""
+    with open(path, encoding="utf-8") as file:
+        return {doc["name"]: doc for doc in map(json.loads, file)}
+
+
+def test_trace_continues_caller_and_exports(tmp_path):
+    """Spans join the caller's trace, including those run on a pool"""
+    trace_file = tmp_path / "traces.jsonl"
+    caller = f"00-{'1' * 32}-{'2' * 16}-01"
+
+    @traced("work")
+    def work():
+        with span("inner", step=1):
+            pass
+
+    with patch("app.services.tracing.Config.TRACE_FILE", str(trace_file)):
+        with start_trace("ml.process", caller, job_id="job-1") as root:
+            with ThreadPoolExecutor(1) as pool:
+                pool.submit(bind(work)).result()
+
+    spans = read_spans(trace_file)
+    assert root.trace_id == "1" * 32
+    assert {doc["traceId"] for doc in spans.values()} == {"1" * 32}
+    assert spans["ml.process"]["parentSpanId"] == "2" * 16
+    assert spans["ml.process"]["attributes"] == {"job_id": "job-1"}
+    assert spans["work"]["parentSpanId"] == root.span_id
+    assert spans["inner"]["parentSpanId"] == spans["work"]["spanId"]
+    assert spans["inner"]["attributes"] == {"step": 1}
+    assert spans["ml.process"]["kind"] == "SERVER"
+    assert spans["work"]["kind"] == spans["inner"]["kind"] == "INTERNAL"
+
+
+def test_otlp_export_keeps_span_kinds():
+    """Spans are posted with the OTLP number of their kind"""
+    with patch("app.services.tracing.urllib.request.urlopen") as urlopen, patch(
+        "app.services.tracing.Config.TRACE_ENDPOINT", "http://collector:4318"
+    ), patch("app.services.tracing.threading.Thread") as thread:
+        with start_trace("ml.process"), span("ml.callback", kind=CLIENT):
+            pass
+        thread.call_args.kwargs["target"](*thread.call_args.kwargs["args"])
+
+    request = urlopen.call_args.args[0]
+    payload = json.loads(request.data)
+    spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert request.full_url == "http://collector:4318/v1/traces"
+    assert {doc["name"]: doc["kind"] for doc in spans} == {
+        "ml.callback": 3,
+        "ml.process": 2,
+    }
+
+
+def test_trace_records_errors(tmp_path):
+    """A failing operation marks its span and the root as errors"""
+    trace_file = tmp_path / "traces.jsonl"
+
+    with patch("app.services.tracing.Config.TRACE_FILE", str(trace_file)):
+        with pytest.raises(ValueError):
+            with start_trace("ml.process"), span("whisper.translate"):
+                raise ValueError("bad audio")
+
+    spans = read_spans(trace_file)
+    assert spans["whisper.translate"]["status"] == {
+        "code": "ERROR",
+        "message": "ValueError: bad audio",
+    }
+    assert spans["ml.process"]["status"]["code"] == "ERROR"
+    assert spans["ml.process"]["parentSpanId"] == ""
+
+
+def test_span_outside_trace():
+    """Operations outside a traced request run untraced"""
+    with span("storage.open") as active:
+        assert active is None
+
+    assert parse_traceparent("garbage") == (None, None)
+    assert parse_traceparent(None) == (None, None)
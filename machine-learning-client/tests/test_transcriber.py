@@ -2,8 +2,11 @@
 
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pytest
 
+from app.services.cancellation import JobCancelledError, track_job
+
 
 def test_init_loads_model(transcriber):
     """Transcriber load model unit test"""
@@ -12,6 +15,14 @@ def test_init_loads_model(transcriber):
     assert transcriber.model.is_multilingual is True
 
 
+def test_decode_stops_cancelled_job(transcriber):
+    """Cancelled jobs stop before Whisper decodes the next window"""
+    with track_job("job-1", "user-1") as token:
+        token.cancel()
+        with pytest.raises(JobCancelledError):
+            transcriber.model.decode(None, None)
+
+
 def test_transcribe_file_not_found(transcriber):
     """Transcribe function test with file not existing"""
     with patch("os.path.exists", return_value=False):
@@ -88,3 +99,58 @@ def test_get_model_info(transcriber):
     assert info["model_size"] == "tiny"
     assert info["device"] == "cpu"
     assert info["is_multilingual"] is True
+
+
+def test_translate_escalates_low_confidence_segments(transcriber):
+    """Only unsure segments are re-decoded by the larger model"""
+    confident = {"start": 0.0, "end": 1.0, "text": " Hello.", "avg_logprob": -0.2}
+    unsure = {"start": 1.0, "end": 2.0, "text": " Wold.", "avg_logprob": -1.5}
+    silence = {
+        "start": 2.0,
+        "end": 3.0,
+        "text": " ...",
+        "avg_logprob": -2.0,
+        "no_speech_prob": 0.9,
+    }
+    transcriber.model.transcribe = MagicMock(
+        return_value={
+            "text": " Hello. Wold. ...",
+            "language": "fr",
+            "segments": [confident, unsure, silence],
+        }
+    )
+    escalation = MagicMock()
+    escalation.model.transcribe.return_value = {
+        "segments": [{"start": 0.0, "end": 1.2, "text": " World."}]
+    }
+    transcriber.escalation = escalation
+    audio = np.arange(48000, dtype=np.float32)
+
+    with patch("os.path.exists", return_value=True):
+        result = transcriber.translate_to_english("dummy.wav", audio=audio)
+
+    clip = escalation.model.transcribe.call_args.args[0]
+    np.testing.assert_array_equal(clip, audio[16000:32000])
+    assert escalation.model.transcribe.call_args.kwargs["language"] == "fr"
+    assert result["text"] == "Hello. World. ..."
+    assert result["segments"][1]["start"] == 1.0
+    assert result["segments"][1]["end"] == 2.0
+    assert result["segments"][1]["escalated"] is True
+
+
+def test_translate_without_low_confidence_skips_escalation(transcriber):
+    """Clean audio never reaches the larger model"""
+    transcriber.model.transcribe = MagicMock(
+        return_value={
+            "text": " Hello.",
+            "language": "en",
+            "segments": [{"start": 0.0, "end": 1.0, "text": " Hello."}],
+        }
+    )
+    transcriber.escalation = MagicMock()
+
+    with patch("os.path.exists", return_value=True):
+        result = transcriber.translate_to_english("dummy.wav")
+
+    assert result["text"] == "Hello."
+    transcriber.escalation.model.transcribe.assert_not_called()
@@ -0,0 +1,57 @@
+"""Streaming upload unit tests"""
+
+import hashlib
+import io
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.services.upload import StreamingDecoder, UploadTooLargeError, receive_stream
+
+
+def test_receive_stream_writes_and_hashes(tmp_path):
+    """Receive stream test writing chunks to disk"""
+    data = b"x" * 1000
+    dest = tmp_path / "audio.wav"
+
+    upload = receive_stream(io.BytesIO(data), str(dest), chunk_size=64, decode=False)
+
+    assert dest.read_bytes() == data
+    assert upload["size"] == 1000
+    assert upload["sha256"] == hashlib.sha256(data).hexdigest()
+    assert upload["audio"] is None
+
+
+def test_receive_stream_too_large(tmp_path):
+    """Receive stream test with size limit exceeded"""
+    with pytest.raises(UploadTooLargeError):
+        receive_stream(
+            io.BytesIO(b"x" * 1000),
+            str(tmp_path / "audio.wav"),
+            max_bytes=100,
+            chunk_size=64,
+            decode=False,
+        )
+
+
+def test_receive_stream_feeds_decoder(tmp_path):
+    """Receive stream test passing chunks to the decoder"""
+    decoder = MagicMock()
+    decoder.finish.return_value = np.zeros(10, dtype=np.float32)
+
+    with patch("app.services.upload.StreamingDecoder", return_value=decoder):
+        upload = receive_stream(
+            io.BytesIO(b"abcdef"), str(tmp_path / "a.wav"), chunk_size=4, decode=True
+        )
+
+    assert [c.args[0] for c in decoder.feed.call_args_list] == [b"abcd", b"ef"]
+    assert upload["audio"].shape == (10,)
+
+
+def test_streaming_decoder_without_ffmpeg():
+    """Decoder test when ffmpeg cannot be started"""
+    with patch("subprocess.Popen", side_effect=OSError("not found")):
+        decoder = StreamingDecoder()
+        decoder.feed(b"data")
+        assert decoder.finish() is None
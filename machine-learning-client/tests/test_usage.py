@@ -0,0 +1,46 @@
+"""Usage accounting unit tests"""
+
+import time
+
+from app.services.usage import UsageMeter
+
+
+def spin(seconds):
+    """Keep the CPU busy for a while"""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+def test_meter_reports_stages():
+    """Stages, totals and the real-time factor are reported"""
+    with UsageMeter() as meter:
+        with meter.stage("translate"):
+            spin(0.05)
+        meter.add("queue", 1.5)
+
+    usage = meter.report(input_seconds=0.5, output_seconds=0.6)
+
+    assert set(usage["stages"]) == {"translate", "queue"}
+    assert usage["stages"]["translate"]["wall_seconds"] >= 0.05
+    assert usage["stages"]["translate"]["cpu_seconds"] > 0
+    assert usage["stages"]["queue"] == {"wall_seconds": 1.5, "cpu_seconds": 0.0}
+    assert usage["cpu_seconds"] == usage["stages"]["translate"]["cpu_seconds"]
+    assert usage["real_time_factor"] == round(usage["wall_seconds"] / 0.5, 3)
+    assert usage["peak_rss_mb"] > 0
+    assert usage["peak_rss_delta_mb"] >= 0
+    assert meter.report(None, None)["real_time_factor"] is None
+
+
+def test_concurrent_jobs_share_cpu():
+    """Process CPU time is split between the jobs metered at once"""
+    with UsageMeter() as alone:
+        with alone.stage("work"):
+            spin(0.1)
+
+    with UsageMeter() as shared, UsageMeter():
+        with shared.stage("work"):
+            spin(0.1)
+
+    alone_cpu = alone.stages["work"]["cpu_seconds"]
+    assert shared.stages["work"]["cpu_seconds"] < alone_cpu * 0.75
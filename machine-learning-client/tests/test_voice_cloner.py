@@ -1,10 +1,14 @@
 """Voice Cloner model tests"""
 
 import os
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pytest
+import torch
 
 from app.models.voice_cloner import VoiceCloner
 
@@ -54,10 +58,15 @@ def test_clone_and_speak_calls_tts(monkeypatch):
         "app.models.voice_cloner.datetime",
         MagicMock(now=lambda: datetime(2025, 1, 1, 12, 0, 0)),
     )
+    monkeypatch.setattr(
+        "app.models.voice_cloner.uuid.uuid4", lambda: MagicMock(hex="abcdef0123456789")
+    )
     monkeypatch.setattr("os.path.exists", lambda path: True)
     output_path = vc.clone_and_speak("dummy.wav", "Hello world")
 
-    expected_path = os.path.join(vc.output_dir, "cloned_voice_20250101_120000.wav")
+    expected_path = os.path.join(
+        vc.output_dir, "cloned_voice_20250101_120000_abcdef01.wav"
+    )
     assert output_path == expected_path
     vc.tts_model.tts_to_file.assert_called_once_with(
         text="Hello world",
@@ -81,3 +90,232 @@ def test_get_model_info():
     vc.device = "cpu"
     info = vc.get_model_info()
     assert info == {"available": True, "device": "cpu", "model_loaded": True}
+
+
+def test_clone_and_speak_unique_paths_in_output_dir(monkeypatch, tmp_path):
+    """Clone and speak test writing unique files to a given directory"""
+    vc = VoiceCloner()
+    vc.tts_model = MagicMock()
+    monkeypatch.setattr("os.path.exists", lambda path: True)
+
+    first = vc.clone_and_speak("dummy.wav", "Hello", output_dir=str(tmp_path))
+    second = vc.clone_and_speak("dummy.wav", "Hello", output_dir=str(tmp_path))
+
+    assert os.path.dirname(first) == str(tmp_path)
+    assert first != second
+
+
+def test_get_speaker_embedding_cached(tmp_path):
+    """Speaker embeddings are computed once per clip content"""
+    vc = VoiceCloner()
+    vc.tts_model = MagicMock()
+    speaker_manager = vc.tts_model.synthesizer.tts_model.speaker_manager
+    speaker_manager.compute_embedding_from_clip.return_value = [0.5, 0.5]
+
+    first = tmp_path / "a.wav"
+    second = tmp_path / "b.wav"
+    first.write_bytes(b"same audio")
+    second.write_bytes(b"same audio")
+
+    assert vc.get_speaker_embedding(str(first)) == [0.5, 0.5]
+    assert vc.get_speaker_embedding(str(second)) == [0.5, 0.5]
+    speaker_manager.compute_embedding_from_clip.assert_called_once_with(str(first))
+
+
+def test_get_waveform_embedding_cached():
+    """In-memory speech is encoded directly and cached by content"""
+    vc = VoiceCloner()
+    vc.tts_model = MagicMock()
+    speaker_manager = vc.tts_model.synthesizer.tts_model.speaker_manager
+    speaker_manager.encoder_ap.sample_rate = 16000
+    speaker_manager.encoder_ap.do_sound_norm = False
+    speaker_manager.encoder_ap.do_rms_norm = False
+    speaker_manager.encoder_config.model_params = {"use_torch_spec": True}
+    speaker_manager.use_cuda = False
+    speaker_manager.encoder.compute_embedding.return_value = torch.tensor([[0.5, 0.25]])
+
+    waveform = np.zeros(1600, dtype=np.float32)
+    assert vc.get_waveform_embedding(waveform, 16000) == [0.5, 0.25]
+    assert vc.get_waveform_embedding(waveform.copy(), 16000) == [0.5, 0.25]
+
+    speaker_manager.encoder.compute_embedding.assert_called_once()
+    (m_input,) = speaker_manager.encoder.compute_embedding.call_args[0]
+    assert tuple(m_input.shape) == (1, 1600)
+
+
+@patch("app.models.voice_cloner.synthesis")
+def test_clone_and_speak_with_embedding(mock_synthesis, tmp_path):
+    """Clone and speak from an embedding skips the reference audio"""
+    vc = VoiceCloner()
+    vc.tts_model = MagicMock()
+    synthesizer = vc.tts_model.synthesizer
+    synthesizer.output_sample_rate = 100
+    synthesizer.split_into_sentences.return_value = ["Hello.", "World."]
+    synthesizer.tts_model.language_manager.name_to_id = {"en": 0}
+    mock_synthesis.return_value = {"wav": np.zeros(10)}
+
+    output_path = vc.clone_and_speak(
+        None, "Hello. World.", output_dir=str(tmp_path), speaker_embedding=[0.1]
+    )
+
+    assert mock_synthesis.call_count == 2
+    assert mock_synthesis.call_args.kwargs["d_vector"] == [0.1]
+    assert mock_synthesis.call_args.kwargs["language_id"] == 0
+    saved_wav, saved_path = synthesizer.save_wav.call_args.args
+    # Sentences overlap by a 10 ms (1 sample) crossfade
+    assert saved_wav.shape == (19,)
+    assert saved_path == output_path
+    vc.tts_model.tts_to_file.assert_not_called()
+
+
+def _pool_of(vc, broken_after=None):
+    """Mock worker pool synthesizing in-process, optionally dying part way"""
+    pool = MagicMock()
+    submitted = []
+    synthesize = vc._synthesize_sentence  # pylint: disable=protected-access
+
+    def submit(_fn, job):
+        future = Future()
+        if broken_after is not None and len(submitted) >= broken_after:
+            future.set_exception(BrokenProcessPool("worker died"))
+        else:
+            submitted.append(job)
+            future.set_result(synthesize(*job))
+        return future
+
+    pool.submit.side_effect = submit
+    return pool, submitted
+
+
+@patch("app.models.voice_cloner.synthesis")
+@patch("app.models.voice_cloner.Config.TTS_PROCESSES", 2)
+def test_clone_and_speak_parallel_sentences(mock_synthesis, tmp_path):
+    """With a process pool, every sentence is sent to the workers in order"""
+    vc = VoiceCloner()
+    vc.tts_model = MagicMock()
+    vc.device = "cpu"
+    synthesizer = vc.tts_model.synthesizer
+    synthesizer.output_sample_rate = 100
+    synthesizer.split_into_sentences.return_value = ["One.", "Two.", "Three."]
+    speaker_manager = synthesizer.tts_model.speaker_manager
+    speaker_manager.compute_embedding_from_clip.return_value = [0.2]
+    mock_synthesis.side_effect = lambda **kwargs: {"wav": np.ones(10)}
+    reference = tmp_path / "ref.wav"
+    reference.write_bytes(b"voice")
+
+    vc._pool, jobs = _pool_of(vc)  # pylint: disable=protected-access
+    vc.clone_and_speak(str(reference), "One. Two. Three.", output_dir=str(tmp_path))
+
+    assert [job[1] for job in jobs] == ["One.", "Two.", "Three."]
+    assert all(job[0] == [0.2] for job in jobs)
+    assert synthesizer.save_wav.call_args.args[0].shape == (28,)
+    vc.tts_model.tts_to_file.assert_not_called()
+
+
+@patch("app.models.voice_cloner.synthesis")
+@patch("app.models.voice_cloner.Config.TTS_PROCESSES", 2)
+def test_synthesize_falls_back_when_a_worker_dies(mock_synthesis):
+    """Sentences left when the pool breaks are synthesized in-process"""
+    vc = VoiceCloner()
+    vc.tts_model = MagicMock()
+    vc.device = "cpu"
+    synthesizer = vc.tts_model.synthesizer
+    synthesizer.output_sample_rate = 100
+    synthesizer.split_into_sentences.return_value = ["One.", "Two.", "Three."]
+    mock_synthesis.side_effect = lambda **kwargs: {"wav": np.ones(10)}
+    pool, jobs = _pool_of(vc, broken_after=1)
+    vc._pool = pool  # pylint: disable=protected-access
+
+    synthesize = vc._synthesize  # pylint: disable=protected-access
+    wav = synthesize([0.2], "One. Two. Three.", "en")
+
+    assert len(jobs) == 1
+    assert mock_synthesis.call_count == 3
+    assert wav.shape == (28,)
+    assert vc._pool is None  # pylint: disable=protected-access
+    pool.shutdown.assert_called_once_with(wait=False)
+
+
+@patch("app.models.voice_cloner.ProcessPoolExecutor")
+@patch("app.models.voice_cloner.Config.TTS_PROCESSES", 2)
+def test_start_workers_forks_on_cpu_only(mock_executor_class):
+    """Workers are forked up front on CPU and never on a GPU"""
+    vc = VoiceCloner()
+    vc.tts_model = MagicMock()
+
+    vc.device = "cuda"
+    vc.start_workers()
+    mock_executor_class.assert_not_called()
+
+    vc.device = "cpu"
+    vc.start_workers()
+    vc.start_workers()
+    mock_executor_class.assert_called_once()
+    assert mock_executor_class.call_args.args == (2,)
+    context = mock_executor_class.call_args.kwargs["mp_context"]
+    assert context.get_start_method() == "fork"
+    mock_executor_class.return_value.submit.assert_called_once()
+
+    vc.close()
+    mock_executor_class.return_value.shutdown.assert_called_once_with(wait=False)
+
+
+@patch("app.models.voice_cloner.synthesis")
+def test_clone_and_speak_aligned_to_segments(mock_synthesis, tmp_path):
+    """Aligned cloning places each segment at its source start time"""
+    vc = VoiceCloner()
+    vc.tts_model = MagicMock()
+    synthesizer = vc.tts_model.synthesizer
+    synthesizer.output_sample_rate = 100
+    synthesizer.split_into_sentences.side_effect = lambda text: [text]
+    mock_synthesis.return_value = {"wav": np.ones(50)}
+    segments = {"start": [0.0, 2.0], "end": [1.0, 2.25], "text": ["Hi.", "There."]}
+
+    vc.clone_and_speak(
+        None,
+        "Hi. There.",
+        output_dir=str(tmp_path),
+        speaker_embedding=[0.1],
+        segments=segments,
+    )
+
+    assert mock_synthesis.call_count == 2
+    audio = synthesizer.save_wav.call_args.args[0]
+    # First segment fits its window and is padded with silence
+    assert audio[:50].all() and not audio[50:200].any()
+    # Second is sped up by at most 1.5x and overruns its 25-sample window
+    assert audio[200:234].all() and not audio[234:].any()
+    assert len(audio) == 234
+
+
+@patch("app.models.voice_cloner.synthesis")
+@patch("app.models.voice_cloner.Config.TTS_PROCESSES", 2)
+def test_aligned_segments_share_the_worker_pool(mock_synthesis, tmp_path):
+    """Sentences of every segment go to the sized worker pool together"""
+    vc = VoiceCloner()
+    vc.tts_model = MagicMock()
+    vc.device = "cpu"
+    synthesizer = vc.tts_model.synthesizer
+    synthesizer.output_sample_rate = 100
+    synthesizer.split_into_sentences.side_effect = lambda text: text.split()
+    mock_synthesis.return_value = {"wav": np.ones(10)}
+    segments = {
+        "start": [0.0, 1.0, 2.0],
+        "end": [1.0, 2.0, 3.0],
+        "text": ["Hi. There.", " ", "Bye."],
+    }
+
+    vc._pool, jobs = _pool_of(vc)  # pylint: disable=protected-access
+    vc.clone_and_speak(
+        None,
+        "Hi. There. Bye.",
+        output_dir=str(tmp_path),
+        speaker_embedding=[0.1],
+        segments=segments,
+    )
+
+    assert [job[1] for job in jobs] == ["Hi.", "There.", "Bye."]
+    audio = synthesizer.save_wav.call_args.args[0]
+    # Two crossfaded sentences, a silent window, then the last sentence
+    assert audio[:19].all() and not audio[19:200].any()
+    assert audio[200:210].all()
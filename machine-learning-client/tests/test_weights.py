@@ -0,0 +1,99 @@
+"""Memory-mapped weight cache unit tests"""
+
+import os
+from unittest.mock import patch
+
+import torch
+import whisper
+
+from app.models.weights import load_whisper, map_weights, save_weights, share_weights
+
+# Tiny's text decoder shape, so its alignment heads apply
+DIMS = whisper.model.ModelDimensions(
+    n_mels=80,
+    n_audio_ctx=4,
+    n_audio_state=12,
+    n_audio_head=6,
+    n_audio_layer=1,
+    n_vocab=30,
+    n_text_ctx=8,
+    n_text_state=12,
+    n_text_head=6,
+    n_text_layer=4,
+)
+
+
+class Tied(torch.nn.Module):
+    """Two layers sharing one weight"""
+
+    def __init__(self):
+        super().__init__()
+        self.first = torch.nn.Linear(3, 3, bias=False)
+        self.second = torch.nn.Linear(3, 3, bias=False)
+        self.second.weight = self.first.weight
+
+    def forward(self, x):
+        """Apply both layers"""
+        return self.second(self.first(x))
+
+
+def test_map_weights_round_trip(tmp_path):
+    """Mapped tensors and metadata match what was saved"""
+    layer = torch.nn.Linear(4, 2)
+    path = str(tmp_path / "layer.safetensors")
+
+    save_weights(layer, path, {"name": "layer"})
+    tensors, metadata = map_weights(path)
+
+    assert metadata == {"name": "layer"}
+    assert torch.equal(tensors["weight"], layer.weight)
+    assert torch.equal(tensors["bias"], layer.bias)
+
+
+def test_share_weights_swaps_in_mapped_tensors(tmp_path):
+    """Modules end up backed by the cache file, tied weights included"""
+    module = Tied()
+    inputs = torch.randn(2, 3)
+    expected = module.second(module.first(inputs))
+
+    with patch("app.models.weights.Config.WEIGHTS_CACHE_DIR", str(tmp_path)):
+        share_weights(module, "tied/model")
+
+    assert os.path.exists(tmp_path / "tied--model.safetensors")
+    assert torch.equal(module.second(module.first(inputs)), expected)
+
+
+def test_load_whisper_from_cache(tmp_path):
+    """Whisper is converted once, then built from the mapped weights"""
+    torch.manual_seed(0)
+    original = whisper.model.Whisper(DIMS)
+    # Some weights are left uninitialized, which can give NaN outputs
+    for parameter in original.parameters():
+        torch.nn.init.normal_(parameter, std=0.02)
+    mel = torch.randn(1, 80, 8)
+    tokens = torch.tensor([[1, 2, 3]])
+    expected = original(mel, tokens)
+
+    with patch("app.models.weights.Config.WEIGHTS_CACHE_DIR", str(tmp_path)), patch(
+        "app.models.weights.torch.cuda.is_available", return_value=False
+    ), patch(
+        "app.models.weights.whisper.load_model", return_value=original
+    ) as load_model:
+        load_whisper("tiny")
+        model = load_whisper("tiny")
+
+    load_model.assert_called_once_with("tiny", device="cpu", download_root=None)
+    assert model.dims == DIMS
+    assert torch.allclose(model(mel, tokens), expected, atol=1e-6)
+
+
+def test_load_whisper_on_gpu_skips_cache(tmp_path):
+    """With a GPU, Whisper is loaded as usual instead of from host memory"""
+    with patch("app.models.weights.Config.WEIGHTS_CACHE_DIR", str(tmp_path)), patch(
+        "app.models.weights.torch.cuda.is_available", return_value=True
+    ), patch("app.models.weights.load_whisper_checkpoint") as load_checkpoint:
+        model = load_whisper("tiny")
+
+    assert model is load_checkpoint.return_value
+    load_checkpoint.assert_called_once_with("tiny")
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,54 @@
+"""Request workspace unit tests"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.services.workspace import Workspace, scratch_root
+
+
+def test_workspace_unique_and_removed(tmp_path):
+    """Workspace creates distinct directories and removes them on exit"""
+    with Workspace(root=str(tmp_path)) as first, Workspace(
+        root=str(tmp_path)
+    ) as second:
+        assert first.path != second.path
+        with open(first.file("audio.wav"), "wb") as f:
+            f.write(b"data")
+        first_path = first.path
+
+    assert not os.path.exists(first_path)
+    assert not os.listdir(tmp_path)
+
+
+def test_workspace_removed_on_error(tmp_path):
+    """Workspace is removed when the body raises"""
+    with pytest.raises(RuntimeError):
+        with Workspace(root=str(tmp_path)) as workspace:
+            with open(workspace.file("audio.wav"), "wb"):
+                pass
+            raise RuntimeError("boom")
+
+    assert not os.listdir(tmp_path)
+
+
+def test_workspace_file_strips_directories(tmp_path):
+    """Workspace file paths cannot escape the workspace"""
+    with Workspace(root=str(tmp_path)) as workspace:
+        path = workspace.file("../../etc/passwd")
+        assert os.path.dirname(path) == workspace.path
+
+
+def test_scratch_root_prefers_config(tmp_path):
+    """Scratch root uses the configured directory when set"""
+    with patch("app.services.workspace.Config.SCRATCH_DIR", str(tmp_path)):
+        assert scratch_root() == str(tmp_path)
+
+
+def test_scratch_root_falls_back_without_tmpfs():
+    """Scratch root falls back to the upload folder without tmpfs"""
+    with patch("app.services.workspace.Config.SCRATCH_DIR", ""), patch(
+        "app.services.workspace.os.path.isdir", return_value=False
+    ), patch("app.services.workspace.Config.UPLOAD_FOLDER", "uploads"):
+        assert scratch_root() == "uploads"
@@ -2,22 +2,136 @@
 
 import os
 import pathlib
+import uuid
 from datetime import datetime
-from io import BytesIO
-from typing import Optional
+from typing import Iterator, Optional
+from urllib.parse import quote, unquote
 
 import requests
 from bson.objectid import ObjectId
 from dotenv import load_dotenv
-from flask import Flask, flash, redirect, render_template, request, send_file, url_for
+from flask import (
+    Flask,
+    Response,
+    flash,
+    redirect,
+    render_template,
+    request,
+    send_file,
+    stream_with_context,
+    url_for,
+)
 from flask_login import LoginManager, current_user, login_required
+from pymongo.errors import PyMongoError
 
-from . import models
+from . import models, storage, tracing
 from .auth import auth_bp
-from .db import db, gridfs
+from .db import db
+from .search import HistoryFilter, ensure_indexes, parse_date, search_history
+from .usage import summarize_usage
+from .subtitles import (
+    SEGMENT_PAGE_SIZE,
+    SUBTITLE_FORMATS,
+    empty_segments,
+    fetch_segments,
+    iter_segments,
+    iter_subtitles,
+)
 
 DIR = pathlib.Path(__file__).parent.parent
 CLIENT_URL = "http://ml:5001"  # ML-client; change based on docker config
+UPLOAD_CHUNK_SIZE = 64 * 1024
+PROCESS_TIMEOUT = 60  # seconds the upload page waits for a translation
+ALLOWED_MIMETYPES = [
+    "audio/mpeg",
+    "audio/mp4",
+    "audio/wav",
+    "audio/flac",
+    "audio/ogg",
+]
+# Mimetypes get_audio can serve, mapped to the ML client's codec names
+AUDIO_FORMATS = {
+    "audio/ogg": "opus",
+    "audio/flac": "flac",
+    "audio/wav": "wav",
+}
+
+
+def iter_chunks(stream, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a binary stream in chunks so requests sends it chunk-encoded"""
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def cancel_ml_job(job_id: str, user_id: str) -> bool:
+    """Ask the ML client to stop a job nobody is waiting for any more"""
+
+    try:
+        res = requests.post(
+            f"{CLIENT_URL}/api/jobs/{job_id}/cancel",
+            headers={"X-User-Id": user_id},
+            timeout=5,
+        )
+    except requests.RequestException:
+        return False
+    return res.status_code == 202
+
+
+def history_entry_from_result(owner: ObjectId, result: dict, file_name: str) -> dict:
+    """Build a history document from an ML client processing result"""
+
+    timestamp = result.get("timestamp")
+    segments = result.get("segments") or empty_segments()
+    return {
+        "owner": owner,
+        "timestamp": datetime.fromisoformat(timestamp) if timestamp else None,
+        "source_language": result.get("source_language"),
+        "english_text": result.get("english_text"),
+        "processing_time": result.get("processing_time"),
+        "output_file_id": ObjectId(result.get("output_file_id")),
+        "output_mimetype": result.get("output_mimetype", "audio/wav"),
+        "duration": result.get("duration"),
+        "sample_rate": result.get("sample_rate"),
+        "peaks": result.get("peaks", []),
+        "segments": segments,
+        "segment_count": len(segments["text"]),
+        "aligned": result.get("aligned", False),
+        "voice_profile": result.get("voice_profile", False),
+        "usage": result.get("usage"),
+        "file_name": file_name,
+    }
+
+
+def open_audio(audio_id: ObjectId, mimetype: str):
+    """Open a stored audio file in a format, transcoding it if needed"""
+
+    file = storage.open_stored(audio_id)
+    stored = (file.metadata or {}).get("mimetype", "audio/wav")
+    if mimetype == stored:
+        return file, stored
+
+    # Serve an earlier transcode when there is one
+    codec = AUDIO_FORMATS[mimetype]
+    cached_id = storage.find_transcode(audio_id, codec)
+    if cached_id is not None:
+        file.close()
+        return storage.open_stored(cached_id), mimetype
+
+    res = requests.post(
+        f"{CLIENT_URL}/api/audio/{audio_id}/transcode",
+        params={"format": codec},
+        timeout=60,
+    )
+    if res.status_code != 200:
+        # Fall back to the stored format rather than failing playback
+        return file, stored
+
+    file.close()
+    return storage.open_stored(ObjectId(res.json()["file_id"])), mimetype
 
 
 def create_app():
@@ -33,6 +147,13 @@ def create_app():
 
     login_manager = LoginManager(app)
 
+    # Index history for search and per-user listing
+    if db is not None:
+        try:
+            ensure_indexes(db)
+        except PyMongoError as e:
+            app.logger.warning(f"Could not create history indexes: {e}")
+
     @login_manager.user_loader
     def load_user(user_id: str) -> Optional[models.User]:
         """Load currently logged-in user data"""
@@ -62,68 +183,286 @@ def create_app():
 
         # Upload and send an audio file to ML client
         if request.method == "POST":
-            url = f"{CLIENT_URL}/api/process"
-            audio_file = request.files["audio"]
-
-            if audio_file.mimetype not in [
-                "audio/mpeg",
-                "audio/mp4",
-                "audio/wav",
-                "audio/flac",
-                "audio/ogg",
-            ]:
+            url = f"{CLIENT_URL}/api/process/stream"
+
+            # Raw-body uploads (sent by the upload page's script) are piped
+            # through as they arrive; plain form posts fall back to multipart
+            if request.headers.get("X-Filename"):
+                filename = unquote(request.headers["X-Filename"])
+                mimetype = request.mimetype
+                stream = request.stream
+                aligned = request.headers.get("X-Aligned") == "true"
+                use_profile = request.headers.get("X-Use-Profile") == "true"
+            else:
+                audio_file = request.files["audio"]
+                filename = audio_file.filename
+                mimetype = audio_file.mimetype
+                stream = audio_file.stream
+                aligned = bool(request.form.get("aligned"))
+                use_profile = bool(request.form.get("use_profile"))
+
+            if mimetype not in ALLOWED_MIMETYPES:
                 flash(
                     "Only the following file formats are accepted: .mp3, .m4a, .wav, .ogg, .flac",
                     "danger",
                 )
                 return render_template("upload.html")
 
-            if audio_file.filename == "":
+            if filename == "":
                 flash("No selected file", "danger")
                 return render_template("upload.html")
 
-            files = {
-                "audio": (audio_file.filename, audio_file.stream, audio_file.mimetype)
-            }
+            # The ML client stops working once we stop waiting, and we cancel
+            # the job explicitly if we time out first
+            job_id = uuid.uuid4().hex
+            params = {}
+            if aligned:
+                params["aligned"] = "true"
+            if use_profile:
+                params["profile"] = "true"
+            # The trace id doubles as the request's correlation id, continued
+            # by the ML client through the traceparent header
+            with tracing.start_trace(
+                "web.upload", user_id=str(current_user.id), job_id=job_id
+            ) as root:
+                try:
+                    with tracing.span(
+                        "ml.process", kind=tracing.CLIENT, url=url
+                    ) as calling:
+                        res = requests.post(
+                            url,
+                            params=params or None,
+                            data=iter_chunks(stream),
+                            headers={
+                                "Content-Type": mimetype,
+                                "X-Filename": quote(filename),
+                                "X-User-Id": str(current_user.id),
+                                "X-Job-Id": job_id,
+                                "X-Request-Timeout": str(PROCESS_TIMEOUT),
+                                "traceparent": calling.traceparent(),
+                            },
+                            timeout=PROCESS_TIMEOUT,
+                        )
+                        calling.set_attribute("status", res.status_code)
+                except requests.Timeout:
+                    cancel_ml_job(job_id, str(current_user.id))
+                    flash(
+                        "Processing took too long and was cancelled, try a shorter recording",
+                        "danger",
+                    )
+                    return render_template("upload.html")
+
+                json: dict = res.json()
+                if res.status_code != 200:
+                    message = (
+                        f"{res.status_code} error: {json.get('error', 'Unknown error')}"
+                    )
+                    if "Retry-After" in res.headers:
+                        message += (
+                            f" (try again in {res.headers['Retry-After']} seconds)"
+                        )
+                    flash(message, "danger")
+                    return render_template("upload.html")
+
+                # Save operation metadata into history collection
+                history_entry = history_entry_from_result(
+                    ObjectId(current_user.id), json, filename
+                )
+                history_entry["trace_id"] = root.trace_id
+
+                # Add operation to history collection, and history of the user
+                with tracing.span("mongo.history_insert", kind=tracing.CLIENT):
+                    inserted = db.history.insert_one(history_entry)
+                    inserted_id = inserted.inserted_id
+                    db.users.find_one_and_update(
+                        {"_id": ObjectId(current_user.id)},
+                        {"$push": {"history": inserted_id}},
+                    )
+
+                return redirect(url_for("result_page", result_id=str(inserted_id)))
+
+        return render_template("upload.html")
+
+    @app.route("/voice", methods=["POST", "GET"])
+    @login_required
+    def voice_page():
+        """Render the voice profile page and enroll reference clips."""
+
+        headers = {"X-User-Id": str(current_user.id)}
 
-            res = requests.post(url, files=files, timeout=60)
+        if request.method == "POST":
+            uploads = [f for f in request.files.getlist("audio") if f.filename]
+
+            if not uploads:
+                flash("No selected file", "danger")
+                return redirect(url_for("voice_page"))
+
+            res = requests.post(
+                f"{CLIENT_URL}/api/profiles",
+                files=[("audio", (f.filename, f.stream, f.mimetype)) for f in uploads],
+                data={"append": str(bool(request.form.get("append")))},
+                headers=headers,
+                timeout=PROCESS_TIMEOUT,
+            )
             json: dict = res.json()
-            if res.status_code != 200:
+            if res.status_code != 201:
                 flash(
                     f"{res.status_code} error: {json.get('error', 'Unknown error')}",
                     "danger",
                 )
-                return render_template("upload.html")
+            else:
+                flash(f"Voice profile saved from {json['clips']} clips", "success")
+            return redirect(url_for("voice_page"))
+
+        try:
+            res = requests.get(f"{CLIENT_URL}/api/profiles", headers=headers, timeout=5)
+            profiles = res.json().get("profiles", []) if res.status_code == 200 else []
+        except requests.RequestException:
+            profiles = []
+        return render_template("voice.html", profiles=profiles)
+
+    @app.route("/voice/delete", methods=["POST"])
+    @login_required
+    def voice_delete():
+        """Delete the user's voice profiles"""
 
-            # Save operation metadata into history collection
-            timestamp = json.get("timestamp")
-            history_entry = {
-                "owner": ObjectId(current_user.id),
-                "timestamp": datetime.fromisoformat(timestamp) if timestamp else None,
-                "source_language": json.get("source_language"),
-                "english_text": json.get("english_text"),
-                "processing_time": json.get("processing_time"),
-                "output_file_id": ObjectId(json.get("output_file_id")),
-                "file_name": audio_file.filename,
-            }
+        requests.delete(
+            f"{CLIENT_URL}/api/profiles",
+            headers={"X-User-Id": str(current_user.id)},
+            timeout=5,
+        )
+        flash("Voice profile deleted", "success")
+        return redirect(url_for("voice_page"))
+
+    @app.route("/batch", methods=["POST", "GET"])
+    @login_required
+    def batch_page():
+        """Render the batch upload page and submit batches to the ML client."""
 
-            # Add operation to history collection, and history of the user
-            inserted = db.history.insert_one(history_entry)
-            inserted_id = inserted.inserted_id
-            db.users.find_one_and_update(
-                {"_id": ObjectId(current_user.id)}, {"$push": {"history": inserted_id}}
+        if request.method == "POST":
+            uploads = [f for f in request.files.getlist("audio") if f.filename]
+
+            if not uploads:
+                flash("No selected file", "danger")
+                return render_template("batch.html")
+
+            # Send every file in a single request so the ML client can
+            # schedule them together
+            res = requests.post(
+                f"{CLIENT_URL}/api/process/batch",
+                files=[("audio", (f.filename, f.stream, f.mimetype)) for f in uploads],
+                data={"same_speaker": str(bool(request.form.get("same_speaker")))},
+                headers={"X-User-Id": str(current_user.id)},
+                timeout=300,
+            )
+            json: dict = res.json()
+            if res.status_code != 202:
+                flash(
+                    f"{res.status_code} error: {json.get('error', 'Unknown error')}",
+                    "danger",
+                )
+                return render_template("batch.html")
+
+            db.batches.insert_one(
+                {
+                    "_id": json["batch_id"],
+                    "owner": ObjectId(current_user.id),
+                    "created": datetime.utcnow(),
+                    "file_names": [item["file_name"] for item in json["files"]],
+                }
             )
 
-            return redirect(url_for("result_page", result_id=str(inserted_id)))
+            return redirect(url_for("batch_progress", batch_id=json["batch_id"]))
 
-        return render_template("upload.html")
+        return render_template("batch.html")
+
+    @app.route("/batch/<batch_id>")
+    @login_required
+    def batch_progress(batch_id: str):
+        """Render the progress page of a batch"""
+
+        batch_doc = db.batches.find_one(
+            {"_id": batch_id, "owner": ObjectId(current_user.id)}
+        )
+
+        if not batch_doc:
+            flash("Batch not found", "danger")
+            return redirect(url_for("dashboard"))
+
+        return render_template("batch.html", batch=batch_doc)
+
+    @app.route("/batch/<batch_id>/cancel", methods=["POST"])
+    @login_required
+    def batch_cancel(batch_id: str):
+        """Stop processing the unfinished files of a batch"""
+
+        batch_doc = db.batches.find_one(
+            {"_id": batch_id, "owner": ObjectId(current_user.id)}
+        )
+
+        if not batch_doc:
+            flash("Batch not found", "danger")
+            return redirect(url_for("dashboard"))
+
+        if cancel_ml_job(batch_id, str(current_user.id)):
+            flash("Batch cancelled", "success")
+        else:
+            flash("Batch has already finished", "danger")
+        return redirect(url_for("batch_progress", batch_id=batch_id))
+
+    @app.route("/batch/<batch_id>/status")
+    @login_required
+    def batch_status(batch_id: str):
+        """Return batch progress with links to the finished files' results"""
+
+        owner = ObjectId(current_user.id)
+        batch_doc = db.batches.find_one({"_id": batch_id, "owner": owner})
+
+        if not batch_doc:
+            return {"error": "Not found"}, 404
+
+        res = requests.get(
+            f"{CLIENT_URL}/api/batch/{batch_id}",
+            headers={"X-User-Id": str(current_user.id)},
+            timeout=10,
+        )
+        batch: dict = res.json()
+        if res.status_code != 200:
+            return {"error": batch.get("error", "Unknown error")}, res.status_code
+
+        files = []
+        for item in batch["files"]:
+            # The ML client saves each file to history as soon as it is done
+            result_id = item.get("history_id")
+            files.append(
+                {
+                    "file_name": item["file_name"],
+                    "status": item["status"],
+                    "error": item.get("error"),
+                    "result_url": (
+                        url_for("result_page", result_id=result_id)
+                        if result_id
+                        else None
+                    ),
+                }
+            )
+
+        return {
+            "status": batch["status"],
+            "total": batch["total"],
+            "completed": batch["completed"],
+            "files": files,
+        }
 
     @app.route("/result/<result_id>")
     @login_required
     def result_page(result_id: str):
         """Render a result page"""
 
-        history_entry: dict = db.history.find_one({"_id": ObjectId(result_id)})
+        # Segments are served separately, page by page
+        history_entry: dict = db.history.find_one(
+            {"_id": ObjectId(result_id)}, {"segments": 0}
+        )
 
         # Ensure the history entry exists and belongs to the current user
         if not history_entry or ObjectId(current_user.id) != history_entry["owner"]:
@@ -131,11 +470,52 @@ def create_app():
             return redirect(url_for("dashboard"))
 
         # Convert Object Id's into strings for easy display
+        history_entry["_id"] = str(history_entry["_id"])
         history_entry["output_file_id"] = str(history_entry.get("output_file_id"))
         history_entry["owner"] = str(history_entry.get("owner"))
 
         return render_template("result.html", result=history_entry)
 
+    @app.route("/result/<result_id>/segments")
+    @login_required
+    def result_segments(result_id: str):
+        """Return a page of a result's timestamped segments"""
+
+        offset = request.args.get("offset", 0, type=int)
+        limit = min(request.args.get("limit", 50, type=int), SEGMENT_PAGE_SIZE)
+        page = fetch_segments(
+            db, ObjectId(result_id), ObjectId(current_user.id), offset, limit
+        )
+
+        if page is None:
+            return {"error": "Not found"}, 404
+
+        return {**page, "offset": offset, "limit": limit}
+
+    @app.route("/result/<result_id>/subtitles.<subtitle_format>")
+    @login_required
+    def result_subtitles(result_id: str, subtitle_format: str):
+        """Stream a result's segments as an SRT or WebVTT subtitle file"""
+
+        entry_id = ObjectId(result_id)
+        owner = ObjectId(current_user.id)
+
+        if subtitle_format not in SUBTITLE_FORMATS or not db.history.find_one(
+            {"_id": entry_id, "owner": owner}, {"_id": 1}
+        ):
+            return {"error": "Not found"}, 404
+
+        cues = iter_subtitles(iter_segments(db, entry_id, owner), subtitle_format)
+        return Response(
+            stream_with_context(cues),
+            mimetype=SUBTITLE_FORMATS[subtitle_format],
+            headers={
+                "Content-Disposition": (
+                    f"attachment; filename={result_id}.{subtitle_format}"
+                )
+            },
+        )
+
     @app.route("/dashboard")
     @login_required
     def dashboard():
@@ -143,16 +523,63 @@ def create_app():
 
         return render_template("dashboard.html")
 
+    @app.route("/settings", methods=["POST", "GET"])
+    @login_required
+    def settings_page():
+        """Render the settings page and save how long translations are kept"""
+
+        user_filter = {"_id": ObjectId(current_user.id)}
+
+        if request.method == "POST":
+            value = request.form.get("retention_days", "").strip()
+
+            # Leaving the field empty falls back to the service's default
+            if not value:
+                db.users.update_one(user_filter, {"$unset": {"retention_days": ""}})
+                flash("Translations are kept for the default period", "success")
+                return redirect(url_for("settings_page"))
+
+            if not value.isdigit():
+                flash("Retention must be a whole number of days", "danger")
+                return redirect(url_for("settings_page"))
+
+            db.users.update_one(user_filter, {"$set": {"retention_days": int(value)}})
+            flash("Retention saved", "success")
+            return redirect(url_for("settings_page"))
+
+        user_data = db.users.find_one(user_filter, {"retention_days": 1}) or {}
+        return render_template(
+            "settings.html", retention_days=user_data.get("retention_days")
+        )
+
+    def find_history(args) -> dict:
+        """Search the current user's history with the request's query parameters"""
+
+        return search_history(
+            db,
+            ObjectId(current_user.id),
+            HistoryFilter(
+                query=args.get("q", "").strip(),
+                language=args.get("language", ""),
+                start=parse_date(args.get("from")),
+                end=parse_date(args.get("to")),
+            ),
+            page=args.get("page", 1, type=int),
+            per_page=args.get("per_page", 20, type=int),
+        )
+
     @app.route("/history")
     @login_required
     def get_history():
         """History of uses by current user"""
 
-        # Get list of documents representing operations done by the user
-        user: dict = db.users.find_one({"_id": ObjectId(current_user.id)})
-        result_history: list[dict] = list(
-            db.history.find({"_id": {"$in": user.get("history", [])}})
-        )
+        # Get a page of documents representing operations done by the user
+        try:
+            results = find_history(request.args)
+        except ValueError:
+            flash("Dates must be formatted as YYYY-MM-DD", "danger")
+            return redirect(url_for("get_history"))
+        result_history: list[dict] = results["entries"]
 
         # Convert Object Id's into strings for easy display
         for history_entry in result_history:
@@ -160,7 +587,63 @@ def create_app():
             history_entry["output_file_id"] = str(history_entry.get("output_file_id"))
             history_entry["owner"] = str(history_entry.get("owner"))
 
-        return render_template("history.html", history=result_history)
+        languages = sorted(
+            filter(
+                None,
+                db.history.distinct(
+                    "source_language", {"owner": ObjectId(current_user.id)}
+                ),
+            )
+        )
+
+        return render_template(
+            "history.html",
+            history=result_history,
+            results=results,
+            languages=languages,
+            search=request.args,
+        )
+
+    @app.route("/history/search")
+    @login_required
+    def search_history_api():
+        """Search the current user's history, returning a page of JSON results"""
+
+        try:
+            results = find_history(request.args)
+        except ValueError:
+            return {"error": "Dates must be formatted as YYYY-MM-DD"}, 400
+
+        entries = [
+            {
+                "id": str(entry["_id"]),
+                "file_name": entry.get("file_name"),
+                "source_language": entry.get("source_language"),
+                "english_text": entry.get("english_text"),
+                "timestamp": (
+                    entry["timestamp"].isoformat() if entry.get("timestamp") else None
+                ),
+                "duration": entry.get("duration"),
+                "score": entry.get("score"),
+                "result_url": url_for("result_page", result_id=str(entry["_id"])),
+            }
+            for entry in results["entries"]
+        ]
+
+        return {**results, "entries": entries}
+
+    @app.route("/usage")
+    @login_required
+    def usage():
+        """Total the current user's compute usage, optionally between dates"""
+
+        try:
+            start = parse_date(request.args.get("from"))
+            end = parse_date(request.args.get("to"))
+        except ValueError:
+            return {"error": "Dates must be formatted as YYYY-MM-DD"}, 400
+
+        return summarize_usage(db, ObjectId(current_user.id), start, end)
 
     @app.route("/audio/<audio_id>")
     @login_required
@@ -173,11 +656,21 @@ def create_app():
         if not result_doc or result_doc["owner"] != ObjectId(current_user.id):
             return {"error": "Not found"}, 404
 
-        # Send file to frontend
-        file = gridfs.open_download_stream(ObjectId(audio_id))
-        contents = file.read()
-        return send_file(
-            BytesIO(contents), mimetype="audio/wav", download_name=file.filename
-        )
+        # Pick the format from ?format= or the Accept header, preferring the
+        # stored one
+        stored = result_doc.get("output_mimetype", "audio/wav")
+        codecs = {codec: mimetype for mimetype, codec in AUDIO_FORMATS.items()}
+        mimetype = codecs.get(request.args.get("format", ""))
+        if mimetype is None:
+            mimetype = request.accept_mimetypes.best_match(
+                [stored] + [m for m in AUDIO_FORMATS if m != stored], default=stored
+            )
+
+        # Stream file to frontend straight from storage
+        try:
+            file, mimetype = open_audio(ObjectId(audio_id), mimetype)
+        except FileNotFoundError:
+            return {"error": "Not found"}, 404
+        return send_file(file, mimetype=mimetype, download_name=file.filename)
 
     return app
@@ -0,0 +1,117 @@
+"""Search over translation history"""
+
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.database import Database
+
+MAX_PER_PAGE = 100
+
+
+class HistoryFilter(NamedTuple):
+    """What a history search matches; empty fields match every entry"""
+
+    query: str = ""
+    language: str = ""
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+
+def ensure_indexes(database: Database):
+    """Create the indexes searches, audio lookups and retention rely on"""
+
+    # Prefixing the text index with owner keeps every search inside one
+    # user's entries instead of scanning the whole collection
+    database.history.create_index(
+        [("owner", ASCENDING), ("english_text", TEXT), ("file_name", TEXT)],
+        name="owner_text",
+        weights={"english_text": 2, "file_name": 1},
+        default_language="english",
+    )
+    database.history.create_index(
+        [("owner", ASCENDING), ("timestamp", DESCENDING)], name="owner_timestamp"
+    )
+    database.history.create_index(
+        [
+            ("owner", ASCENDING),
+            ("source_language", ASCENDING),
+            ("timestamp", DESCENDING),
+        ],
+        name="owner_language_timestamp",
+    )
+    database.history.create_index("output_file_id", name="output_file_id")
+
+    # Retention expires entries across all users by age, and looks up the
+    # few users who chose their own retention separately
+    database.history.create_index("timestamp", name="timestamp")
+    database.users.create_index("retention_days", name="retention_days", sparse=True)
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse a YYYY-MM-DD query parameter, raising ValueError when malformed"""
+
+    return datetime.strptime(value, "%Y-%m-%d") if value else None
+
+
+def date_range(start: Optional[datetime], end: Optional[datetime]) -> Optional[dict]:
+    """Timestamp criteria from ``start`` through the inclusive day ``end``"""
+
+    if not start and not end:
+        return None
+    criteria = {}
+    if start:
+        criteria["$gte"] = start
+    if end:
+        criteria["$lt"] = end + timedelta(days=1)
+    return criteria
+
+
+def search_history(
+    database: Database,
+    owner: ObjectId,
+    filters: HistoryFilter = HistoryFilter(),
+    page: int = 1,
+    per_page: int = 20,
+) -> dict:
+    """Find a page of a user's history entries, best text matches first
+
+    Without a query, entries are ordered newest first. ``end`` is an
+    inclusive day, and one extra entry is fetched to tell whether another
+    page follows without counting every match.
+    """
+
+    page = max(1, page)
+    per_page = min(max(1, per_page), MAX_PER_PAGE)
+
+    criteria: dict = {"owner": owner}
+    if filters.query:
+        criteria["$text"] = {"$search": filters.query}
+    if filters.language:
+        criteria["source_language"] = filters.language
+    timestamps = date_range(filters.start, filters.end)
+    if timestamps:
+        criteria["timestamp"] = timestamps
+
+    # Segments are only needed on the result page
+    projection: dict = {"segments": 0}
+    sort = [("timestamp", DESCENDING)]
+    if filters.query:
+        projection["score"] = {"$meta": "textScore"}
+        sort = [("score", {"$meta": "textScore"})] + sort
+
+    cursor = (
+        database.history.find(criteria, projection)
+        .sort(sort)
+        .skip((page - 1) * per_page)
+        .limit(per_page + 1)
+    )
+    entries = list(cursor)
+
+    return {
+        "entries": entries[:per_page],
+        "page": page,
+        "per_page": per_page,
+        "has_next": len(entries) > per_page,
+    }
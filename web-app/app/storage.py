@@ -0,0 +1,57 @@
+"""Reads of generated audio from the hot (GridFS) and cold (filesystem) tiers"""
+
+import io
+import os
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from gridfs.errors import NoFile
+
+from .db import db, gridfs
+
+# Shared with the ML client, which migrates audio here out of GridFS
+COLD_STORAGE_DIR = os.getenv("COLD_STORAGE_DIR", "/data/cold-audio")
+
+
+class ColdFile(io.FileIO):
+    """Audio file on the cold tier with the attributes of a GridFS file"""
+
+    def __init__(self, path: str, doc: dict):
+        super().__init__(path, "rb")
+        self._id: ObjectId = doc["_id"]
+        self.filename: str = doc["filename"]
+        self.metadata: dict = doc.get("metadata") or {}
+
+
+def open_stored(file_id: ObjectId):
+    """Open a stored audio file from whichever tier holds it"""
+
+    try:
+        file = gridfs.open_download_stream(file_id)
+    except NoFile:
+        file = None
+
+    # Migrated files stay in GridFS a while only for streams already open
+    if file is None or (file.metadata or {}).get("migrated"):
+        if file is not None:
+            file.close()
+        doc = db["audio.cold"].find_one({"_id": file_id})
+        if doc is None:
+            raise FileNotFoundError(f"Audio file {file_id} not found")
+        return ColdFile(os.path.join(COLD_STORAGE_DIR, doc["path"]), doc)
+
+    # Keep recently played audio in the hot tier
+    db["audio.files"].update_one(
+        {"_id": file_id}, {"$set": {"metadata.last_access": datetime.utcnow()}}
+    )
+    return file
+
+
+def find_transcode(file_id: ObjectId, codec: str) -> Optional[ObjectId]:
+    """Get the id of a cached transcode of a stored audio file, if any"""
+
+    doc = db["audio.files"].find_one(
+        {"metadata.transcode_of": file_id, "metadata.codec": codec}, {"_id": 1}
+    )
+    return doc["_id"] if doc else None
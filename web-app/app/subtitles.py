@@ -0,0 +1,88 @@
+"""Timestamped transcript segments and subtitle export"""
+
+from typing import Iterator, Optional
+
+from bson import ObjectId
+from pymongo.database import Database
+
+SEGMENT_PAGE_SIZE = 200
+SUBTITLE_FORMATS = {
+    "srt": "application/x-subrip",
+    "vtt": "text/vtt",
+}
+
+
+def empty_segments() -> dict:
+    """Columnar segments of a translation without timing information"""
+
+    return {"start": [], "end": [], "text": []}
+
+
+def fetch_segments(
+    database: Database, entry_id: ObjectId, owner: ObjectId, offset: int, limit: int
+) -> Optional[dict]:
+    """Load a slice of a history entry's segments without the rest of them
+
+    Returns None when the entry does not exist or belongs to someone else.
+    """
+
+    window = [max(0, offset), max(1, limit)]
+    doc = database.history.find_one(
+        {"_id": entry_id, "owner": owner},
+        {
+            "segment_count": 1,
+            "segments.start": {"$slice": window},
+            "segments.end": {"$slice": window},
+            "segments.text": {"$slice": window},
+        },
+    )
+    if doc is None:
+        return None
+
+    segments = doc.get("segments") or empty_segments()
+    return {
+        "total": doc.get("segment_count", len(segments["text"])),
+        "segments": [
+            {"start": start, "end": end, "text": text}
+            for start, end, text in zip(
+                segments["start"], segments["end"], segments["text"]
+            )
+        ],
+    }
+
+
+def iter_segments(
+    database: Database, entry_id: ObjectId, owner: ObjectId
+) -> Iterator[dict]:
+    """Yield every segment of a history entry, loading a page at a time"""
+
+    offset = 0
+    while True:
+        page = fetch_segments(database, entry_id, owner, offset, SEGMENT_PAGE_SIZE)
+        if not page or not page["segments"]:
+            return
+        yield from page["segments"]
+        offset += len(page["segments"])
+
+
+def format_timestamp(seconds: float, separator: str) -> str:
+    """Format seconds as HH:MM:SS followed by milliseconds"""
+
+    milliseconds = round(seconds * 1000)
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{milliseconds:03d}"
+
+
+def iter_subtitles(segments: Iterator[dict], subtitle_format: str) -> Iterator[str]:
+    """Render segments as SRT or WebVTT cues, one cue at a time"""
+
+    separator = "," if subtitle_format == "srt" else "."
+    if subtitle_format == "vtt":
+        yield "WEBVTT\n\n"
+
+    for number, segment in enumerate(segments, start=1):
+        start = format_timestamp(segment["start"], separator)
+        end = format_timestamp(segment["end"], separator)
+        yield f"{number}\n{start} --> {end}\n{segment['text']}\n\n"
@@ -0,0 +1,202 @@
+"""Request tracing with spans continued by the ML client
+
+Spans follow the OpenTelemetry data model; the ``traceparent`` header
+(W3C Trace Context) carries the trace id, the request's correlation id,
+to the ML client. Finished traces are appended to ``TRACE_FILE`` as JSON
+lines and/or posted to an OTLP/HTTP collector at ``TRACE_ENDPOINT``.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+import requests
+
+SERVICE_NAME = "web-app"
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+TRACE_ENDPOINT = os.getenv("TRACE_ENDPOINT", "")
+
+# Span kinds: work within the app, handling a browser request, or calling
+# another service
+INTERNAL = "INTERNAL"
+SERVER = "SERVER"
+CLIENT = "CLIENT"
+# Span kinds as numbered in the OTLP encoding
+OTLP_SPAN_KINDS = {INTERNAL: 1, SERVER: 2, CLIENT: 3}
+
+
+class Span:  # pylint: disable=too-many-instance-attributes
+    """A timed operation within a trace"""
+
+    def __init__(
+        self,
+        trace_id: str,
+        parent_id: Optional[str],
+        name: str,
+        attributes,
+        kind: str = INTERNAL,
+    ):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end: Optional[int] = None
+        self.attributes = dict(attributes)
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value):
+        """Record a detail of the operation"""
+        self.attributes[key] = value
+
+    def traceparent(self) -> str:
+        """Header continuing the trace under this span in another service"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        """Span as an OTLP-style JSON object"""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "service": SERVICE_NAME,
+            "startTimeUnixNano": self.start,
+            "endTimeUnixNano": self.end,
+            "attributes": self.attributes,
+            "status": (
+                {"code": "ERROR", "message": self.error}
+                if self.error
+                else {"code": "OK"}
+            ),
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+_spans: ContextVar[Optional[List[Span]]] = ContextVar("spans", default=None)
+_export_lock = threading.Lock()
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """Trace a request for the duration of the block, exporting it at the end
+
+    The root span is a SERVER span handling the browser's request.
+    """
+
+    spans: List[Span] = []
+    reset = _spans.set(spans)
+    root = Span(os.urandom(16).hex(), None, name, attributes, SERVER)
+    try:
+        with _record(spans, root):
+            yield root
+    finally:
+        _spans.reset(reset)
+        export(spans)
+
+
+@contextmanager
+def span(name: str, kind: str = INTERNAL, **attributes):
+    """Time an operation as a child of the current span, if tracing
+
+    ``kind`` is CLIENT for calls to other services and the database.
+    """
+
+    spans = _spans.get()
+    parent = _current_span.get()
+    if spans is None or parent is None:
+        yield None
+        return
+
+    with _record(
+        spans, Span(parent.trace_id, parent.span_id, name, attributes, kind)
+    ) as active:
+        yield active
+
+
+@contextmanager
+def _record(spans: List[Span], active: Span):
+    """Make a span current for the block and keep it when done"""
+
+    reset = _current_span.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        active.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(reset)
+        active.end = time.time_ns()
+        spans.append(active)
+
+
+def export(spans: List[Span]):
+    """Write finished spans to the trace file and/or the collector"""
+
+    documents = [finished.to_dict() for finished in spans]
+    if not documents:
+        return
+
+    if TRACE_FILE:
+        try:
+            with _export_lock, open(TRACE_FILE, "a", encoding="utf-8") as file:
+                for document in documents:
+                    file.write(json.dumps(document, default=str) + "\n")
+        except OSError:
+            pass
+
+    if TRACE_ENDPOINT:
+        # Never make the user wait for the collector
+        threading.Thread(
+            target=_post_spans, args=(documents,), name="trace-export", daemon=True
+        ).start()
+
+
+def _post_spans(documents: List[dict]):
+    """Post spans to an OTLP/HTTP collector as JSON"""
+
+    spans = [
+        {
+            "traceId": doc["traceId"],
+            "spanId": doc["spanId"],
+            "parentSpanId": doc["parentSpanId"],
+            "name": doc["name"],
+            "kind": OTLP_SPAN_KINDS[doc["kind"]],
+            "startTimeUnixNano": str(doc["startTimeUnixNano"]),
+            "endTimeUnixNano": str(doc["endTimeUnixNano"]),
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in doc["attributes"].items()
+            ],
+            "status": (
+                {"code": 2, "message": doc["status"]["message"]}
+                if doc["status"]["code"] == "ERROR"
+                else {"code": 1}
+            ),
+        }
+        for doc in documents
+    ]
+    payload = {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+                    ]
+                },
+                "scopeSpans": [{"spans": spans}],
+            }
+        ]
+    }
+    try:
+        requests.post(
+            f"{TRACE_ENDPOINT.rstrip('/')}/v1/traces", json=payload, timeout=5
+        )
+    except requests.RequestException:
+        pass
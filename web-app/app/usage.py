@@ -0,0 +1,96 @@
+"""Compute usage of translations, aggregated per user"""
+
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from pymongo.database import Database
+
+from .search import date_range
+
+# Usage figures summed per user and per day
+SUMMED_FIELDS = ["cpu_seconds", "wall_seconds", "input_seconds", "output_seconds"]
+
+
+def _usage_group(key) -> dict:
+    """Group stage totalling the usage of the history entries sharing a key"""
+
+    group: dict = {"_id": key, "translations": {"$sum": 1}}
+    for field in SUMMED_FIELDS:
+        group[field] = {"$sum": f"$usage.{field}"}
+    group["max_peak_rss_mb"] = {"$max": "$usage.peak_rss_mb"}
+    group["avg_real_time_factor"] = {"$avg": "$usage.real_time_factor"}
+    return {"$group": group}
+
+
+def usage_pipeline(
+    owner: ObjectId, start: Optional[datetime] = None, end: Optional[datetime] = None
+) -> list:
+    """Aggregation pipeline totalling a user's usage overall, per day and per stage
+
+    ``end`` is an inclusive day. Entries recorded before usage was metered
+    are left out.
+    """
+
+    criteria: dict = {"owner": owner, "usage": {"$type": "object"}}
+    timestamps = date_range(start, end)
+    if timestamps:
+        criteria["timestamp"] = timestamps
+
+    return [
+        {"$match": criteria},
+        {
+            "$facet": {
+                "totals": [_usage_group(None)],
+                "days": [
+                    _usage_group(
+                        {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}
+                    ),
+                    {"$sort": {"_id": 1}},
+                ],
+                "stages": [
+                    {"$project": {"stage": {"$objectToArray": "$usage.stages"}}},
+                    {"$unwind": "$stage"},
+                    {
+                        "$group": {
+                            "_id": "$stage.k",
+                            "wall_seconds": {"$sum": "$stage.v.wall_seconds"},
+                            "cpu_seconds": {"$sum": "$stage.v.cpu_seconds"},
+                        }
+                    },
+                    {"$sort": {"_id": 1}},
+                ],
+            }
+        },
+    ]
+
+
+def _rounded(group: dict) -> dict:
+    """Usage totals of a group without its key, rounded for display"""
+
+    return {
+        key: round(value, 3) if isinstance(value, float) else value
+        for key, value in group.items()
+        if key != "_id"
+    }
+
+
+def summarize_usage(
+    database: Database,
+    owner: ObjectId,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> dict:
+    """Total a user's compute usage overall, per day and per stage"""
+
+    facets = next(
+        database.history.aggregate(usage_pipeline(owner, start, end)),
+        {"totals": [], "days": [], "stages": []},
+    )
+    totals = facets["totals"][0] if facets["totals"] else {"translations": 0}
+
+    return {
+        "totals": _rounded(totals),
+        "days": [{"day": day["_id"], **_rounded(day)} for day in facets["days"]],
+        "stages": {stage["_id"]: _rounded(stage) for stage in facets["stages"]},
+    }
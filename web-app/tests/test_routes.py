@@ -1,8 +1,11 @@
 """API Tests for app connection to ML Client"""
 
 import io
+import json
 from unittest.mock import MagicMock, patch
 
+import pytest
+import requests
 from bson import ObjectId
 
 
@@ -60,3 +63,276 @@ def test_result_page_wrong_owner(client, mock_db):
 
     assert res.status_code == 302
     assert "/dashboard" in res.location
+
+
+def test_upload_raw_body_streams_to_ml_client(client, mock_db, mock_ml_client_response):
+    """Test /upload pipes a raw request body through to the ML client"""
+    fake_id = ObjectId()
+    mock_db.history.insert_one.return_value = MagicMock(inserted_id=fake_id)
+
+    user_id = str(ObjectId())
+
+    with patch("app.requests.post", return_value=mock_ml_client_response) as post:
+        with patch("app.current_user") as mock_user:
+            mock_user.id = user_id
+
+            res = client.post(
+                "/upload",
+                data=b"hello audio",
+                headers={
+                    "X-Filename": "caf%C3%A9.wav",
+                    "Content-Type": "audio/wav",
+                    "X-Aligned": "true",
+                },
+            )
+
+        sent = b"".join(post.call_args.kwargs["data"])
+
+    assert res.status_code == 302
+    assert post.call_args.args[0].endswith("/api/process/stream")
+    assert post.call_args.kwargs["headers"]["X-Filename"] == "caf%C3%A9.wav"
+    assert post.call_args.kwargs["headers"]["X-User-Id"] == user_id
+    assert post.call_args.kwargs["params"] == {"aligned": "true"}
+    assert post.call_args.kwargs["headers"]["X-Request-Timeout"] == "60"
+    assert post.call_args.kwargs["headers"]["X-Job-Id"]
+    assert sent == b"hello audio"
+    assert mock_db.history.insert_one.call_args.args[0]["file_name"] == "café.wav"
+
+
+def test_upload_traces_request(client, mock_db, mock_ml_client_response, tmp_path):
+    """Test /upload continues its trace in the ML client and records it"""
+    mock_db.history.insert_one.return_value = MagicMock(inserted_id=ObjectId())
+    trace_file = tmp_path / "traces.jsonl"
+
+    with patch("app.requests.post", return_value=mock_ml_client_response) as post:
+        with patch("app.current_user") as mock_user, patch(
+            "app.tracing.TRACE_FILE", str(trace_file)
+        ):
+            mock_user.id = str(ObjectId())
+
+            client.post(
+                "/upload",
+                data=b"hello audio",
+                headers={"X-Filename": "audio.wav", "Content-Type": "audio/wav"},
+            )
+
+    with open(trace_file, encoding="utf-8") as file:
+        spans = {doc["name"]: doc for doc in map(json.loads, file)}
+    trace_id = mock_db.history.insert_one.call_args.args[0]["trace_id"]
+    traceparent = post.call_args.kwargs["headers"]["traceparent"]
+
+    assert set(spans) == {"web.upload", "ml.process", "mongo.history_insert"}
+    assert {doc["traceId"] for doc in spans.values()} == {trace_id}
+    assert traceparent == f"00-{trace_id}-{spans['ml.process']['spanId']}-01"
+    assert spans["ml.process"]["parentSpanId"] == spans["web.upload"]["spanId"]
+    assert spans["web.upload"]["kind"] == "SERVER"
+    assert spans["ml.process"]["kind"] == "CLIENT"
+
+
+def test_upload_timeout_cancels_ml_job(client, mock_db):
+    """Test /upload cancels the ML client's job when it stops waiting"""
+    user_id = str(ObjectId())
+    cancelled = MagicMock(status_code=202)
+
+    with patch(
+        "app.requests.post", side_effect=[requests.Timeout(), cancelled]
+    ) as post:
+        with patch("app.current_user") as mock_user:
+            mock_user.id = user_id
+
+            res = client.post(
+                "/upload",
+                data=b"hello audio",
+                headers={"X-Filename": "clip.wav", "Content-Type": "audio/wav"},
+            )
+
+    job_id = post.call_args_list[0].kwargs["headers"]["X-Job-Id"]
+    assert res.status_code == 200
+    assert post.call_args.args[0].endswith(f"/api/jobs/{job_id}/cancel")
+    assert post.call_args.kwargs["headers"] == {"X-User-Id": user_id}
+    mock_db.history.insert_one.assert_not_called()
+
+
+@pytest.mark.usefixtures("mock_db")
+def test_voice_enrolls_clips_with_ml_client(client):
+    """Test /voice forwards reference clips to the ML client's profiles"""
+    user_id = str(ObjectId())
+    enrolled = MagicMock(status_code=201)
+    enrolled.json.return_value = {"model": "your_tts", "clips": 2}
+
+    with patch("app.requests.post", return_value=enrolled) as post:
+        with patch("app.current_user") as mock_user:
+            mock_user.id = user_id
+
+            res = client.post(
+                "/voice",
+                data={
+                    "audio": [
+                        (io.BytesIO(b"one"), "one.wav", "audio/wav"),
+                        (io.BytesIO(b"two"), "two.wav", "audio/wav"),
+                    ],
+                    "append": "on",
+                },
+                content_type="multipart/form-data",
+            )
+
+    assert res.status_code == 302
+    assert post.call_args.args[0].endswith("/api/profiles")
+    assert len(post.call_args.kwargs["files"]) == 2
+    assert post.call_args.kwargs["data"] == {"append": "True"}
+    assert post.call_args.kwargs["headers"] == {"X-User-Id": user_id}
+
+
+def test_upload_with_voice_profile(client, mock_db, mock_ml_client_response):
+    """Test /upload asks the ML client to use the stored voice profile"""
+    mock_db.history.insert_one.return_value = MagicMock(inserted_id=ObjectId())
+    mock_ml_client_response.json.return_value["voice_profile"] = True
+
+    with patch("app.requests.post", return_value=mock_ml_client_response) as post:
+        with patch("app.current_user") as mock_user:
+            mock_user.id = str(ObjectId())
+
+            client.post(
+                "/upload",
+                data=b"hello audio",
+                headers={
+                    "X-Filename": "clip.wav",
+                    "Content-Type": "audio/wav",
+                    "X-Use-Profile": "true",
+                },
+            )
+
+    assert post.call_args.kwargs["params"] == {"profile": "true"}
+    assert mock_db.history.insert_one.call_args.args[0]["voice_profile"] is True
+
+
+def test_batch_status_links_recorded_files(client, mock_db):
+    """Test /batch/<id>/status links the entries the ML client recorded"""
+    owner, history_id = ObjectId(), ObjectId()
+    mock_db.batches.find_one.return_value = {"_id": "abc", "owner": owner}
+
+    ml_response = MagicMock(status_code=200)
+    ml_response.json.return_value = {
+        "batch_id": "abc",
+        "status": "processing",
+        "total": 2,
+        "completed": 1,
+        "files": [
+            {
+                "index": 0,
+                "file_name": "one.wav",
+                "status": "done",
+                "history_id": str(history_id),
+            },
+            {"index": 1, "file_name": "two.wav", "status": "processing"},
+        ],
+    }
+
+    with patch("app.requests.get", return_value=ml_response):
+        with patch("app.current_user") as mock_user:
+            mock_user.id = str(owner)
+
+            res = client.get("/batch/abc/status")
+
+    assert res.status_code == 200
+    assert res.json["completed"] == 1
+    assert res.json["files"][0]["result_url"] == f"/result/{history_id}"
+    assert res.json["files"][1]["result_url"] is None
+    # Polling never writes history
+    mock_db.history.insert_many.assert_not_called()
+    mock_db.history.insert_one.assert_not_called()
+
+
+def _owned_audio(mock_db, mimetype):
+    """Make the history entry of an audio file owned by a new user"""
+    entry = mock_db.history.find_one.return_value
+    entry["output_mimetype"] = mimetype
+    return str(entry["owner"]), str(entry["output_file_id"])
+
+
+def _stored_file(data, mimetype):
+    """Fake GridFS download stream"""
+    file = io.BytesIO(data)
+    file.filename = "cloned.ogg"
+    file.metadata = {"mimetype": mimetype}
+    return file
+
+
+def test_get_audio_serves_stored_format(client, mock_db):
+    """Test /audio serves the stored codec when the browser accepts it"""
+    owner, audio_id = _owned_audio(mock_db, "audio/ogg")
+
+    with patch("app.storage") as storage, patch("app.requests.post") as post:
+        storage.open_stored.return_value = _stored_file(b"opus", "audio/ogg")
+        with patch("app.current_user") as mock_user:
+            mock_user.id = owner
+            res = client.get(f"/audio/{audio_id}", headers={"Accept": "*/*"})
+
+    assert res.status_code == 200
+    assert res.mimetype == "audio/ogg"
+    assert res.data == b"opus"
+    post.assert_not_called()
+
+
+def test_get_audio_transcodes_on_demand(client, mock_db):
+    """Test /audio asks the ML client for a transcode when none is cached"""
+    owner, audio_id = _owned_audio(mock_db, "audio/ogg")
+    transcode_id = ObjectId()
+    ml_response = MagicMock(status_code=200)
+    ml_response.json.return_value = {"file_id": str(transcode_id)}
+
+    with patch("app.storage") as storage, patch(
+        "app.requests.post", return_value=ml_response
+    ) as post:
+        storage.open_stored.side_effect = [
+            _stored_file(b"opus", "audio/ogg"),
+            _stored_file(b"wav", "audio/wav"),
+        ]
+        storage.find_transcode.return_value = None
+        with patch("app.current_user") as mock_user:
+            mock_user.id = owner
+            res = client.get(f"/audio/{audio_id}", headers={"Accept": "audio/wav"})
+
+    assert res.status_code == 200
+    assert res.mimetype == "audio/wav"
+    assert res.data == b"wav"
+    assert post.call_args.kwargs["params"] == {"format": "wav"}
+    assert storage.open_stored.call_args.args[0] == transcode_id
+
+
+def test_result_page_renders_waveform_metadata(client, mock_db):
+    """Test /result draws the stored peaks and duration without reading audio"""
+    entry = mock_db.history.find_one.return_value
+    entry.update({"duration": 75.2, "sample_rate": 16000, "peaks": [0.1, 0.4, 0.2]})
+
+    with patch("app.storage") as storage, patch("app.current_user") as mock_user:
+        mock_user.id = str(entry["owner"])
+        res = client.get(f"/result/{entry['_id']}")
+
+    assert res.status_code == 200
+    assert b"<svg" in res.data
+    assert b"M1.5 0.0V100.0" in res.data
+    assert b"1:15" in res.data
+    storage.open_stored.assert_not_called()
+
+
+def test_settings_saves_retention(client, mock_db):
+    """Test /settings stores, clears and validates the retention override"""
+    user_id = ObjectId()
+    mock_db.users.find_one.return_value = {"_id": user_id, "retention_days": 30}
+
+    with patch("app.current_user") as mock_user:
+        mock_user.id = str(user_id)
+
+        page = client.get("/settings")
+        saved = client.post("/settings", data={"retention_days": "7"})
+        cleared = client.post("/settings", data={"retention_days": ""})
+        invalid = client.post("/settings", data={"retention_days": "-1"})
+
+    assert page.status_code == 200
+    assert b'value="30"' in page.data
+    assert saved.status_code == cleared.status_code == invalid.status_code == 302
+    assert mock_db.users.update_one.call_args_list == [
+        (({"_id": user_id}, {"$set": {"retention_days": 7}}),),
+        (({"_id": user_id}, {"$unset": {"retention_days": ""}}),),
+    ]
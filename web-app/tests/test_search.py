@@ -0,0 +1,136 @@
+"""History search tests"""
+
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from bson import ObjectId
+
+from app.search import HistoryFilter, search_history
+
+
+def _database(entries):
+    """Mock database whose history cursor returns the given entries"""
+    database = MagicMock()
+    cursor = database.history.find.return_value
+    cursor.sort.return_value = cursor
+    cursor.skip.return_value = cursor
+    cursor.limit.return_value = entries
+    return database
+
+
+def test_search_history_ranks_text_matches_within_owner():
+    """Text searches are scoped to the owner and sorted by score"""
+    owner = ObjectId()
+    database = _database([{"_id": 1}, {"_id": 2}, {"_id": 3}])
+
+    results = search_history(
+        database,
+        owner,
+        HistoryFilter(
+            query="hello",
+            language="fr",
+            start=datetime(2025, 1, 1),
+            end=datetime(2025, 1, 31),
+        ),
+        page=2,
+        per_page=2,
+    )
+
+    criteria, projection = database.history.find.call_args.args
+    assert criteria["owner"] == owner
+    assert criteria["$text"] == {"$search": "hello"}
+    assert criteria["source_language"] == "fr"
+    assert criteria["timestamp"] == {
+        "$gte": datetime(2025, 1, 1),
+        "$lt": datetime(2025, 2, 1),
+    }
+    assert projection == {"segments": 0, "score": {"$meta": "textScore"}}
+    cursor = database.history.find.return_value
+    assert cursor.sort.call_args.args[0][0] == ("score", {"$meta": "textScore"})
+    cursor.skip.assert_called_once_with(2)
+    cursor.limit.assert_called_once_with(3)
+    assert results["entries"] == [{"_id": 1}, {"_id": 2}]
+    assert results["has_next"]
+
+
+def test_search_history_without_query_lists_newest_first():
+    """Plain listing uses no text search and clamps page size"""
+    database = _database([])
+
+    results = search_history(database, ObjectId(), per_page=1000)
+
+    criteria, projection = database.history.find.call_args.args
+    assert "$text" not in criteria
+    assert projection == {"segments": 0}
+    assert results["per_page"] == 100
+    assert not results["has_next"]
+
+
+@pytest.mark.usefixtures("mock_db")
+def test_search_endpoint(client):
+    """Test /history/search returns JSON results"""
+    entry_id = ObjectId()
+    entries = [
+        {
+            "_id": entry_id,
+            "file_name": "clip.wav",
+            "english_text": "Hello there",
+            "source_language": "fr",
+            "timestamp": datetime(2025, 1, 1, 12),
+            "score": 1.5,
+        }
+    ]
+
+    with patch("app.search_history", return_value={"entries": entries}) as search:
+        with patch("app.current_user") as mock_user:
+            mock_user.id = str(ObjectId())
+            res = client.get("/history/search?q=hello&from=2025-01-01")
+
+    assert res.status_code == 200
+    assert res.json["entries"][0]["id"] == str(entry_id)
+    assert res.json["entries"][0]["result_url"] == f"/result/{entry_id}"
+    filters = search.call_args.args[2]
+    assert filters.query == "hello"
+    assert filters.start == datetime(2025, 1, 1)
+
+
+@pytest.mark.usefixtures("mock_db")
+def test_search_endpoint_rejects_bad_dates(client):
+    """Test /history/search with a malformed date"""
+    with patch("app.current_user") as mock_user:
+        mock_user.id = str(ObjectId())
+        res = client.get("/history/search?from=yesterday")
+
+    assert res.status_code == 400
+
+
+def test_history_page_renders_search_form(client, mock_db):
+    """Test /history renders results with the search form filled in"""
+    mock_db.history.distinct.return_value = ["fr"]
+    results = {"entries": [], "page": 1, "per_page": 20, "has_next": False}
+
+    with patch("app.search_history", return_value=results):
+        with patch("app.current_user") as mock_user:
+            mock_user.id = str(ObjectId())
+            res = client.get("/history?q=bonjour&language=fr")
+
+    assert res.status_code == 200
+    assert b'value="bonjour"' in res.data
+    assert b"No translations match your search" in res.data
+
+
+def test_history_page_links_next_page(client, mock_db):
+    """Test /history keeps the search in pagination links"""
+    mock_db.history.distinct.return_value = []
+    entry = dict(mock_db.history.find_one.return_value, file_name="clip.wav")
+    results = {"entries": [entry], "page": 1, "per_page": 1, "has_next": True}
+
+    with patch("app.search_history", return_value=results):
+        with patch("app.current_user") as mock_user:
+            mock_user.id = str(ObjectId())
+            res = client.get("/history?q=hello")
+
+    assert res.status_code == 200
+    assert b"clip.wav" in res.data
+    assert b"/history?q=hello&amp;page=2" in res.data
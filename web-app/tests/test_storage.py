@@ -0,0 +1,68 @@
+"""Tiered audio storage tests"""
+
+from unittest.mock import patch
+
+import pytest
+from bson import ObjectId
+from gridfs.errors import NoFile
+
+from app import storage
+
+
+def test_open_stored_hot_tier_records_access():
+    """Audio read from GridFS gets its last access time updated"""
+    file_id = ObjectId()
+    with patch("app.storage.gridfs") as gridfs, patch("app.storage.db") as db:
+        gridfs.open_download_stream.return_value.metadata = {}
+        assert storage.open_stored(file_id) is gridfs.open_download_stream.return_value
+
+    update = db["audio.files"].update_one.call_args.args
+    assert update[0] == {"_id": file_id}
+    assert "metadata.last_access" in update[1]["$set"]
+
+
+def test_open_stored_falls_back_to_cold_tier(tmp_path):
+    """Audio migrated out of GridFS is read from the cold directory"""
+    file_id = ObjectId()
+    (tmp_path / "ab").mkdir()
+    (tmp_path / "ab" / "cloned.ogg").write_bytes(b"cold audio")
+    cold_doc = {
+        "_id": file_id,
+        "path": "ab/cloned.ogg",
+        "filename": "cloned.ogg",
+        "metadata": {"mimetype": "audio/ogg"},
+    }
+
+    with patch("app.storage.gridfs") as gridfs, patch("app.storage.db") as db, patch(
+        "app.storage.COLD_STORAGE_DIR", str(tmp_path)
+    ):
+        gridfs.open_download_stream.side_effect = NoFile
+        db["audio.cold"].find_one.return_value = cold_doc
+
+        with storage.open_stored(file_id) as file:
+            assert file.read() == b"cold audio"
+            assert file.metadata["mimetype"] == "audio/ogg"
+
+        db["audio.cold"].find_one.return_value = None
+        with pytest.raises(FileNotFoundError):
+            storage.open_stored(file_id)
+
+
+def test_open_stored_prefers_cold_copy_of_migrated_file(tmp_path):
+    """A migrated file still in GridFS is read from its cold copy"""
+    file_id = ObjectId()
+    (tmp_path / "cloned.ogg").write_bytes(b"cold audio")
+    cold_doc = {"_id": file_id, "path": "cloned.ogg", "filename": "cloned.ogg"}
+
+    with patch("app.storage.gridfs") as gridfs, patch("app.storage.db") as db, patch(
+        "app.storage.COLD_STORAGE_DIR", str(tmp_path)
+    ):
+        hot_file = gridfs.open_download_stream.return_value
+        hot_file.metadata = {"migrated": "2025-01-01"}
+        db["audio.cold"].find_one.return_value = cold_doc
+
+        with storage.open_stored(file_id) as file:
+            assert file.read() == b"cold audio"
+
+    hot_file.close.assert_called_once()
+    db["audio.files"].update_one.assert_not_called()
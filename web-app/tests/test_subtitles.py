@@ -0,0 +1,88 @@
+"""Transcript segment and subtitle export tests"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from bson import ObjectId
+
+from app.subtitles import fetch_segments, format_timestamp, iter_subtitles
+
+SEGMENTS = [
+    {"start": 0.0, "end": 2.5, "text": "Hello"},
+    {"start": 2.5, "end": 3661.25, "text": "world."},
+]
+
+
+def test_format_timestamp():
+    """Timestamps use milliseconds and the format's separator"""
+    assert format_timestamp(3661.25, ",") == "01:01:01,250"
+    assert format_timestamp(0.0014, ".") == "00:00:00.001"
+
+
+def test_iter_subtitles_srt_and_vtt():
+    """Cues are numbered and VTT gets its header"""
+    srt = "".join(iter_subtitles(iter(SEGMENTS), "srt"))
+    vtt = "".join(iter_subtitles(iter(SEGMENTS), "vtt"))
+
+    assert srt.startswith("1\n00:00:00,000 --> 00:00:02,500\nHello\n\n2\n")
+    assert vtt.startswith("WEBVTT\n\n1\n00:00:00.000 --> 00:00:02.500\nHello")
+    assert "01:01:01.250" in vtt
+
+
+def test_fetch_segments_slices_columns():
+    """Only the requested window of each column is projected"""
+    database = MagicMock()
+    database.history.find_one.return_value = {
+        "segment_count": 10,
+        "segments": {"start": [2.5], "end": [4.0], "text": ["world."]},
+    }
+
+    page = fetch_segments(database, ObjectId(), ObjectId(), offset=1, limit=1)
+
+    projection = database.history.find_one.call_args.args[1]
+    assert projection["segments.text"] == {"$slice": [1, 1]}
+    assert page == {
+        "total": 10,
+        "segments": [{"start": 2.5, "end": 4.0, "text": "world."}],
+    }
+
+
+@pytest.mark.usefixtures("mock_db")
+def test_subtitles_endpoint_streams_pages(client):
+    """Test /result/<id>/subtitles.srt streams every page of segments"""
+    owner = ObjectId()
+    pages = [{"total": 2, "segments": SEGMENTS}, {"total": 2, "segments": []}]
+
+    with patch("app.subtitles.fetch_segments", side_effect=pages):
+        with patch("app.current_user") as mock_user:
+            mock_user.id = str(owner)
+            res = client.get(f"/result/{ObjectId()}/subtitles.srt")
+
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-subrip"
+    assert res.data.decode().count(" --> ") == 2
+
+
+@pytest.mark.usefixtures("mock_db")
+def test_subtitles_endpoint_unknown_format(client):
+    """Test /result/<id>/subtitles with an unsupported format"""
+    with patch("app.current_user") as mock_user:
+        mock_user.id = str(ObjectId())
+        res = client.get(f"/result/{ObjectId()}/subtitles.txt")
+
+    assert res.status_code == 404
+
+
+@pytest.mark.usefixtures("mock_db")
+def test_segments_endpoint(client):
+    """Test /result/<id>/segments returns one page"""
+    page = {"total": 2, "segments": SEGMENTS[:1]}
+
+    with patch("app.fetch_segments", return_value=page) as fetch:
+        with patch("app.current_user") as mock_user:
+            mock_user.id = str(ObjectId())
+            res = client.get(f"/result/{ObjectId()}/segments?offset=0&limit=1")
+
+    assert res.status_code == 200
+    assert res.json["segments"] == SEGMENTS[:1]
+    assert fetch.call_args.args[3:] == (0, 1)
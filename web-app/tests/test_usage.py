@@ -0,0 +1,72 @@
+"""Usage accounting tests"""
+
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from bson import ObjectId
+
+from app.usage import summarize_usage, usage_pipeline
+
+
+def test_usage_pipeline_matches_metered_entries_of_owner():
+    """Only the owner's metered entries inside the dates are aggregated"""
+    owner = ObjectId()
+
+    pipeline = usage_pipeline(owner, datetime(2025, 1, 1), datetime(2025, 1, 31))
+
+    criteria = pipeline[0]["$match"]
+    assert criteria["owner"] == owner
+    assert criteria["usage"] == {"$type": "object"}
+    assert criteria["timestamp"] == {
+        "$gte": datetime(2025, 1, 1),
+        "$lt": datetime(2025, 2, 1),
+    }
+    totals = pipeline[1]["$facet"]["totals"][0]["$group"]
+    assert totals["cpu_seconds"] == {"$sum": "$usage.cpu_seconds"}
+    assert totals["max_peak_rss_mb"] == {"$max": "$usage.peak_rss_mb"}
+
+
+def test_summarize_usage_formats_facets():
+    """Aggregation facets become totals, days and stages"""
+    database = MagicMock()
+    database.history.aggregate.return_value = iter(
+        [
+            {
+                "totals": [{"_id": None, "translations": 2, "cpu_seconds": 3.14159}],
+                "days": [{"_id": "2025-01-01", "translations": 2}],
+                "stages": [{"_id": "clone", "wall_seconds": 2.5, "cpu_seconds": 2}],
+            }
+        ]
+    )
+
+    summary = summarize_usage(database, ObjectId())
+
+    assert summary == {
+        "totals": {"translations": 2, "cpu_seconds": 3.142},
+        "days": [{"day": "2025-01-01", "translations": 2}],
+        "stages": {"clone": {"wall_seconds": 2.5, "cpu_seconds": 2}},
+    }
+
+    database.history.aggregate.return_value = iter([])
+    assert summarize_usage(database, ObjectId())["totals"] == {"translations": 0}
+
+
+def test_usage_endpoint(client, mock_db):
+    """Test /usage totals the current user's usage"""
+    user_id = ObjectId()
+
+    with patch("app.summarize_usage", return_value={"totals": {}}) as summarize:
+        with patch("app.current_user") as mock_user:
+            mock_user.id = str(user_id)
+            res = client.get("/usage?from=2025-01-01")
+            bad = client.get("/usage?to=tomorrow")
+
+    assert res.status_code == 200
+    assert res.json == {"totals": {}}
+    assert summarize.call_args.args == (
+        mock_db,
+        user_id,
+        datetime(2025, 1, 1),
+        None,
+    )
+    assert bad.status_code == 400